@@ -0,0 +1,3 @@
+"""
+Benchmarks of the exporters, with a fake cursor instead of a database
+"""
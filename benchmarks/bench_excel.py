@@ -0,0 +1,74 @@
+"""
+Benchmark the Excel exporter against per-cell type dispatch
+
+Usage: python -m benchmarks.bench_excel [rows] [columns]
+"""
+
+import os
+import sys
+import time
+import tempfile
+from datetime import datetime, date
+from datetime import time as dtime
+import xlsxwriter
+from extractsql.toexcel import export_to_excel
+from benchmarks.fakecursor import FakeCursor
+
+
+def _export_per_cell(cursor, file_path: str, batch_size: int):
+    # Previous implementation: choose the format for every cell and use the generic write()
+    workbook = xlsxwriter.Workbook(file_path)
+    formats = {
+        date: workbook.add_format({"num_format": "yyyy-mm-dd"}),
+        datetime: workbook.add_format({"num_format": "yyyy-mm-dd HH:MM:SS"}),
+        dtime: workbook.add_format({"num_format": "HH:MM:SS"}),
+    }
+    worksheet = workbook.add_worksheet("Sheet1")
+    worksheet.write_row(0, 0, [column[0] for column in cursor.description])
+    row_index = 1
+
+    while True:
+        rows = cursor.fetchmany(batch_size)
+
+        if not rows:
+            break
+
+        for row in rows:
+            for col_idx, value in enumerate(row):
+                value_format = next(
+                    (f for k, f in formats.items() if isinstance(value, k)), None
+                )
+                worksheet.write(row_index, col_idx, value, value_format)
+            row_index += 1
+
+    workbook.close()
+
+
+def _measure(fn, rows: int, columns: int, file_path: str) -> float:
+    cursor = FakeCursor(rows, columns)
+
+    start = time.perf_counter()
+    fn(cursor, file_path, batch_size=10_000)
+    elapsed = time.perf_counter() - start
+
+    return rows / elapsed
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    columns = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, "bench.xlsx")
+
+        baseline = _measure(_export_per_cell, rows, columns, file_path)
+        current = _measure(export_to_excel, rows, columns, file_path)
+
+    print(f"{rows} rows x {columns} columns")
+    print(f"Per-cell dispatch:  {baseline:,.0f} rows/s")
+    print(f"Per-column writers: {current:,.0f} rows/s")
+    print(f"Speedup: {current / baseline:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Benchmark the exporters with a fake cursor and save the results as JSON
+
+Usage: python -m benchmarks.bench_exporters [options] (see --help)
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import contextlib
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from extractsql import utils
+from extractsql.__version__ import __version__
+from extractsql.tocsv import export_to_csv
+from extractsql.toexcel import export_to_excel
+from extractsql.toparquet import export_to_parquet
+from extractsql.toarrow import export_to_arrow
+from benchmarks.fakecursor import FakeCursor, COLUMN_TYPES, DEFAULT_TYPES
+
+# Export function and file extension by exporter name
+EXPORTERS = {
+    "csv": (export_to_csv, ".csv"),
+    "xlsx": (export_to_excel, ".xlsx"),
+    "parquet": (export_to_parquet, ".parquet"),
+    "arrow": (export_to_arrow, ".arrow"),
+}
+
+
+class TimedCursor:
+    """
+    Measure the time spent fetching rows from a cursor.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.description = cursor.description
+        self.fetch_time = 0.0
+
+    def fetchmany(self, size: int) -> list[tuple]:
+        start = time.perf_counter()
+        rows = self._cursor.fetchmany(size)
+        self.fetch_time += time.perf_counter() - start
+
+        return rows
+
+    def nextset(self) -> bool:
+        return self._cursor.nextset()
+
+    def close(self):
+        self._cursor.close()
+
+
+def run_case(exporter: str, batch_size: int, cursor_options: dict, options: dict):
+    """
+    Export the rows of a fake cursor and return the measures of the run.
+    Runs in a new process, so the peak memory is the one of this export only.
+    """
+
+    fn, extension = EXPORTERS[exporter]
+    cursor = TimedCursor(FakeCursor(**cursor_options))
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, f"bench{extension}")
+
+        # The exporters report their progress, which is not needed here
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            rows = fn(cursor, file_path, batch_size, progress=False, **options)
+            seconds = time.perf_counter() - start
+
+        file_size = os.path.getsize(file_path)
+
+    return {
+        "exporter": exporter,
+        "batch_size": batch_size,
+        "rows": rows,
+        "seconds": round(seconds, 4),
+        "rows_per_second": round(rows / seconds) if seconds else None,
+        "fetch_seconds": round(cursor.fetch_time, 4),
+        "write_seconds": round(seconds - cursor.fetch_time, 4),
+        "peak_memory": utils.get_peak_memory(),
+        "file_size": file_size,
+    }
+
+
+def _get_args():
+    parser = argparse.ArgumentParser(description="Benchmark the exporters")
+
+    parser.add_argument("--rows", type=int, default=100_000, help="Rows per run")
+    parser.add_argument("--columns", type=int, default=12, help="Number of columns")
+    parser.add_argument(
+        "--types",
+        type=utils.split_values,
+        default=DEFAULT_TYPES,
+        help=f"Comma separated column types ({', '.join(COLUMN_TYPES)})",
+    )
+    parser.add_argument(
+        "--null_ratio", type=float, default=0.1, help="Fraction of NULL values"
+    )
+    parser.add_argument(
+        "--string_width", type=int, default=10, help="Length of the text values"
+    )
+    parser.add_argument(
+        "--exporters",
+        type=utils.split_values,
+        default=list(EXPORTERS),
+        help=f"Comma separated exporters ({', '.join(EXPORTERS)})",
+    )
+    parser.add_argument(
+        "--batch_sizes",
+        type=lambda text: [int(value) for value in utils.split_values(text)],
+        default=[10_000, 100_000],
+        help="Comma separated batch sizes",
+    )
+    parser.add_argument(
+        "--pipelined",
+        action="store_true",
+        help="Fetch on a separate thread while writing (csv, parquet, arrow)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="Runs per case (the fastest is kept)"
+    )
+    parser.add_argument(
+        "-o",
+        "--output_file",
+        default=None,
+        help="Path to the JSON results (default benchmarks/results/<version>_<timestamp>.json)",
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = _get_args()
+
+    cursor_options = {
+        "rows": args.rows,
+        "columns": args.columns,
+        "types": args.types,
+        "null_ratio": args.null_ratio,
+        "string_width": args.string_width,
+    }
+    options = {"pipelined": args.pipelined}
+
+    results = []
+
+    # A new process per run, so the peak memory of a run does not include the previous ones
+    context = multiprocessing.get_context("spawn")
+
+    for exporter in args.exporters:
+        for batch_size in args.batch_sizes:
+            runs = []
+
+            for _ in range(max(args.repeat, 1)):
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    runs.append(
+                        pool.submit(
+                            run_case, exporter, batch_size, cursor_options, options
+                        ).result()
+                    )
+
+            result = min(runs, key=lambda run: run["seconds"])
+            results.append(result)
+
+            print(
+                f"{exporter:<8} batch {batch_size:>9,}: "
+                f"{result['rows_per_second']:>12,} rows/s  "
+                f"fetch {result['fetch_seconds']:>8.2f}s  "
+                f"write {result['write_seconds']:>8.2f}s  "
+                f"peak {utils.format_bytes(result['peak_memory'])}"
+            )
+
+    output_file = args.output_file or os.path.join(
+        os.path.dirname(__file__),
+        "results",
+        f"{__version__}_{datetime.now().strftime('%Y%m%d_%H_%M_%S')}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "version": __version__,
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "cursor": cursor_options,
+                "options": options,
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+
+    print(f"Results saved to {output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Benchmark the whole extract_to path against a local SQLite database through unixODBC
+
+Requires unixODBC and the SQLite ODBC driver (e.g., `apt install unixodbc libsqliteodbc`,
+registered as "SQLite3" in odbcinst.ini).
+
+Usage: python -m benchmarks.bench_odbc [options] (see --help)
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import platform
+import tempfile
+import contextlib
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import pyodbc
+from extractsql import utils
+from extractsql.__version__ import __version__
+from extractsql.extract import extract_to
+from benchmarks.fakecursor import FakeCursor
+
+# SQLite column type by Python type of the fake cursor
+SQLITE_TYPES = {
+    int: "INTEGER",
+    str: "TEXT",
+    float: "REAL",
+    bool: "INTEGER",
+}
+
+
+def create_database(file_path: str, rows: int, columns: int):
+    """
+    Create a SQLite database with a `bench` table filled with the rows of a fake cursor.
+    """
+
+    cursor = FakeCursor(rows, columns)
+    names = [column[0] for column in cursor.description]
+    types = [SQLITE_TYPES.get(column[1], "TEXT") for column in cursor.description]
+
+    with contextlib.closing(sqlite3.connect(file_path)) as conn:
+        conn.execute(
+            f"CREATE TABLE bench ({', '.join(f'{n} {t}' for n, t in zip(names, types))})"
+        )
+
+        insert = f"INSERT INTO bench VALUES ({', '.join('?' * len(names))})"
+
+        while True:
+            batch = cursor.fetchmany(10_000)
+
+            if not batch:
+                break
+
+            # Decimal and datetime values are stored as text
+            conn.executemany(
+                insert,
+                [
+                    tuple(
+                        (
+                            value
+                            if value is None or type(value) in SQLITE_TYPES
+                            else str(value)
+                        )
+                        for value in row
+                    )
+                    for row in batch
+                ],
+            )
+
+        conn.commit()
+
+
+def run_case(
+    driver: str, database: str, query_file: str, output_format: str, batch_size: int
+) -> dict:
+    """
+    Extract the query to a file with `extract_to` and return the measures of the run.
+    Runs in a new process, so the peak memory is the one of this export only.
+    """
+
+    connstring = utils.ConnString("localhost", database, driver=f"{{{driver}}}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        output_file = os.path.join(directory, f"bench.{output_format}")
+
+        # The exporters report their progress, which is not needed here
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            rows, _ = extract_to(
+                connstring,
+                query_file,
+                output_file,
+                batch_size=batch_size,
+                progress=False,
+            )
+            seconds = time.perf_counter() - start
+
+        file_size = os.path.getsize(output_file)
+
+    return {
+        "exporter": output_format,
+        "batch_size": batch_size,
+        "rows": rows,
+        "seconds": round(seconds, 4),
+        "rows_per_second": round(rows / seconds) if seconds else None,
+        "peak_memory": utils.get_peak_memory(),
+        "file_size": file_size,
+    }
+
+
+def _get_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark extract_to with SQLite through unixODBC"
+    )
+
+    parser.add_argument("--rows", type=int, default=100_000, help="Rows of the table")
+    parser.add_argument("--columns", type=int, default=12, help="Number of columns")
+    parser.add_argument(
+        "--driver", default="SQLite3", help="Name of the SQLite ODBC driver"
+    )
+    parser.add_argument(
+        "--formats",
+        type=utils.split_values,
+        default=["csv", "parquet", "arrow", "xlsx"],
+        help="Comma separated output formats",
+    )
+    parser.add_argument("--batch_size", type=int, default=10_000, help="Rows per batch")
+    parser.add_argument(
+        "-o",
+        "--output_file",
+        default=None,
+        help="Path to the JSON results (default benchmarks/results/odbc_<version>_<timestamp>.json)",
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = _get_args()
+
+    if args.driver not in pyodbc.drivers():
+        print(
+            f"ODBC driver '{args.driver}' not found. Installed drivers: "
+            f"{', '.join(pyodbc.drivers()) or 'none'}"
+        )
+        sys.exit(1)
+
+    results = []
+
+    # A new process per run, so the peak memory of a run does not include the previous ones
+    context = multiprocessing.get_context("spawn")
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, "bench.db")
+        query_file = os.path.join(directory, "bench.sql")
+
+        print(f"Creating {args.rows:,} rows x {args.columns} columns...")
+        create_database(database, args.rows, args.columns)
+
+        with open(query_file, "w", encoding="utf-8") as f:
+            f.write("SELECT * FROM bench")
+
+        for output_format in args.formats:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result = pool.submit(
+                    run_case,
+                    args.driver,
+                    database,
+                    query_file,
+                    output_format,
+                    args.batch_size,
+                ).result()
+
+            results.append(result)
+
+            print(
+                f"{output_format:<8}: {result['rows_per_second']:>12,} rows/s  "
+                f"{result['seconds']:>8.2f}s  "
+                f"peak {utils.format_bytes(result['peak_memory'])}"
+            )
+
+    output_file = args.output_file or os.path.join(
+        os.path.dirname(__file__),
+        "results",
+        f"odbc_{__version__}_{datetime.now().strftime('%Y%m%d_%H_%M_%S')}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "version": __version__,
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "cursor": {"rows": args.rows, "columns": args.columns},
+                "options": {"driver": args.driver},
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+
+    print(f"Results saved to {output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Benchmark the start-up time of the command-line interface and the import cost of each format
+
+Usage: python -m benchmarks.bench_startup [options] (see --help)
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+from datetime import datetime
+from extractsql.__version__ import __version__
+
+# Modules that are slow to import, only needed to run an extraction
+HEAVY_MODULES = ["pyodbc", "pyarrow", "xlsxwriter", "charset_normalizer", "tqdm"]
+
+# Python code run by each case, and modules it must not import
+CASES = {
+    "python": ("pass", []),
+    "import": ("import extractsql.main", HEAVY_MODULES),
+    "--version": (
+        "import sys; sys.argv = ['extractsql', '--version']\n"
+        "from extractsql.main import main\n"
+        "try:\n    main()\nexcept SystemExit:\n    pass",
+        HEAVY_MODULES,
+    ),
+    "--help": (
+        "import sys; sys.argv = ['extractsql', '--help']\n"
+        "from extractsql.main import main\n"
+        "try:\n    main()\nexcept SystemExit:\n    pass",
+        HEAVY_MODULES,
+    ),
+}
+
+# Exporter of each format, and modules of the other formats it must not import
+FORMAT_CASES = {
+    "csv": ["xlsxwriter", "pyarrow.parquet"],
+    "parquet": ["xlsxwriter", "pyarrow.csv"],
+    "arrow": ["xlsxwriter", "pyarrow.parquet", "pyarrow.csv"],
+    "xlsx": ["pyarrow.parquet", "pyarrow.csv"],
+}
+
+_FORMAT_CODE = (
+    "from extractsql.extract import get_export_function\n"
+    "get_export_function('output.{}')"
+)
+
+# Printed by the child process after the case code, followed by the loaded modules
+_MODULES_MARK = "#modules:"
+
+
+def run_case(code: str, forbidden: list[str]) -> tuple[float, list[str]]:
+    """
+    Run the code in a new interpreter and return its wall time in seconds and the
+    forbidden modules it imported.
+    """
+
+    script = (
+        "import sys, io, contextlib\n"
+        "with contextlib.redirect_stdout(io.StringIO()):\n"
+        + "".join(f"    {line}\n" for line in code.splitlines())
+        + f"print({_MODULES_MARK!r} + ','.join(m for m in {forbidden!r} if m in sys.modules))\n"
+    )
+
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    seconds = time.perf_counter() - start
+
+    modules = result.stdout.strip().rsplit(_MODULES_MARK, 1)[-1]
+
+    return seconds, [module for module in modules.split(",") if module]
+
+
+def _get_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the start-up time of the command-line interface"
+    )
+
+    parser.add_argument(
+        "--repeat", type=int, default=10, help="Runs per case (min and median are kept)"
+    )
+    parser.add_argument(
+        "-o",
+        "--output_file",
+        default=None,
+        help="Path to the JSON results (default benchmarks/results/startup_<version>_<timestamp>.json)",
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = _get_args()
+
+    cases = dict(CASES)
+    for output_format, forbidden in FORMAT_CASES.items():
+        cases[output_format] = (_FORMAT_CODE.format(output_format), forbidden)
+
+    results = []
+    failed = False
+
+    for name, (code, forbidden) in cases.items():
+        runs = []
+        loaded = []
+
+        for _ in range(max(args.repeat, 1)):
+            seconds, loaded = run_case(code, forbidden)
+            runs.append(seconds)
+
+        result = {
+            "case": name,
+            "min_seconds": round(min(runs), 4),
+            "median_seconds": round(statistics.median(runs), 4),
+            "unexpected_modules": loaded,
+        }
+        results.append(result)
+
+        print(
+            f"{name:<10}: min {result['min_seconds'] * 1000:>8.1f}ms  "
+            f"median {result['median_seconds'] * 1000:>8.1f}ms"
+            + (f"  imports {', '.join(loaded)}" if loaded else "")
+        )
+
+        failed = failed or bool(loaded)
+
+    output_file = args.output_file or os.path.join(
+        os.path.dirname(__file__),
+        "results",
+        f"startup_{__version__}_{datetime.now().strftime('%Y%m%d_%H_%M_%S')}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "version": __version__,
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+
+    print(f"Results saved to {output_file}")
+
+    if failed:
+        print("Some cases import modules they do not need")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
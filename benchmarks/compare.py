@@ -0,0 +1,51 @@
+"""
+Compare two benchmark result files
+
+Usage: python -m benchmarks.compare baseline.json current.json
+"""
+
+import sys
+import json
+
+
+def _load(file_path: str) -> tuple[dict, dict]:
+    with open(file_path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    # Results by exporter and batch size
+    return data, {
+        (result["exporter"], result["batch_size"]): result for result in data["results"]
+    }
+
+
+def main():
+    if len(sys.argv) != 3:
+        print(__doc__.strip())
+        sys.exit(1)
+
+    baseline_data, baseline = _load(sys.argv[1])
+    current_data, current = _load(sys.argv[2])
+
+    print(f"Baseline: {baseline_data['version']} ({baseline_data['timestamp']})")
+    print(f"Current:  {current_data['version']} ({current_data['timestamp']})")
+
+    if baseline_data["cursor"] != current_data["cursor"]:
+        print("Warning: the runs used different rows or columns")
+
+    for key, result in current.items():
+        if key not in baseline:
+            continue
+
+        before = baseline[key]
+        speed = result["rows_per_second"] / before["rows_per_second"]
+        memory = result["peak_memory"] / before["peak_memory"]
+
+        print(
+            f"{key[0]:<8} batch {key[1]:>9,}: "
+            f"{before['rows_per_second']:>12,} -> {result['rows_per_second']:>12,} rows/s "
+            f"({speed:.2f}x)  peak memory {memory:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Fake pyodbc cursor to benchmark exporters without a database
+"""
+
+import random
+from decimal import Decimal
+from datetime import datetime, date, timedelta
+from typing import Optional
+
+# Column types as reported by pyodbc in cursor.description
+# (type_code, display_size, internal_size, precision, scale), by type name
+COLUMN_TYPES = {
+    "int": (int, None, 10, 10, 0),
+    "bigint": (int, None, 19, 19, 0),
+    "str": (str, None, 50, 50, 0),
+    "text": (str, None, 0, 0, 0),  # (N)VARCHAR(MAX)
+    "decimal": (Decimal, None, 19, 19, 4),
+    "datetime": (datetime, None, 23, 23, 3),
+    "date": (date, None, 10, 10, 0),
+    "bool": (bool, None, 1, 1, 0),
+    "float": (float, None, 53, 53, 0),
+}
+
+DEFAULT_TYPES = ["int", "str", "decimal", "datetime", "bool", "float"]
+
+# Distinct values generated per column, cycled over the rows
+_VALUES = 1000
+
+
+class FakeCursor:
+    """
+    Cursor imitating pyodbc (`description`, `fetchmany`, `nextset`, `close`) that returns
+    generated rows.
+
+    Args:
+        rows: Number of rows of each result set.
+        columns: Number of columns (`types` are repeated to reach it).
+        types: Column type names (keys of `COLUMN_TYPES`).
+        null_ratio: Fraction of NULL values in every column but the first one.
+        string_width: Length of the text values.
+        result_sets: Number of result sets (with the same columns).
+        seed: Seed of the generated values.
+    """
+
+    def __init__(
+        self,
+        rows: int,
+        columns: int = len(DEFAULT_TYPES),
+        types: Optional[list[str]] = None,
+        null_ratio: float = 0.1,
+        string_width: int = 10,
+        result_sets: int = 1,
+        seed: int = 0,
+    ):
+        types = types or DEFAULT_TYPES
+        names = [types[i % len(types)] for i in range(columns)]
+
+        self.description = [
+            (f"{name}_{i}",) + COLUMN_TYPES[name] + (i > 0,)
+            for i, name in enumerate(names)
+        ]
+        self._rows = rows
+        self._position = 0
+        self._result_sets = result_sets
+
+        generator = random.Random(seed)
+        self._values = [
+            _generate_values(
+                name, generator, null_ratio if i > 0 else 0.0, string_width
+            )
+            for i, name in enumerate(names)
+        ]
+
+    def fetchmany(self, size: int) -> list[tuple]:
+        """
+        Return the next `size` rows.
+        """
+
+        count = min(size, self._rows - self._position)
+
+        rows = [
+            tuple(values[i % _VALUES] for values in self._values)
+            for i in range(self._position, self._position + count)
+        ]
+
+        self._position += count
+
+        return rows
+
+    def nextset(self) -> bool:
+        """
+        Move to the next result set, if any.
+        """
+
+        if self._result_sets <= 1:
+            return False
+
+        self._result_sets -= 1
+        self._position = 0
+
+        return True
+
+    def close(self):
+        """
+        Nothing to release.
+        """
+
+
+def _generate_values(
+    name: str, generator: random.Random, null_ratio: float, string_width: int
+) -> list:
+    start = datetime(2024, 1, 1)
+    values = []
+
+    for i in range(_VALUES):
+        if generator.random() < null_ratio:
+            values.append(None)
+        elif name in ("int", "bigint"):
+            values.append(generator.randrange(1_000_000))
+        elif name in ("str", "text"):
+            values.append(f"value {i} ".ljust(string_width, "x")[:string_width])
+        elif name == "decimal":
+            values.append(Decimal(generator.randrange(10_000_000)) / 100)
+        elif name == "datetime":
+            values.append(start + timedelta(seconds=generator.randrange(10**8)))
+        elif name == "date":
+            values.append(start.date() + timedelta(days=generator.randrange(10_000)))
+        elif name == "bool":
+            values.append(generator.random() < 0.5)
+        else:
+            values.append(generator.random() * 1000)
+
+    return values
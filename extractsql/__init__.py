@@ -0,0 +1,24 @@
+"""
+Export SQL Server query results to Excel, CSV, Parquet and Arrow files, or read them as
+Arrow record batches
+"""
+
+import importlib
+
+# Library API by module. Modules are imported on first use, so the command-line
+# interface does not load pyodbc and pyarrow to show --help
+_API = {
+    "ConnString": "utils",
+    "extract_to": "extract",
+    "iter_batches": "reader",
+    "iter_result_sets": "reader",
+}
+
+__all__ = list(_API)
+
+
+def __getattr__(name: str):
+    if name not in _API:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    return getattr(importlib.import_module(f".{_API[name]}", __name__), name)
@@ -0,0 +1,136 @@
+"""
+Fetch backends that execute a query and return a cursor over its result sets
+"""
+
+from contextlib import contextmanager, closing
+from typing import Iterator, Optional
+import pyodbc
+from .connection import ConnectionPool
+from .cursors import OdbcReaderCursor
+from .batching import get_batches_in_memory
+from .constants import BATCH_SIZE, BACKEND_PYODBC, BACKEND_ARROW_ODBC
+
+
+@contextmanager
+def execute_pyodbc(  # pylint: disable=unused-argument
+    connection_string: str,
+    query: str,
+    params: Optional[list] = None,
+    pool: Optional[ConnectionPool] = None,
+    **kwargs,
+) -> Iterator[pyodbc.Cursor]:
+    """
+    Execute the query with pyodbc. Rows are fetched as `pyodbc.Row` objects and converted
+    to record batches by the exporters.
+
+    Args:
+        connection_string: pyodbc connection string.
+        query: SQL statement or script.
+        params: Values of the `?` parameters of the query.
+        pool: Connection pool to borrow the connection from (a new connection is opened
+            and closed if not specified).
+        **kwargs: Export args (ignored).
+
+    Yields:
+        pyodbc.Cursor: Cursor positioned on the first result of the query.
+    """
+
+    with (
+        pool.connection() if pool else closing(pyodbc.connect(connection_string))
+    ) as conn:
+        cursor = conn.cursor()
+
+        try:
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+
+            yield cursor
+        finally:
+            cursor.close()
+
+
+@contextmanager
+def execute_arrow_odbc(
+    connection_string: str,
+    query: str,
+    params: Optional[list] = None,
+    pool: Optional[ConnectionPool] = None,  # pylint: disable=unused-argument
+    **kwargs,
+) -> Iterator[OdbcReaderCursor]:
+    """
+    Execute the query with arrow-odbc, which fills Arrow record batches directly from the
+    ODBC buffers, without creating a Python object per value. The exporters write the
+    record batches as they are (Excel converts them to rows).
+
+    arrow-odbc opens its own connection, so the connection pool is not used.
+
+    Args:
+        connection_string: ODBC connection string.
+        query: SQL statement or script.
+        params: Values of the `?` parameters of the query (passed as text).
+        pool: Not used.
+        **kwargs: Export args like number of rows per batch (batch_size) and memory budget
+            in bytes (max_memory), shared by the batches held at the same time (pipelined,
+            queue_size).
+
+    Yields:
+        OdbcReaderCursor: Cursor positioned on the first result of the query.
+    """
+
+    try:
+        # pylint: disable=import-outside-toplevel
+        from arrow_odbc import read_arrow_batches_from_odbc
+    except ImportError as e:
+        raise ValueError(
+            f"The {BACKEND_ARROW_ODBC} backend requires arrow-odbc (pip install arrow-odbc)."
+        ) from e
+
+    # Buffer options of the first and the next result sets
+    options = {"batch_size": kwargs.get("batch_size", BATCH_SIZE)}
+    if kwargs.get("max_memory"):
+        # The budget is shared by the batches held at the same time, as with pyodbc
+        options["max_bytes_per_batch"] = max(
+            kwargs["max_memory"] // get_batches_in_memory(**kwargs), 1
+        )
+
+    reader = read_arrow_batches_from_odbc(
+        query=query,
+        connection_string=connection_string,
+        parameters=(
+            [None if value is None else str(value) for value in params]
+            if params
+            else None
+        ),
+        **options,
+    )
+
+    cursor = OdbcReaderCursor(reader, **options)
+
+    try:
+        yield cursor
+    finally:
+        cursor.close()
+
+
+# Execute function by backend name
+BACKENDS = {
+    BACKEND_PYODBC: execute_pyodbc,
+    BACKEND_ARROW_ODBC: execute_arrow_odbc,
+}
+
+
+def get_backend(name: Optional[str] = None):
+    """
+    Return the execute function of a backend (pyodbc if not specified).
+    """
+
+    name = name or BACKEND_PYODBC
+
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Invalid backend '{name}'. Expected one of: {', '.join(BACKENDS)}."
+        )
+
+    return BACKENDS[name]
@@ -0,0 +1,259 @@
+"""
+Run the jobs of a manifest on a pool of workers
+"""
+
+import os
+import io
+import csv
+import json
+import time
+from pathlib import Path
+from dataclasses import dataclass, field, fields, asdict
+from concurrent.futures import ThreadPoolExecutor
+import pyodbc
+from . import utils
+from .extract import extract_to
+from .connection import ConnectionPool
+from .constants import MANIFEST_JSON, MANIFEST_CSV, MANIFEST_YAML, RETRY_DELAY
+
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+
+
+@dataclass
+class Job:
+    """
+    Define an extraction of a manifest.
+    """
+
+    name: str
+    connstring: utils.ConnString
+    query_file: str
+    output_files: list[str]
+    options: dict = field(default_factory=dict)
+
+
+@dataclass
+class JobResult:
+    """
+    Outcome of a job.
+    """
+
+    name: str
+    output_file: str
+    status: str
+    rows: int = 0
+    seconds: float = 0.0
+    error: str = ""
+
+
+def read_manifest(manifest_file: str) -> list[dict]:
+    """
+    Read the jobs of a JSON, CSV or YAML manifest.
+
+    JSON and YAML manifests are a list of jobs, or an object with the list of jobs (jobs)
+    and the options shared by all of them (defaults). CSV manifests have a header with the
+    option names and one row per job, where empty cells are left to the defaults.
+    Option names are the long names of the command-line arguments (e.g., "server",
+    "query_file", "output_format", "batch_size").
+
+    :param manifest_file: Path of the manifest (.json, .csv, .yaml or .yml).
+
+    :return: Options of each job.
+    :rtype: list[dict]
+    """
+
+    extension = Path(manifest_file).suffix.lower()
+    text = utils.read_file(manifest_file)
+
+    if extension == MANIFEST_CSV:
+        return [
+            {name: value for name, value in row.items() if value not in (None, "")}
+            for row in csv.DictReader(io.StringIO(text))
+        ]
+
+    if extension == MANIFEST_JSON:
+        data = json.loads(text)
+    elif extension in MANIFEST_YAML:
+        try:
+            import yaml  # pylint: disable=import-outside-toplevel
+        except ImportError as e:
+            raise ValueError(
+                "YAML manifests require PyYAML (pip install pyyaml)."
+            ) from e
+
+        data = yaml.safe_load(text)
+    else:
+        raise ValueError(
+            f"Invalid manifest file extension '{extension}'. "
+            "Expected '.json', '.csv', '.yaml' or '.yml'."
+        )
+
+    if isinstance(data, dict):
+        defaults = data.get("defaults") or {}
+        jobs = data.get("jobs") or []
+    else:
+        defaults = {}
+        jobs = data or []
+
+    return [{**defaults, **job} for job in jobs]
+
+
+def run_jobs(
+    jobs: list[Job],
+    workers: int = 1,
+    retries: int = 0,
+    retry_delay: float = RETRY_DELAY,
+) -> list[JobResult]:
+    """
+    Run the jobs on a pool of threads. Connections are kept open and reused by the jobs of
+    the same server and database, so each connection is opened once per worker at most.
+    A failed job does not stop the others.
+
+    :param jobs: Jobs to run.
+    :param workers: Number of jobs running at the same time.
+    :param retries: Number of times a job that failed with a database error (e.g., a lost
+        connection or a deadlock) is run again.
+    :param retry_delay: Seconds to wait before the first retry, doubled for each next one.
+
+    :return: Result of each job, in the order of the jobs.
+    :rtype: list[JobResult]
+
+    :raises ValueError: If several jobs write the same file (no job is run).
+    """
+
+    _check_output_files(jobs)
+
+    workers = max(workers, 1)
+    pools: dict[str, ConnectionPool] = {}
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = []
+
+            for job in jobs:
+                connection_string = utils.get_connection_string(job.connstring)
+
+                if connection_string not in pools:
+                    pools[connection_string] = ConnectionPool(
+                        connection_string, workers
+                    )
+
+                futures.append(
+                    executor.submit(
+                        _run_job, job, pools[connection_string], retries, retry_delay
+                    )
+                )
+
+            return [future.result() for future in futures]
+    finally:
+        for pool in pools.values():
+            pool.close()
+
+
+def _check_output_files(jobs: list[Job]):
+    # Jobs writing the same file would overwrite each other's rows (e.g., two jobs of the
+    # same query file without a name or output file, started in the same second)
+    jobs_by_file: dict[str, Job] = {}
+
+    for job in jobs:
+        for output_file in job.output_files:
+            other = jobs_by_file.setdefault(
+                os.path.normcase(os.path.abspath(output_file)), job
+            )
+
+            if other is not job:
+                raise ValueError(
+                    f"Jobs {other.name} and {job.name} write the same file "
+                    f"({output_file}). Set a different name or output_file."
+                )
+
+
+def _run_job(
+    job: Job, pool: ConnectionPool, retries: int = 0, retry_delay: float = RETRY_DELAY
+) -> JobResult:
+    print(f"Starting job {job.name}")
+
+    start_time = time.perf_counter()
+
+    try:
+        for attempt in range(retries + 1):
+            try:
+                rows, output_files = extract_to(
+                    job.connstring,
+                    job.query_file,
+                    job.output_files,
+                    pool=pool,
+                    **job.options,
+                )
+                break
+            except pyodbc.Error as e:
+                if attempt == retries:
+                    raise
+
+                delay = retry_delay * 2**attempt
+                print(
+                    f"Job {job.name} failed ({e}), retrying in {delay:g}s "
+                    f"({attempt + 1}/{retries})"
+                )
+                time.sleep(delay)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        print(f"Job {job.name} failed: {e}")
+
+        return JobResult(
+            job.name,
+            ", ".join(job.output_files),
+            STATUS_FAILED,
+            seconds=round(time.perf_counter() - start_time, 3),
+            error=str(e),
+        )
+
+    print(f"Job {job.name} completed")
+
+    return JobResult(
+        job.name,
+        ", ".join(output_files),
+        STATUS_OK,
+        rows,
+        round(time.perf_counter() - start_time, 3),
+    )
+
+
+def print_summary(results: list[JobResult]):
+    """
+    Print the status, rows and time of each job.
+    """
+
+    width = max((len(result.name) for result in results), default=0)
+
+    print("-" * 50)
+
+    for result in results:
+        print(
+            f"{result.name:<{width}}  {result.status:<6}  {result.rows:>12,} rows"
+            f"  {result.seconds:>9.2f}s  {result.error}".rstrip()
+        )
+
+    failed = sum(result.status == STATUS_FAILED for result in results)
+
+    print("-" * 50)
+    print(
+        f"{len(results) - failed} jobs completed, {failed} failed, "
+        f"{sum(result.rows for result in results):,} rows"
+    )
+
+
+def write_summary(results: list[JobResult], summary_file: str):
+    """
+    Write the result of each job to a CSV file, or a JSON file if the extension is `.json`.
+    """
+
+    records = [asdict(result) for result in results]
+
+    with open(summary_file, "w", encoding="utf-8", newline="") as f:
+        if utils.is_extension(summary_file, MANIFEST_JSON):
+            json.dump(records, f, indent=2)
+        else:
+            writer = csv.DictWriter(f, fieldnames=[f.name for f in fields(JobResult)])
+            writer.writeheader()
+            writer.writerows(records)
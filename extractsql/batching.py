@@ -0,0 +1,158 @@
+"""
+Adapt the number of rows fetched per batch to a memory budget
+"""
+
+import sys
+import time
+from functools import partial
+from . import utils
+from .constants import (
+    BATCH_SIZE,
+    QUEUE_SIZE,
+    MIN_BATCH_SIZE,
+    MAX_BATCH_SIZE,
+    INITIAL_BATCH_SIZE,
+    BATCH_GROWTH_GAIN,
+    BATCH_GROWTH_HOLD,
+    BATCH_MEMORY_MARGIN,
+    ROW_SAMPLE_SIZE,
+)
+
+
+def get_fetch(cursor, batch_size: int = BATCH_SIZE, batches: int = 1, **kwargs):
+    """
+    Return a function that fetches the next rows of the cursor (an empty list at the end).
+
+    Without a memory budget (max_memory) each fetch returns `batch_size` rows. Otherwise the
+    number of rows is adapted to the budget by a `BatchSizer`.
+
+    Args:
+        cursor: pyodbc cursor positioned on a result set.
+        batch_size: Number of rows to fetch per batch.
+        batches: Number of batches held in memory at the same time (e.g., queued batches).
+        **kwargs: Memory budget in bytes (max_memory).
+
+    Returns:
+        Fetch function.
+    """
+
+    max_memory = kwargs.get("max_memory")
+
+    if not max_memory:
+        return partial(cursor.fetchmany, batch_size)
+
+    return BatchSizer(cursor, max_memory, batches).fetchmany
+
+
+def get_batches_in_memory(**kwargs) -> int:
+    """
+    Return the number of fetched batches an export holds in memory at the same time, which
+    share the memory budget: with a fetch thread (pipelined), the queued batches plus the
+    one being fetched and the one being written.
+    """
+
+    if kwargs.get("pipelined"):
+        return max(kwargs.get("queue_size", QUEUE_SIZE), 1) + 2
+
+    return 1
+
+
+class BatchSizer:
+    """
+    Fetch rows in batches that fit in a memory budget, as large as possible.
+
+    The size in memory of each row and the fetch time are measured on every batch. The
+    batch size starts small and is doubled up to the largest batch that fits in the budget.
+    When a larger batch is not fetched faster (rows per second), the size is kept for a few
+    batches before it is doubled again, so the growth slows down but is only capped by the
+    budget. The size is reduced as soon as a batch would exceed the budget (e.g., when the
+    rows get wider), and grows again from there. Each change of size is printed.
+
+    Args:
+        cursor: pyodbc cursor positioned on a result set.
+        max_memory: Memory budget in bytes for the fetched batches.
+        batches: Number of batches held in memory at the same time, sharing the budget.
+    """
+
+    def __init__(self, cursor, max_memory: int, batches: int = 1):
+        self.cursor = cursor
+        self.budget = max(max_memory // max(batches, 1), 1)
+        self.size = INITIAL_BATCH_SIZE
+        self.row_bytes = 0.0
+        self._rate = 0.0
+        self._last_size = 0
+        # Batches left to fetch with the current size before trying a larger one
+        self._hold = 0
+
+        print(f"Adapting the batch size to {utils.format_bytes(self.budget)} per batch")
+
+    def fetchmany(self) -> list:
+        """
+        Fetch the next batch of rows and adapt the size of the next one.
+        """
+
+        start = time.perf_counter()
+        rows = self.cursor.fetchmany(self.size)
+        seconds = time.perf_counter() - start
+
+        # A partial batch is the end of the result
+        if len(rows) == self.size:
+            self._update(rows, seconds)
+
+        return rows
+
+    def _update(self, rows: list, seconds: float):
+        self.row_bytes = get_row_bytes(rows)
+
+        # Largest batch that fits in the budget, with a margin for wider rows
+        limit = min(
+            max(
+                int(self.budget * BATCH_MEMORY_MARGIN / self.row_bytes), MIN_BATCH_SIZE
+            ),
+            MAX_BATCH_SIZE,
+        )
+        rate = len(rows) / seconds if seconds > 0 else float("inf")
+
+        if self.size * self.row_bytes > self.budget:
+            size = limit
+            self._hold = 0
+        elif self._hold > 0:
+            self._hold -= 1
+            size = self.size
+        elif self.size > self._last_size and rate < self._rate * BATCH_GROWTH_GAIN:
+            # The larger batch was not much faster: keep it for a while
+            self._hold = BATCH_GROWTH_HOLD
+            size = self.size
+        else:
+            size = max(min(self.size * 2, limit), self.size)
+
+        self._rate = rate
+        self._last_size = self.size
+
+        if size != self.size:
+            print(
+                f"Batch size: {size:,} rows "
+                f"({utils.format_bytes(self.row_bytes)} per row, {rate:,.0f} rows/s)"
+            )
+            self.size = size
+
+
+def get_row_bytes(rows: list) -> float:
+    """
+    Estimate the average size in memory of the rows from a sample of them.
+
+    :param rows: Fetched rows (sequences of values).
+
+    :return: Average bytes per row (row object and values).
+    :rtype: float
+    """
+
+    step = max(len(rows) // ROW_SAMPLE_SIZE, 1)
+    sample = rows[::step]
+
+    total = sum(
+        sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+        for row in sample
+    )
+
+    return max(total / max(len(sample), 1), 1.0)
@@ -0,0 +1,227 @@
+"""
+On-disk cache of query results
+"""
+
+import os
+import json
+import time
+import uuid
+import hashlib
+from pathlib import Path
+from decimal import Decimal
+from datetime import datetime, date, time as dt_time
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from typing import Iterator, Optional
+import pyarrow as pa
+from . import utils
+from .cursors import ArrowCursor
+from .constants import CACHE_DIR, CACHE_MAX_SIZE
+
+# Python types of the cached column descriptions, by name
+_TYPE_CODES = {
+    t.__name__: t
+    for t in (bool, int, float, Decimal, str, bytes, bytearray, datetime, date, dt_time)
+}
+
+_DATA_EXTENSION = ".arrow"
+_INFO_EXTENSION = ".json"
+
+
+@dataclass
+class CacheEntry:
+    """
+    Cached result of a query: an Arrow IPC file with the rows of the first result set and
+    the description of its columns.
+    """
+
+    key: str
+    file_path: str
+    description: list
+    rows: int
+    size: int
+    created: float
+    last_used: float
+    query_file: str = ""
+    server: str = ""
+    database: str = ""
+
+
+class ResultCache:
+    """
+    Directory of cached query results, with a size limit. When the limit is exceeded, the
+    least recently used results are removed.
+
+    Args:
+        directory: Cache directory (~/.cache/extractsql if not specified).
+        max_size: Maximum size in bytes of the cached results.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_size: int = CACHE_MAX_SIZE):
+        self.directory = Path(os.path.expanduser(directory or CACHE_DIR))
+        self.max_size = max_size or CACHE_MAX_SIZE
+
+    @staticmethod
+    def get_key(
+        query: str, connstring: utils.ConnString, params: Optional[list] = None
+    ) -> str:
+        """
+        Return the cache key of a query: a hash of the query text, parameter values, server,
+        database and user (users can be allowed to see different rows).
+        """
+
+        parts = [
+            query,
+            connstring.server.lower(),
+            connstring.database.lower(),
+            (connstring.user or "").lower(),
+        ]
+
+        if params:
+            # Keys of queries without parameters are unchanged
+            parts.append(repr(list(params)))
+
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str, ttl: Optional[float] = None) -> Optional[CacheEntry]:
+        """
+        Return the cached result of a key, if it is not older than `ttl` seconds, and mark it
+        as used.
+        """
+
+        entry = self._read_entry(key)
+
+        if entry is None or not os.path.exists(entry.file_path):
+            return None
+
+        if ttl is not None and time.time() - entry.created > ttl:
+            return None
+
+        entry.last_used = time.time()
+        self._write_entry(entry)
+
+        return entry
+
+    def new_file(self, key: str) -> str:
+        """
+        Return a new temporary path to spool the result of a key, in the cache directory.
+        """
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        return str(self.directory / f"{key}.{uuid.uuid4().hex}.tmp")
+
+    def put(
+        self, key: str, file_path: str, description: list, rows: int, **info
+    ) -> CacheEntry:
+        """
+        Move a spooled result to the cache and return its entry.
+
+        Args:
+            key: Cache key of the query.
+            file_path: Arrow IPC file with the result.
+            description: pyodbc description of the columns.
+            rows: Number of rows.
+            **info: Query file (query_file), server and database, for reference.
+        """
+
+        data_file = str(self.directory / f"{key}{_DATA_EXTENSION}")
+        os.replace(file_path, data_file)
+
+        now = time.time()
+        entry = CacheEntry(
+            key,
+            data_file,
+            [tuple(column) for column in description],
+            rows,
+            os.path.getsize(data_file),
+            now,
+            now,
+            **info,
+        )
+        self._write_entry(entry)
+
+        return entry
+
+    def evict(self):
+        """
+        Remove the least recently used results until the cache fits in its size limit.
+        """
+
+        entries = sorted(self.entries(), key=lambda entry: entry.last_used)
+        size = sum(entry.size for entry in entries)
+
+        for entry in entries:
+            if size <= self.max_size:
+                break
+
+            self.remove(entry.key)
+            size -= entry.size
+
+            print(f"Removed cached result {entry.key[:12]} ({entry.query_file})")
+
+    def remove(self, key: str):
+        """
+        Remove the result of a key.
+        """
+
+        for extension in (_DATA_EXTENSION, _INFO_EXTENSION):
+            try:
+                os.remove(self.directory / f"{key}{extension}")
+            except FileNotFoundError:
+                # Removed by another job
+                pass
+
+    def entries(self) -> list[CacheEntry]:
+        """
+        Return the cached results.
+        """
+
+        if not self.directory.exists():
+            return []
+
+        entries = (
+            self._read_entry(path.stem)
+            for path in self.directory.glob(f"*{_INFO_EXTENSION}")
+        )
+
+        return [entry for entry in entries if entry is not None]
+
+    def _read_entry(self, key: str) -> Optional[CacheEntry]:
+        try:
+            with open(
+                self.directory / f"{key}{_INFO_EXTENSION}", encoding="utf-8"
+            ) as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        data["description"] = [
+            (name, _TYPE_CODES.get(type_name, str), *sizes)
+            for name, type_name, *sizes in data["description"]
+        ]
+
+        return CacheEntry(**data)
+
+    def _write_entry(self, entry: CacheEntry):
+        data = asdict(entry)
+        data["description"] = [
+            (name, type_code.__name__, *sizes)
+            for name, type_code, *sizes in entry.description
+        ]
+
+        # Replaced at once, so other jobs never read a partial file
+        utils.write_json(self.directory / f"{entry.key}{_INFO_EXTENSION}", data)
+
+
+@contextmanager
+def open_entry(entry: CacheEntry) -> Iterator[ArrowCursor]:
+    """
+    Return a cursor over the rows of a cached result (memory-mapped).
+    """
+
+    with pa.memory_map(entry.file_path) as source:
+        reader = pa.ipc.open_file(source)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+
+        yield ArrowCursor(batches, entry.description)
@@ -0,0 +1,166 @@
+"""
+Checkpoint flat file exports ordered by a key, to resume them after a failure
+"""
+
+import os
+import json
+from contextlib import ExitStack
+from dataclasses import dataclass, asdict
+from typing import Optional
+import pyarrow as pa
+from . import utils
+from .sql import quote_identifier, wrap_query
+from .connection import ConnectionPool
+from .backends import get_backend
+from .metrics import get_metrics
+from .incremental import encode_value, decode_value
+
+
+@dataclass
+class Checkpoint:
+    """
+    Progress of an export ordered by a key: rows written, last key written and size of the
+    output file once those rows were flushed.
+    """
+
+    checkpoint_file: str
+    key_column: str
+    output_file: str
+    rows: int = 0
+    offset: int = 0
+    last_key: object = None
+
+    @classmethod
+    def load(cls, checkpoint_file: str) -> Optional["Checkpoint"]:
+        """
+        Read a checkpoint (None if there is no checkpoint).
+        """
+
+        try:
+            with open(checkpoint_file, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+
+        if data["last_key"] is not None:
+            data["last_key"] = decode_value(data["last_key"])
+
+        return cls(checkpoint_file=checkpoint_file, **data)
+
+    def update(self, batch: pa.RecordBatch, offset: int):
+        """
+        Record a batch flushed to the output file, which then has `offset` bytes.
+        """
+
+        if batch.num_rows:
+            self.last_key = batch.column(self.key_column)[-1].as_py()
+
+        self.rows += batch.num_rows
+        self.offset = offset
+        self.save()
+
+    def save(self):
+        """
+        Write the checkpoint file.
+        """
+
+        data = asdict(self)
+        del data["checkpoint_file"]
+
+        if self.last_key is not None:
+            data["last_key"] = encode_value(self.last_key)
+
+        utils.write_json(self.checkpoint_file, data)
+
+    def remove(self):
+        """
+        Remove the checkpoint file once the export is complete.
+        """
+
+        if os.path.exists(self.checkpoint_file):
+            os.remove(self.checkpoint_file)
+
+
+def extract_resumable(
+    connection_string: str,
+    query: str,
+    output_file: str,
+    fn,
+    pool: Optional[ConnectionPool] = None,
+    **kwargs,
+) -> int:
+    """
+    Export the query sorted by a key, saving a checkpoint after every batch written to the
+    output file. With `resume`, an export that failed continues from its checkpoint: the
+    output file is truncated to the last flushed batch and only the rows after its last key
+    are fetched.
+
+    Args:
+        connection_string: pyodbc connection string.
+        query: SELECT statement (usable as a derived table).
+        output_file: File destination (uncompressed flat file).
+        fn: Export function.
+        pool: Connection pool to borrow the connection from.
+        **kwargs: Key column (resume_key), path of the checkpoint file (checkpoint_file),
+            continue from the checkpoint (resume) and the args of the export function.
+
+    Returns:
+        int: Number of rows of the output file.
+    """
+
+    key = kwargs.pop("resume_key")
+    checkpoint_file = kwargs.pop("checkpoint_file")
+    checkpoint = (
+        Checkpoint.load(checkpoint_file) if kwargs.pop("resume", False) else None
+    )
+    kwargs.pop("append", None)
+
+    if checkpoint is not None and checkpoint.key_column != key:
+        raise ValueError(
+            f"The checkpoint {checkpoint_file} belongs to the key '{checkpoint.key_column}', "
+            f"not '{key}'."
+        )
+
+    name = quote_identifier(key)
+    where, params = None, None
+
+    if checkpoint is None:
+        checkpoint = Checkpoint(checkpoint_file, key, os.path.abspath(output_file))
+        checkpoint.save()
+    else:
+        print(
+            f"Resuming {checkpoint.output_file} after {checkpoint.rows} rows "
+            f"({key} {checkpoint.last_key})"
+        )
+
+        # Rows written after the last checkpoint are written again
+        os.truncate(checkpoint.output_file, checkpoint.offset)
+
+        if checkpoint.last_key is not None:
+            where, params = f"{name} > ?", [checkpoint.last_key]
+
+    execute = get_backend(kwargs.get("backend"))
+
+    with ExitStack() as stack:
+        with get_metrics(kwargs).timer("execute"):
+            cursor = stack.enter_context(
+                execute(
+                    connection_string,
+                    wrap_query(query, where=where, order_by=name),
+                    params,
+                    pool=pool,
+                    **kwargs,
+                )
+            )
+
+        fn(
+            cursor,
+            checkpoint.output_file,
+            checkpoint=checkpoint,
+            append=checkpoint.offset > 0,
+            **kwargs,
+        )
+
+    checkpoint.remove()
+
+    return checkpoint.rows
@@ -0,0 +1,111 @@
+"""
+Compressed output stream
+"""
+
+import io
+import bz2
+import threading
+from collections import deque
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+import pyarrow as pa
+from .constants import WRITE_BUFFER_SIZE, COMPRESSION_WORKERS
+from . import utils
+
+
+class CompressedOutput(io.RawIOBase):
+    """
+    Writable binary file that compresses data while it is written.
+
+    Data is buffered in chunks of `chunk_size` bytes and each chunk is compressed as an
+    independent gzip member / bz2, zstd or lz4 frame on a pool of threads (the codecs
+    release the GIL), so compression runs in parallel with the fetch and write loop.
+    Concatenated members/frames are a valid stream for the standard tools
+    (`gzip -d`, `bzip2 -d`, `zstd -d`, `lz4 -d`) and libraries.
+
+    Args:
+        file_path: Path of the output file ("-" for the standard output).
+        codec: Compression codec (gzip, bz2, zstd or lz4).
+        level: Compression level (codec default if None).
+        chunk_size: Bytes compressed at once.
+        workers: Number of compression threads.
+        append: Add the compressed data at the end of the file instead of replacing it.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        codec: str,
+        level: Optional[int] = None,
+        chunk_size: int = WRITE_BUFFER_SIZE,
+        workers: int = COMPRESSION_WORKERS,
+        append: bool = False,
+    ):
+        super().__init__()
+
+        self._codec = codec
+        self._level = level
+        # Arrow codecs are not thread safe, each thread uses its own
+        self._local = threading.local()
+
+        if utils.is_stdout(file_path):
+            self._file = utils.get_output_sink(file_path)
+        else:
+            # pylint: disable-next=consider-using-with
+            self._file = open(file_path, "ab" if append else "wb")
+        self._chunk_size = max(chunk_size, 1)
+        self._buffer = bytearray()
+        self._workers = max(workers, 1)
+        self._pool = ThreadPoolExecutor(
+            max_workers=self._workers, thread_name_prefix="extractsql-compress"
+        )
+        # Compressed chunks in write order
+        self._pending = deque()
+
+    def _compress(self, data: bytes) -> bytes:
+        if self._codec == "bz2":
+            return bz2.compress(data, self._level or 9)
+
+        codec = getattr(self._local, "codec", None)
+        if codec is None:
+            codec = self._local.codec = pa.Codec(self._codec, self._level)
+
+        return codec.compress(data, asbytes=True)
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buffer += data
+
+        while len(self._buffer) >= self._chunk_size:
+            self._submit(bytes(self._buffer[: self._chunk_size]))
+            del self._buffer[: self._chunk_size]
+
+        return len(data)
+
+    def _submit(self, chunk: bytes):
+        self._pending.append(self._pool.submit(self._compress, chunk))
+
+        # Bound the memory used by chunks waiting to be compressed
+        while len(self._pending) > self._workers * 2:
+            self._write_next()
+
+    def _write_next(self):
+        self._file.write(self._pending.popleft().result())
+
+    def close(self):
+        if self.closed:
+            return
+
+        try:
+            if self._buffer:
+                self._submit(bytes(self._buffer))
+                self._buffer.clear()
+
+            while self._pending:
+                self._write_next()
+        finally:
+            self._pool.shutdown()
+            self._file.close()
+            super().close()
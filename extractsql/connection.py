@@ -0,0 +1,70 @@
+"""
+Database connection pool
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+import pyodbc
+
+
+class ConnectionPool:
+    """
+    Keep open connections to reuse them between queries run by the same or other threads.
+
+    Args:
+        connection_string: pyodbc connection string.
+        size: Maximum number of idle connections kept open.
+    """
+
+    def __init__(self, connection_string: str, size: int = 1):
+        self.connection_string = connection_string
+        self.size = max(size, 1)
+        self._idle: list[pyodbc.Connection] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self) -> Iterator[pyodbc.Connection]:
+        """
+        Borrow a connection from the pool (a new one is opened if none is idle).
+        Connections that raised an error are closed instead of returned to the pool, and
+        uncommitted work is rolled back before a connection is reused (as closing it does).
+        """
+
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+
+        if conn is None:
+            conn = pyodbc.connect(self.connection_string)
+
+        try:
+            yield conn
+            conn.rollback()
+        except BaseException:
+            conn.close()
+            raise
+
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(conn)
+                conn = None
+
+        if conn is not None:
+            conn.close()
+
+    def close(self):
+        """
+        Close the idle connections.
+        """
+
+        with self._lock:
+            idle, self._idle = self._idle, []
+
+        for conn in idle:
+            conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
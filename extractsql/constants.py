@@ -6,10 +6,100 @@ Global constants
 FORMAT_XLSX = "xlsx"
 FORMAT_CSV = "csv"
 FORMAT_TXT = "txt"
+FORMAT_PARQUET = "parquet"
+FORMAT_ARROW = "arrow"
+FORMAT_ARROWS = "arrows"
+FORMAT_FEATHER = "feather"
 
 # Param constants
 BATCH_SIZE = 100_000
 ROWS_PER_SHEET = 1_000_000
+CONSTANT_MEMORY_ROWS = 100_000
+
+# Fetch backend constants
+BACKEND_PYODBC = "pyodbc"
+BACKEND_ARROW_ODBC = "arrow-odbc"
+
+# Adaptive batch size constants
+INITIAL_BATCH_SIZE = 1_000
+MIN_BATCH_SIZE = 100
+MAX_BATCH_SIZE = 1_000_000
+BATCH_GROWTH_GAIN = 1.1
+BATCH_GROWTH_HOLD = 8
+BATCH_MEMORY_MARGIN = 0.9
+ROW_SAMPLE_SIZE = 100
+
+# Type mapping constants
+DECIMAL_AS_DECIMAL = "decimal"
+DECIMAL_AS_FLOAT = "float"
+DECIMAL_AS_STRING = "string"
+WIDE_STRING_LENGTH = 4_000
+
+# Pipeline constants
+QUEUE_SIZE = 4
+
+# Partition constants
+PARTITIONS = 4
+
+# Batch constants
+COMMAND_BATCH = "batch"
+BATCH_WORKERS = 4
+MANIFEST_JSON = ".json"
+MANIFEST_CSV = ".csv"
+MANIFEST_YAML = (".yaml", ".yml")
+RETRIES = 2
+RETRY_DELAY = 5
+
+# Target constants
+TARGET_WORKERS = 8
+SOURCE_COLUMN = "source"
+
+# Parameter constants
+PARAMETER_WORKERS = 4
+
+# Incremental constants
+STATE_EXTENSION = ".state.json"
+
+# Checkpoint constants
+CHECKPOINT_EXTENSION = ".checkpoint.json"
+
+# Cache constants
+COMMAND_CONVERT = "convert"
+CACHE_DIR = "~/.cache/extractsql"
+CACHE_TTL = 24 * 60 * 60
+CACHE_MAX_SIZE = 10 * 1024**3
+
+# Output constants
+WRITE_BUFFER_SIZE = 8 * 1024 * 1024
+STDOUT = "-"
+
+# Compression constants
+COMPRESSION_NONE = "none"
+COMPRESSION_CODECS = [
+    COMPRESSION_NONE,
+    "snappy",
+    "gzip",
+    "bz2",
+    "brotli",
+    "lz4",
+    "zstd",
+]
+
+# Codecs supported by flat files, by file extension
+COMPRESSION_EXTENSIONS = {
+    ".gz": "gzip",
+    ".bz2": "bz2",
+    ".zst": "zstd",
+    ".lz4": "lz4",
+}
+COMPRESSION_WORKERS = 4
+
+# Codecs supported by Arrow IPC buffer compression
+IPC_COMPRESSION_CODECS = ["lz4", "zstd"]
+
+# Parquet constants
+ROW_GROUP_SIZE = 1_000_000
+PARQUET_COMPRESSION = "snappy"
 
 # Query file constants
 READ_BYTES = 10_000
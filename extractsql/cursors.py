@@ -0,0 +1,174 @@
+"""
+Cursor-like readers for data that does not come from a database cursor
+"""
+
+from decimal import Decimal
+from datetime import datetime, date, time
+from typing import Iterable, Iterator, Optional
+import pyarrow as pa
+
+
+def next_result_set(cursor) -> bool:
+    """
+    Move the cursor to the next result set that returns columns, skipping the results of
+    statements without data (e.g., INSERT, UPDATE or SET NOCOUNT OFF row counts).
+
+    :param cursor: pyodbc cursor.
+
+    :return: `True` if the cursor is positioned on a result set with columns.
+    :rtype: bool
+    """
+
+    while cursor.nextset():
+        if cursor.description:
+            return True
+
+    return False
+
+
+def describe_schema(schema: pa.Schema) -> list[tuple]:
+    """
+    Return a pyodbc style description of the columns of an Arrow schema, so record batches
+    are exported with the same types as the rows fetched by pyodbc.
+
+    :param schema: Arrow schema of the record batches.
+
+    :return: Description of each column (name, type_code, display_size, internal_size,
+        precision, scale, null_ok).
+    :rtype: list[tuple]
+    """
+
+    return [_describe_field(field) for field in schema]
+
+
+def _describe_field(field: pa.Field) -> tuple:
+    data_type = field.type
+    size = precision = scale = 0
+
+    if pa.types.is_boolean(data_type):
+        type_code = bool
+    elif pa.types.is_integer(data_type):
+        # Precision in digits of the SQL Server type that holds every value
+        type_code = int
+        bits = data_type.bit_width + (0 if pa.types.is_signed_integer(data_type) else 1)
+        precision = 3 if bits == 9 else 5 if bits <= 16 else 10 if bits <= 32 else 19
+    elif pa.types.is_floating(data_type):
+        type_code = float
+        precision = 24 if data_type.bit_width <= 32 else 53
+    elif pa.types.is_decimal(data_type):
+        type_code = Decimal
+        precision, scale = data_type.precision, data_type.scale
+    elif pa.types.is_timestamp(data_type):
+        type_code = datetime
+    elif pa.types.is_date(data_type):
+        type_code = date
+    elif pa.types.is_time(data_type):
+        type_code = time
+    elif pa.types.is_binary(data_type) or pa.types.is_large_binary(data_type):
+        type_code = bytes
+    else:
+        # Text (length unknown) and any other type
+        type_code = str
+
+    return (field.name, type_code, None, size, precision, scale, field.nullable)
+
+
+class ArrowCursor:
+    """
+    Read Arrow record batches through the subset of the pyodbc cursor API used by the
+    exporters (`description`, `fetchmany`, `nextset`, `close`).
+
+    Args:
+        batches: Record batches of a single result set.
+        description: pyodbc style description of the columns.
+    """
+
+    def __init__(self, batches: Iterable[pa.RecordBatch], description):
+        self.description = description
+        self._batches: Iterator[pa.RecordBatch] = iter(batches)
+        self._batch: Optional[pa.RecordBatch] = None
+        self._offset = 0
+
+    def fetch_record_batch(self, size: int) -> Optional[pa.RecordBatch]:
+        """
+        Return the next record batch with at most `size` rows, or None at the end.
+        """
+
+        while self._batch is None or self._offset >= self._batch.num_rows:
+            self._batch = next(self._batches, None)
+            self._offset = 0
+
+            if self._batch is None:
+                return None
+
+        batch = self._batch.slice(self._offset, size)
+        self._offset += batch.num_rows
+
+        return batch
+
+    def fetchmany(self, size: int) -> list[tuple]:
+        """
+        Return the next `size` rows as tuples (fewer at the end of the result).
+        """
+
+        rows = []
+
+        while len(rows) < size:
+            batch = self.fetch_record_batch(size - len(rows))
+
+            if batch is None:
+                break
+
+            rows.extend(zip(*(column.to_pylist() for column in batch.columns)))
+
+        return rows
+
+    def nextset(self) -> bool:
+        """
+        There is only one result set.
+        """
+
+        return False
+
+    def close(self):
+        """
+        Release the batches.
+        """
+
+        self._batches = iter(())
+        self._batch = None
+
+
+class OdbcReaderCursor(ArrowCursor):
+    """
+    Read the result sets of an arrow-odbc `BatchReader`, which fills record batches
+    directly from the ODBC buffers, through the cursor API used by the exporters.
+
+    Args:
+        reader: arrow-odbc batch reader (None if the query did not return a result set).
+        **options: Buffer options of the next result sets, as the ones of the reader
+            (batch_size, max_bytes_per_batch).
+    """
+
+    def __init__(self, reader, **options):
+        super().__init__(
+            reader if reader is not None else (),
+            describe_schema(reader.schema) if reader is not None else None,
+        )
+        self._reader = reader
+        self._options = options
+
+    def nextset(self) -> bool:
+        """
+        Move to the next result set of the reader.
+        """
+
+        if self._reader is None or not self._reader.more_results(**self._options):
+            return False
+
+        self.description = describe_schema(self._reader.schema)
+        self._batches = iter(self._reader)
+        self._batch = None
+        self._offset = 0
+
+        return True
@@ -2,71 +2,445 @@
 Extract data from database
 """
 
+import importlib
+from datetime import datetime
+from functools import partial
+from typing import Callable, Optional, Union
+from pathlib import Path
+from contextlib import ExitStack
 import pyodbc
 from . import utils
-from .tocsv import export_to_csv
-from .toexcel import export_to_excel
-from .constants import FORMAT_XLSX
+from .partition import extract_partitions
+from .incremental import extract_incremental
+from .checkpoint import extract_resumable
+from .fanout import export_to_many
+from .sql import bind_parameters
+from .toarrow import export_to_arrow
+from .cache import CacheEntry, ResultCache, open_entry
+from .cursors import next_result_set
+from .connection import ConnectionPool
+from .backends import get_backend
+from .metrics import Metrics
+from .constants import (
+    FORMAT_XLSX,
+    FORMAT_PARQUET,
+    FORMAT_ARROW,
+    FORMAT_ARROWS,
+    FORMAT_FEATHER,
+    CACHE_TTL,
+    DECIMAL_AS_DECIMAL,
+    STATE_EXTENSION,
+    CHECKPOINT_EXTENSION,
+    COMPRESSION_NONE,
+)
+
+# Export function ("module:function") by output file extension. Exporters are imported
+# when their format is used, so a CSV export does not load XlsxWriter or Parquet
+EXPORTERS = {
+    FORMAT_XLSX: "toexcel:export_to_excel",
+    FORMAT_PARQUET: "toparquet:export_to_parquet",
+    FORMAT_ARROW: "toarrow:export_to_arrow",
+    FORMAT_ARROWS: "toarrow:export_to_arrow",
+    FORMAT_FEATHER: "toarrow:export_to_arrow",
+}
+
+# Export function of files with any other extension (delimited flat files)
+FLAT_FILE_EXPORTER = "tocsv:export_to_csv"
+
+# Formats that write all the result sets in one file
+MULTI_RESULT_FORMATS = (FORMAT_XLSX,)
+
+
+def get_format(output_file: str, output_format: Optional[str] = None) -> str:
+    """
+    Return the format of the output file: `output_format` if specified (e.g., for the
+    standard output), or its extension (lowercase and without the dot).
+    """
+
+    if output_format:
+        return output_format.lower()
+
+    return Path(output_file).suffix.lstrip(".").lower()
+
+
+def get_export_function(
+    output_file: str, output_format: Optional[str] = None
+) -> Callable:
+    """
+    Return the export function for the output format or file extension, importing its
+    module. Files with any other extension are exported as delimited flat files.
+    """
+
+    exporter = EXPORTERS.get(get_format(output_file, output_format), FLAT_FILE_EXPORTER)
+    module, function = exporter.split(":")
+
+    return getattr(importlib.import_module(f".{module}", __package__), function)
 
 
 def extract_to(
-    connstring: utils.ConnString, query_file: str, output_file: str, **kwargs
-):
+    connstring: utils.ConnString,
+    query_file: str,
+    output_file: Union[str, list[str]],
+    pool: Optional[ConnectionPool] = None,
+    **kwargs,
+) -> tuple[int, list[str]]:
     """
     Extract the query result to a file destination.
 
     Args:
         connstring: ConnString class.
         query_file: SQL query file to execute (can be a single-step or multi-step script).
-        file_path: File destination.
-        **kwargs: Additional arguments to pass to export function.
+        file_path: File destination, or several destinations (e.g., in different formats)
+            written from a single run of the query.
+        pool: Connection pool to borrow the connection from (a new connection is opened
+            and closed if not specified).
+        **kwargs: Additional arguments to pass to export function, fetch backend (backend),
+            partition column (partition_column) to run the query in parallel key ranges,
+            export every result set (all_result_sets) instead of the first one, write
+            the metrics of the stages to a JSON file (metrics_file), log them at the end
+            (metrics_log) and every N seconds (metrics_interval), and export the result
+            from the local cache (cache) if it is not older than `cache_ttl` seconds,
+            caching it first otherwise (cache directory cache_dir, size limit cache_size,
+            fail instead of running the query with cache_only), and export only the rows
+            added since the last run (watermark_column, state_file, append), and save a
+            checkpoint after every batch of a flat file ordered by a key, to continue
+            a failed export (resume_key, checkpoint_file, resume). The output file can
+            be a named pipe or "-" for the standard output, with the format of the data
+            (output_format) if the path has no extension. The `:name` placeholders of
+            the query are bound as ODBC parameters to the values of a dict
+            (parameters).
+
+    Returns:
+        tuple[int, list[str]]: Number of rows exported, and files written (e.g., the part
+            files of a split export, or the file of a previous run that was appended to).
     """
 
-    connection_string = utils.get_connection_string(connstring)
+    if not isinstance(output_file, (list, tuple)):
+        output_file = str(output_file)
+    elif len(output_file) == 1:
+        output_file = str(output_file[0])
+    else:
+        output_file = [str(file) for file in output_file]
+
+    metrics = kwargs.get("metrics") or Metrics(
+        query_file=str(query_file), output_file=output_file
+    )
+    kwargs["metrics"] = metrics
+
+    with metrics.report(
+        kwargs.get("metrics_file"),
+        kwargs.get("metrics_log", False),
+        kwargs.get("metrics_interval"),
+    ):
+        metrics.rows = _extract(connstring, query_file, output_file, pool, **kwargs)
+
+        metrics.print_stages()
+
+    return metrics.rows, list(metrics.output_files)
+
+
+def _extract(connstring, query_file, output_file, pool, **kwargs) -> int:
     query = utils.read_file(query_file)
 
+    parameters = kwargs.pop("parameters", None)
+
+    if parameters is not None:
+        if (
+            kwargs.get("partition_column")
+            or kwargs.get("watermark_column")
+            or kwargs.get("resume_key")
+        ):
+            raise ValueError(
+                "Parameterized queries cannot be partitioned, incremental or resumable."
+            )
+
+        # The values are sent with the statement, not formatted into it
+        query, kwargs["params"] = bind_parameters(query, parameters)
+
     # Define the export function to use
-    fn = (
-        export_to_excel
-        if utils.is_extension(output_file, f".{FORMAT_XLSX}")
-        else export_to_csv
+    if isinstance(output_file, list):
+        _check_fanout(**kwargs)
+
+        for file in output_file:
+            if utils.is_pipe(file):
+                _check_pipe(file, **kwargs)
+
+        # The result is fetched once and sent to the export function of every file
+        fn = partial(
+            export_to_many,
+            export_functions=[get_export_function(file) for file in output_file],
+        )
+    else:
+        fn = get_export_function(output_file, kwargs.get("output_format"))
+
+        if utils.is_pipe(output_file):
+            _check_pipe(output_file, **kwargs)
+
+    # Fail before running the query if the codec conflicts with a compression extension
+    for file in output_file if isinstance(output_file, list) else [output_file]:
+        if get_format(file, kwargs.get("output_format")) not in EXPORTERS:
+            utils.get_compression(file, kwargs.get("compression"))
+
+    if kwargs.get("watermark_column"):
+        if kwargs.get("cache") or kwargs.get("partition_column"):
+            raise ValueError("Incremental extractions cannot be cached or partitioned.")
+
+        if (
+            kwargs.get("append")
+            and get_format(output_file, kwargs.get("output_format")) in EXPORTERS
+        ):
+            raise ValueError("Only flat files (csv, txt) can be appended.")
+
+        # One state per query file by default (e.g., query.state.json)
+        if not kwargs.get("state_file"):
+            kwargs["state_file"] = utils.replace_extension(query_file, STATE_EXTENSION)
+
+    if kwargs.get("resume_key"):
+        _check_resumable(output_file, **kwargs)
+
+        # One checkpoint per query file by default (e.g., query.checkpoint.json)
+        if not kwargs.get("checkpoint_file"):
+            kwargs["checkpoint_file"] = utils.replace_extension(
+                query_file, CHECKPOINT_EXTENSION
+            )
+    elif kwargs.get("resume"):
+        raise ValueError("Exports can only be resumed with a key column (resume_key).")
+
+    if kwargs.get("cache") or kwargs.get("cache_only"):
+        return _extract_cached(
+            connstring, query_file, query, output_file, fn, pool, **kwargs
+        )
+
+    return _run_query(
+        utils.get_connection_string(connstring), query, output_file, fn, pool, **kwargs
     )
 
-    try:
-        conn = pyodbc.connect(connection_string)
 
-        cursor = conn.cursor()
+def _check_pipe(output_file, **kwargs):
+    # The standard output and named pipes are written in one pass: they cannot be
+    # appended, truncated, split in several files or written by random access
+    if len(utils.split_values(kwargs.get("output_format") or "")) > 1:
+        raise ValueError("Only one format can be written to a pipe.")
 
-        # Execute the query
-        print("Executing query...")
-        cursor.execute(query)
+    if get_format(output_file, kwargs.get("output_format")) in MULTI_RESULT_FORMATS:
+        raise ValueError("Excel files cannot be written to a pipe.")
 
-        # Loop through all result sets and fetch data if available
-        while True:
-            # Check if the result set has data
-            if cursor.description:
-                print("Exporting data...")
+    if kwargs.get("partition_column") and not kwargs.get("merge_partitions"):
+        raise ValueError("Partitions written to a pipe must be merged.")
 
-                print("-" * 50)
+    if kwargs.get("append") or kwargs.get("resume_key"):
+        raise ValueError("Pipes cannot be appended to or resumed.")
 
-                fn(cursor, output_file, **kwargs)
+    if kwargs.get("all_result_sets"):
+        raise ValueError("Only the first result set can be written to a pipe.")
 
-                print("-" * 50)
 
-                # Exit after fetching the final SELECT result
-                break
+def _check_fanout(**kwargs):
+    if (
+        kwargs.get("partition_column")
+        or kwargs.get("watermark_column")
+        or kwargs.get("resume_key")
+    ):
+        raise ValueError(
+            "Partitioned, incremental or resumable extractions can only write one file."
+        )
 
-            # Move to the next result set or exit if no more
-            if not cursor.nextset():
-                break
+    if kwargs.get("all_result_sets"):
+        raise ValueError("Only the first result set can be written to several files.")
+
+
+def _check_resumable(output_file, **kwargs):
+    if (
+        kwargs.get("cache")
+        or kwargs.get("partition_column")
+        or kwargs.get("watermark_column")
+    ):
+        raise ValueError(
+            "Resumable exports cannot be cached, partitioned or incremental."
+        )
+
+    compression = utils.get_compression(output_file, kwargs.get("compression"))
+
+    # Only an uncompressed flat file can be truncated to its last checkpoint
+    if get_format(output_file) in EXPORTERS or compression not in (
+        None,
+        COMPRESSION_NONE,
+    ):
+        raise ValueError("Only uncompressed flat files (csv, txt) can be resumed.")
+
+
+def _run_query(connection_string, query, output_file, fn, pool, **kwargs) -> int:
+    # Run the query and export its result with the export function
+    if kwargs.get("partition_column"):
+        return extract_partitions(connection_string, query, output_file, fn, **kwargs)
+
+    if kwargs.get("watermark_column"):
+        return extract_incremental(
+            connection_string, query, output_file, fn, pool, **kwargs
+        )
+
+    if kwargs.get("resume_key"):
+        return extract_resumable(
+            connection_string, query, output_file, fn, pool, **kwargs
+        )
+
+    execute = get_backend(kwargs.get("backend"))
+    metrics = kwargs["metrics"]
+    params = kwargs.pop("params", None)
+
+    try:
+        # Execute the query
+        print("Executing query...")
+
+        with ExitStack() as stack:
+            with metrics.timer("execute"):
+                cursor = stack.enter_context(
+                    execute(connection_string, query, params, pool=pool, **kwargs)
+                )
+
+            return _export_result_sets(cursor, output_file, fn, **kwargs)
     except pyodbc.Error:
         print("Database error")
         raise
     except Exception:
         print("Error exporting to file")
         raise
+
+
+def _extract_cached(connstring, query_file, query, output_file, fn, pool, **kwargs):
+    # Export the cached result of the query, running the query to cache it first if
+    # there is no fresh result
+    if kwargs.get("all_result_sets"):
+        raise ValueError("Only the first result set of a query can be cached.")
+
+    result_cache = ResultCache(kwargs.get("cache_dir"), kwargs.get("cache_size"))
+    key = result_cache.get_key(query, connstring, kwargs.get("params"))
+    entry = result_cache.get(key, kwargs.get("cache_ttl", CACHE_TTL))
+
+    if entry is not None:
+        print(
+            f"Using the result cached at {datetime.fromtimestamp(entry.created):%Y-%m-%d %H:%M:%S} "
+            f"({entry.rows} rows)"
+        )
+    elif kwargs.get("cache_only"):
+        raise ValueError(
+            "The result of the query is not cached or it has expired. "
+            "Run the extraction with --cache first."
+        )
+    else:
+        entry = _cache_result(
+            result_cache, key, connstring, query_file, query, pool, **kwargs
+        )
+
+        if entry is None:
+            return 0
+
+    try:
+        with open_entry(entry) as cursor:
+            return _export_result_sets(cursor, output_file, fn, **kwargs)
     finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+        result_cache.evict()
+
+
+def _cache_result(
+    result_cache: ResultCache, key: str, connstring, query_file, query, pool, **kwargs
+) -> Optional[CacheEntry]:
+    # Run the query and spool its first result set to the cache (None if the query did
+    # not return any result set)
+    description = []
+
+    def spool(cursor, file_path, **options):
+        description.extend(tuple(column) for column in cursor.description)
+        return export_to_arrow(cursor, file_path, **options)
+
+    # Spooled uncompressed and with the types of the database, so the result can be
+    # exported later with any options
+    spool_options = {
+        **kwargs,
+        "compression": None,
+        "decimal_as": DECIMAL_AS_DECIMAL,
+        "merge_partitions": True,
+        "output_format": None,
+    }
+    spool_file = result_cache.new_file(key)
+
+    print("Caching the query result...")
+
+    try:
+        rows = _run_query(
+            utils.get_connection_string(connstring),
+            query,
+            spool_file,
+            spool,
+            pool,
+            **spool_options,
+        )
+    except BaseException:
+        Path(spool_file).unlink(missing_ok=True)
+        raise
+
+    # The cache file is not an output of the extraction
+    kwargs["metrics"].remove_output(spool_file)
+
+    if not description:
+        return None
+
+    return result_cache.put(
+        key,
+        spool_file,
+        description,
+        rows,
+        query_file=str(query_file),
+        server=connstring.server,
+        database=connstring.database,
+    )
+
+
+def _export_result_sets(cursor, output_file: str, fn, **kwargs) -> int:
+    # Export the first result set with data, or every one with `all_result_sets`
+
+    # Move to the first result set with data
+    if not cursor.description and not next_result_set(cursor):
+        print("The query did not return any result set")
+        return 0
+
+    if (
+        kwargs.get("all_result_sets")
+        and get_format(output_file, kwargs.get("output_format"))
+        not in MULTI_RESULT_FORMATS
+    ):
+        # Each result set is streamed in turn to a numbered file
+        files = []
+        rows = 0
+
+        while True:
+            files.append(
+                utils.add_suffix_to_filename(output_file, f"_result{len(files) + 1}")
+            )
+
+            print(f"Exporting result set {len(files)}...")
+
+            print("-" * 50)
+
+            rows += fn(cursor, files[-1], **kwargs)
+
+            print("-" * 50)
+
+            if not next_result_set(cursor):
+                break
+
+        print(f"Exported {len(files)} result sets:")
+        for file in files:
+            print(f"  {file}")
+
+        return rows
+
+    print("Exporting data...")
+
+    print("-" * 50)
+
+    rows = fn(cursor, output_file, **kwargs)
+
+    print("-" * 50)
+
+    return rows
@@ -0,0 +1,174 @@
+"""
+Export one query result to several files in a single pass
+"""
+
+import os
+import queue
+from dataclasses import dataclass, field
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+import pyarrow as pa
+from .constants import BATCH_SIZE, QUEUE_SIZE, DECIMAL_AS_DECIMAL
+from .cursors import ArrowCursor
+from .pipeline import get_batch_fetch
+from .schema import SchemaMapper
+from .metrics import Metrics, get_metrics
+
+# Marks the end of the result in the queue of a writer
+_END = object()
+
+# Marks a failed fetch in the queue of a writer
+_ABORT = object()
+
+# Interval to re-check if a writer is still running while its queue is full
+_POLL_SECONDS = 0.1
+
+
+@dataclass
+class _Writer:
+    # Export function writing one output file from its own queue of record batches
+    output_file: str
+    fn: Callable
+    queue: queue.Queue
+    metrics: Metrics = field(default_factory=Metrics)
+    future: Optional[Future] = None
+
+    def batches(self):
+        while True:
+            batch = self.queue.get()
+
+            if batch is _END:
+                return
+
+            if batch is _ABORT:
+                raise RuntimeError("The result could not be fetched from the database.")
+
+            yield batch
+
+    def put(self, item) -> bool:
+        # Block until there is room in the queue, unless the writer stopped (failed)
+        while not self.future.done():
+            try:
+                self.queue.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+
+def export_to_many(
+    cursor,
+    output_files: list[str],
+    batch_size=BATCH_SIZE,
+    export_functions: Optional[list[Callable]] = None,
+    **kwargs,
+) -> int:
+    """
+    Export the current result set of a cursor to several files, fetching it only once.
+
+    Each fetched record batch is sent to every export function, which run at the same time
+    on their own threads and read the batches through an `ArrowCursor`. The queue of each
+    writer is bounded, so the fetch goes at the pace of the slowest writer. A failed writer
+    does not stop the others; its error is raised once they complete.
+
+    Args:
+        cursor: pyodbc cursor positioned on a result set, or a cursor that returns record
+            batches (`fetch_record_batch`).
+        output_files: Path of each output file.
+        batch_size: Number of rows to fetch per batch.
+        export_functions: Export function of each output file.
+        **kwargs: Batches waiting to be written by each writer (queue_size), memory budget
+            in bytes to adapt the batch size (max_memory), metrics of the stages (metrics)
+            and the args of the export functions.
+
+    Returns:
+        int: Number of rows exported.
+    """
+
+    metrics = get_metrics(kwargs)
+    queue_size = max(kwargs.get("queue_size", QUEUE_SIZE), 1)
+
+    # Fetched with the types of the database; each exporter maps them with its own options
+    description = [tuple(column) for column in cursor.description]
+    mapper = SchemaMapper.from_cursor(cursor, decimal_as=DECIMAL_AS_DECIMAL)
+    # The writers share the batches: the ones queued, plus the one fetched and the one
+    # being written
+    fetch = get_batch_fetch(cursor, mapper, batch_size, queue_size + 2, **kwargs)
+
+    writers = [
+        _Writer(output_file, fn, queue.Queue(maxsize=queue_size))
+        for output_file, fn in zip(output_files, export_functions)
+    ]
+
+    print(f"Writing {len(writers)} files:")
+    for writer in writers:
+        print(f"  {writer.output_file}")
+
+    rows = 0
+
+    with ThreadPoolExecutor(
+        max_workers=len(writers), thread_name_prefix="extractsql-write"
+    ) as executor:
+        for position, writer in enumerate(writers):
+            writer.future = executor.submit(
+                writer.fn,
+                ArrowCursor(writer.batches(), description),
+                writer.output_file,
+                batch_size,
+                **{
+                    **kwargs,
+                    # Fetching from the queue is not the fetch of the query
+                    "metrics": writer.metrics,
+                    "pipelined": False,
+                    "progress_desc": os.path.basename(writer.output_file),
+                    "progress_position": position,
+                },
+            )
+
+        try:
+            while any(not writer.future.done() for writer in writers):
+                batch: Optional[pa.RecordBatch] = fetch()
+
+                # A record batch with no rows is not the end of the result
+                if batch is None:
+                    break
+
+                for writer in writers:
+                    writer.put(batch)
+
+                rows += batch.num_rows
+        except BaseException:
+            for writer in writers:
+                writer.put(_ABORT)
+            raise
+        finally:
+            for writer in writers:
+                writer.put(_END)
+
+    errors = []
+
+    for writer in writers:
+        # Write and close stages of every file (rows are counted once per file)
+        for stage in ("write", "close"):
+            if stage in writer.metrics.stages:
+                stage_metrics = writer.metrics.stages[stage]
+                metrics.add(
+                    stage,
+                    stage_metrics.seconds,
+                    stage_metrics.rows,
+                    stage_metrics.batches,
+                    stage_metrics.bytes,
+                )
+
+        metrics.output_files.extend(writer.metrics.output_files)
+
+        error = writer.future.exception()
+
+        if error is not None:
+            print(f"Error writing {writer.output_file}: {error}")
+            errors.append(error)
+
+    if errors:
+        raise errors[0]
+
+    return rows
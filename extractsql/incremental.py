@@ -0,0 +1,229 @@
+"""
+Extract only the rows added since the last run, using a high-water-mark column
+"""
+
+import os
+import json
+from decimal import Decimal
+from datetime import datetime, date
+from contextlib import ExitStack, closing
+from typing import Optional
+import pyodbc
+from . import utils
+from .sql import quote_identifier, wrap_query
+from .connection import ConnectionPool
+from .backends import get_backend
+from .metrics import get_metrics
+
+# Key types stored in state files, with the function that reads them back
+_DECODERS = {
+    "int": int,
+    "float": float,
+    "Decimal": Decimal,
+    "str": str,
+    "datetime": datetime.fromisoformat,
+    "date": date.fromisoformat,
+}
+
+
+def read_state(state_file: str) -> Optional[dict]:
+    """
+    Read the state of the last incremental run (None if there was no run).
+
+    :param state_file: Path of the JSON state file.
+
+    :return: Watermark column (watermark_column), last exported value (watermark), output
+        file (output_file) and columns of the result (columns).
+    :rtype: dict
+    """
+
+    try:
+        with open(state_file, encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+
+    state["watermark"] = decode_value(state["watermark"])
+
+    return state
+
+
+def write_state(state_file: str, state: dict):
+    """
+    Write the state of an incremental run. The file is replaced at once, so a failed run
+    never leaves a partial state.
+
+    :param state_file: Path of the JSON state file.
+    :param state: Watermark column (watermark_column), last exported value (watermark) and
+        any other value to keep.
+    """
+
+    utils.write_json(
+        state_file, {**state, "watermark": encode_value(state["watermark"])}
+    )
+
+
+def encode_value(value) -> dict:
+    """
+    Return a key value (number, date, datetime or text) as a JSON serializable dictionary
+    with its type.
+    """
+
+    type_name = type(value).__name__
+
+    if type_name not in _DECODERS:
+        raise ValueError(
+            f"Values of type '{type_name}' cannot be used as a key. "
+            "Use a numeric, date, datetime or text column."
+        )
+
+    if isinstance(value, date):
+        value = value.isoformat()
+    elif isinstance(value, Decimal):
+        value = str(value)
+
+    return {"type": type_name, "value": value}
+
+
+def decode_value(data: dict):
+    """
+    Return the key value of a dictionary written by `encode_value`.
+    """
+
+    return _DECODERS[data["type"]](data["value"])
+
+
+def get_high_watermark(conn, query: str, column: str):
+    """
+    Return the maximum value of the watermark column (None if there are no rows).
+
+    :param conn: Database connection.
+    :param query: SELECT statement.
+    :param column: Watermark column.
+
+    :return: Maximum value of the column.
+    """
+
+    statement = wrap_query(query, columns=f"MAX({quote_identifier(column)})")
+
+    cursor = conn.cursor()
+    try:
+        return cursor.execute(statement).fetchone()[0]
+    finally:
+        cursor.close()
+
+
+def extract_incremental(
+    connection_string: str,
+    query: str,
+    output_file: str,
+    fn,
+    pool: Optional[ConnectionPool] = None,
+    **kwargs,
+) -> int:
+    """
+    Export the rows with a watermark value greater than the one of the last run, up to the
+    maximum value when the run starts, and save that value in the state file.
+
+    Rows are written to the output file, or appended to the output file of the last run
+    with `append`. Rows with a NULL watermark are not exported.
+
+    Args:
+        connection_string: pyodbc connection string.
+        query: SELECT statement (usable as a derived table).
+        output_file: File destination.
+        fn: Export function.
+        pool: Connection pool to borrow the connections from.
+        **kwargs: Watermark column (watermark_column), path of the state file (state_file),
+            append to the output file of the last run (append) and the args of the export
+            function.
+
+    Returns:
+        int: Number of rows exported.
+    """
+
+    column = kwargs.pop("watermark_column")
+    state_file = kwargs.pop("state_file")
+    append = kwargs.get("append", False)
+
+    state = read_state(state_file)
+
+    if state is not None and state["watermark_column"] != column:
+        raise ValueError(
+            f"The state file {state_file} belongs to the watermark column "
+            f"'{state['watermark_column']}', not '{column}'."
+        )
+
+    low = state["watermark"] if state else None
+
+    with (
+        pool.connection() if pool else closing(pyodbc.connect(connection_string))
+    ) as conn:
+        # Rows added while the export is running are left for the next run
+        high = get_high_watermark(conn, query, column)
+
+    if high is None or (low is not None and high <= low):
+        print(f"No new rows of {column} since {low}")
+        return 0
+
+    name = quote_identifier(column)
+
+    if low is None:
+        print(f"Extracting rows of {column} up to {high}")
+        where, params = f"{name} <= ?", [high]
+    else:
+        print(f"Extracting rows of {column} after {low} up to {high}")
+        where, params = f"{name} > ? AND {name} <= ?", [low, high]
+
+    # Size of the file before appending, to remove the rows of a failed run
+    size = None
+
+    if append and state and os.path.exists(state.get("output_file", "")):
+        output_file = state["output_file"]
+        size = os.path.getsize(output_file)
+        print(f"Appending to {output_file}")
+
+    execute = get_backend(kwargs.get("backend"))
+
+    with ExitStack() as stack:
+        with get_metrics(kwargs).timer("execute"):
+            cursor = stack.enter_context(
+                execute(
+                    connection_string,
+                    wrap_query(query, where=where),
+                    params,
+                    pool=pool,
+                    **kwargs,
+                )
+            )
+
+        columns = [description[0] for description in cursor.description]
+
+        if size is not None and state.get("columns", columns) != columns:
+            raise ValueError(
+                "The columns of the query changed since the last run, rows cannot be "
+                f"appended to {output_file}."
+            )
+
+        try:
+            rows = fn(cursor, output_file, **kwargs)
+        except BaseException:
+            if size is not None:
+                os.truncate(output_file, size)
+            raise
+
+    write_state(
+        state_file,
+        {
+            "watermark_column": column,
+            "watermark": high,
+            "output_file": os.path.abspath(output_file),
+            "columns": columns,
+            "rows": rows,
+            "updated": datetime.now().isoformat(timespec="seconds"),
+        },
+    )
+
+    print(f"Watermark of {column} saved to {state_file}")
+
+    return rows
@@ -5,16 +5,44 @@ Main
 import sys
 import logging
 import argparse
+from pathlib import Path
 from .__version__ import __version__
 from . import utils
-from .extract import extract_to
 from .constants import (
     FORMAT_XLSX,
     FORMAT_CSV,
     FORMAT_TXT,
+    FORMAT_PARQUET,
+    FORMAT_ARROW,
+    FORMAT_ARROWS,
+    FORMAT_FEATHER,
     BATCH_SIZE,
     ROWS_PER_SHEET,
+    CONSTANT_MEMORY_ROWS,
+    QUEUE_SIZE,
+    WRITE_BUFFER_SIZE,
+    DECIMAL_AS_DECIMAL,
+    DECIMAL_AS_FLOAT,
+    DECIMAL_AS_STRING,
+    WIDE_STRING_LENGTH,
+    COMPRESSION_CODECS,
+    COMPRESSION_EXTENSIONS,
+    COMPRESSION_WORKERS,
+    ROW_GROUP_SIZE,
+    PARTITIONS,
     QUERY_FILE_EXTENSION,
+    COMMAND_BATCH,
+    COMMAND_CONVERT,
+    CACHE_TTL,
+    CACHE_MAX_SIZE,
+    BACKEND_PYODBC,
+    BACKEND_ARROW_ODBC,
+    BATCH_WORKERS,
+    RETRIES,
+    RETRY_DELAY,
+    TARGET_WORKERS,
+    SOURCE_COLUMN,
+    PARAMETER_WORKERS,
 )
 
 logging.basicConfig(
@@ -24,9 +52,16 @@ logging.basicConfig(
 )
 
 
-def _ensure_output_file(query_file, output_file, output_format):
+def _ensure_output_file(query_file, output_file, output_format, compression=None):
     new_extension = f".{output_format}" if output_format else ""
 
+    # Keep the compression extension (e.g., ".gz" in "data.csv.gz") at the end
+    compression_extension = ""
+    if output_file:
+        output_file, compression_extension = utils.split_compression_extension(
+            output_file
+        )
+
     if not output_file:
         output_file = utils.replace_extension(query_file, new_extension)
     else:
@@ -38,17 +73,91 @@ def _ensure_output_file(query_file, output_file, output_format):
 
     output_file = utils.add_timestamp_to_filename(output_file)
 
-    return output_file
+    if compression_extension:
+        return output_file + compression_extension
+
+    return _add_compression_extension(output_file, compression)
+
+
+def _ensure_output_files(query_file, output_file, output_format, compression=None):
+    # Output file of each format of a comma separated list (e.g., "xlsx,parquet"), with
+    # the same name and timestamp
+    output_formats = utils.split_values(output_format or "")
+
+    # The standard output and named pipes are written as they are
+    if output_file and utils.is_pipe(output_file):
+        return [output_file]
 
+    if len(output_formats) <= 1:
+        return [
+            _ensure_output_file(query_file, output_file, output_format, compression)
+        ]
+
+    # The extension of the output file is replaced by the one of each format
+    if output_file:
+        output_file, _ = utils.split_compression_extension(output_file)
+        output_file = utils.replace_extension(output_file, "")
+
+    first_file = _ensure_output_file(
+        query_file, output_file, output_formats[0], compression
+    )
+    base_file, _ = utils.split_compression_extension(first_file)
+
+    return [first_file] + [
+        _add_compression_extension(
+            utils.replace_extension(base_file, f".{output_format}"), compression
+        )
+        for output_format in output_formats[1:]
+    ]
 
-def _get_args():
-    parser = argparse.ArgumentParser(description="ExtractSQL Command-Line Tool")
+
+def _add_compression_extension(output_file, compression):
+    # Add the extension of the codec to compressed flat files
+    if not any(
+        utils.is_extension(output_file, f".{flat_format}")
+        for flat_format in (FORMAT_CSV, FORMAT_TXT)
+    ):
+        return output_file
+
+    return output_file + next(
+        (
+            extension
+            for extension, codec in COMPRESSION_EXTENSIONS.items()
+            if codec == compression
+        ),
+        "",
+    )
+
+
+class _ArgumentParser(argparse.ArgumentParser):
+    # Argument parser that keeps its arguments by destination, so manifest jobs can be
+    # parsed with the command-line arguments
+    def __init__(self, *args, **kwargs):
+        self.arguments: dict[str, argparse.Action] = {}
+        super().__init__(*args, **kwargs)
+
+    def add_argument(self, *args, **kwargs):
+        action = super().add_argument(*args, **kwargs)
+        self.arguments[action.dest] = action
+        return action
+
+
+def _get_parser() -> _ArgumentParser:
+    parser = _ArgumentParser(description="ExtractSQL Command-Line Tool")
     parser.add_argument("--version", action="version", version=__version__)
 
     parser.add_argument(
-        "-s", "--server", required=True, help="Server name or IP address"
+        "-s",
+        "--server",
+        required=False,
+        help="Server name or IP address, or comma separated servers to run the query against each of them",
+    )
+    parser.add_argument(
+        "-d",
+        "--database",
+        required=False,
+        help="Database name, or comma separated databases to run the query against each of them",
     )
-    parser.add_argument("-d", "--database", required=True, help="Database name")
     parser.add_argument("-u", "--user", required=False, default=None, help="User name")
     parser.add_argument(
         "-p", "--password", required=False, default=None, help="User password"
@@ -60,16 +169,35 @@ def _get_args():
         "-o",
         "--output_file",
         required=False,
-        help="Path to the output file (if not specified, query file name is used)",
+        help='Path to the output file (if not specified, query file name is used), "-" for the standard output or a named pipe',
     )
 
-    format_values = [FORMAT_XLSX, FORMAT_CSV, FORMAT_TXT]
+    format_values = [
+        FORMAT_XLSX,
+        FORMAT_CSV,
+        FORMAT_TXT,
+        FORMAT_PARQUET,
+        FORMAT_ARROW,
+        FORMAT_ARROWS,
+        FORMAT_FEATHER,
+    ]
+
+    def output_formats(text: str) -> str:
+        for output_format in utils.split_values(text):
+            if output_format not in format_values:
+                raise argparse.ArgumentTypeError(
+                    f"invalid choice: '{output_format}' (choose from {', '.join(format_values)})"
+                )
+        return text
+
     parser.add_argument(
         "-f",
         "--output_format",
-        choices=format_values,
+        type=output_formats,
         required=False,
-        help="Format of the output file (required if output file path is not specified).",
+        help="Format of the output file (required if output file path is not specified). "
+        "Several comma separated formats (e.g., xlsx,parquet) write one file per format "
+        f"from a single run of the query. Choices: {', '.join(format_values)}",
     )
 
     parser.add_argument(
@@ -89,6 +217,22 @@ def _get_args():
         help="Number of rows per batch to read from SQL",
     )
 
+    parser.add_argument(
+        "--backend",
+        choices=[BACKEND_PYODBC, BACKEND_ARROW_ODBC],
+        required=False,
+        default=BACKEND_PYODBC,
+        help="Fetch backend: pyodbc rows or Arrow record batches filled by arrow-odbc (requires arrow-odbc)",
+    )
+
+    parser.add_argument(
+        "--max_memory",
+        required=False,
+        type=utils.parse_bytes,
+        default=None,
+        help='Memory budget for the fetched batches (e.g., "512MB", "2GB"). The batch size is adapted to it instead of using --batch_size',
+    )
+
     parser.add_argument(
         "-r",
         "--rows_per_sheet",
@@ -98,8 +242,433 @@ def _get_args():
         help="Rows per sheet (xlsx)",
     )
 
+    parser.add_argument(
+        "--sheets_per_workbook",
+        required=False,
+        type=int,
+        default=0,
+        help="Split the output in workbooks of this many sheets written in parallel (xlsx, 0 to disable)",
+    )
+
+    parser.add_argument(
+        "-w",
+        "--workers",
+        required=False,
+        type=int,
+        default=None,
+        help="Number of connections of a partitioned extraction (default one per partition), otherwise number of processes writing Excel part workbooks (default number of CPUs)",
+    )
+
+    parser.add_argument(
+        "--partition_column",
+        required=False,
+        default=None,
+        help="Column used to run the query in parallel key ranges (single SELECT query)",
+    )
+
+    parser.add_argument(
+        "--partitions",
+        required=False,
+        type=int,
+        default=PARTITIONS,
+        help="Number of key ranges, split evenly between the minimum and maximum values",
+    )
+
+    parser.add_argument(
+        "--partition_bounds",
+        required=False,
+        type=utils.split_values,
+        default=None,
+        help='Comma separated boundaries between key ranges (e.g., "1000,2000,3000")',
+    )
+
+    parser.add_argument(
+        "--merge_partitions",
+        action="store_true",
+        help="Merge the partitions in one file sorted by the partition column (default one file per partition)",
+    )
+
+    parser.add_argument(
+        "--all_result_sets",
+        action="store_true",
+        help="Export every result set of the script, as sheets of one workbook (xlsx) or numbered files (default only the first one)",
+    )
+
+    parser.add_argument(
+        "--constant_memory",
+        action="store_true",
+        help="Write Excel rows to disk as they are added instead of keeping them in memory (xlsx)",
+    )
+
+    parser.add_argument(
+        "--constant_memory_rows",
+        required=False,
+        type=int,
+        default=CONSTANT_MEMORY_ROWS,
+        help="Use constant memory automatically for results with more rows than this (xlsx, 0 to disable)",
+    )
+
+    parser.add_argument(
+        "--pipelined",
+        action="store_true",
+        help="Fetch the next batch from SQL while the current one is written (csv, txt, parquet, arrow)",
+    )
+
+    parser.add_argument(
+        "--queue_size",
+        required=False,
+        type=int,
+        default=QUEUE_SIZE,
+        help="Maximum batches waiting to be written in pipelined mode",
+    )
+
+    parser.add_argument(
+        "--buffer_size",
+        required=False,
+        type=int,
+        default=WRITE_BUFFER_SIZE,
+        help="Size in bytes of the output file buffer and of each compressed chunk (csv, txt, arrow)",
+    )
+
+    parser.add_argument(
+        "--decimal_as",
+        choices=[DECIMAL_AS_DECIMAL, DECIMAL_AS_FLOAT, DECIMAL_AS_STRING],
+        required=False,
+        default=DECIMAL_AS_DECIMAL,
+        help="Output type for DECIMAL, NUMERIC and MONEY columns (csv, txt, parquet, arrow)",
+    )
+
+    parser.add_argument(
+        "--wide_string_length",
+        required=False,
+        type=int,
+        default=WIDE_STRING_LENGTH,
+        help="Text columns longer than this (or MAX) are handled as wide strings (csv, txt, parquet, arrow)",
+    )
+
+    parser.add_argument(
+        "--row_group_size",
+        required=False,
+        type=int,
+        default=ROW_GROUP_SIZE,
+        help="Rows per row group (parquet)",
+    )
+
+    parser.add_argument(
+        "--compression",
+        choices=COMPRESSION_CODECS,
+        required=False,
+        default=None,
+        help="Compression codec (csv and txt, gzip, bz2, zstd or lz4, inferred from the output file extension; parquet, default snappy; arrow, lz4 or zstd)",
+    )
+
+    parser.add_argument(
+        "--compression_level",
+        required=False,
+        type=int,
+        default=None,
+        help="Compression level (depends on the codec)",
+    )
+
+    parser.add_argument(
+        "--compression_workers",
+        required=False,
+        type=int,
+        default=COMPRESSION_WORKERS,
+        help="Number of threads compressing a flat file (csv, txt)",
+    )
+
+    parser.add_argument(
+        "--dictionary_columns",
+        required=False,
+        type=utils.split_values,
+        default=None,
+        help='Comma separated columns to dictionary encode (parquet). Use "" to disable it (default all columns)',
+    )
+
+    parser.add_argument(
+        "--metrics_file",
+        required=False,
+        default=None,
+        help="Path to a JSON file with the time, rows, batches and bytes of each stage of the export",
+    )
+
+    parser.add_argument(
+        "--metrics_log",
+        action="store_true",
+        help="Log the metrics of the export as a JSON line at the end of the run",
+    )
+
+    parser.add_argument(
+        "--metrics_interval",
+        required=False,
+        type=float,
+        default=None,
+        help="Also log the metrics collected so far every N seconds",
+    )
+
+    parser.add_argument(
+        "--watermark_column",
+        required=False,
+        default=None,
+        help="Export only the rows with a value of this column (e.g., a modified timestamp or identity key) greater than the one of the last run",
+    )
+
+    parser.add_argument(
+        "--state_file",
+        required=False,
+        default=None,
+        help="Path to the file with the last exported value of the watermark column (default <query_file>.state.json)",
+    )
+
+    parser.add_argument(
+        "--append",
+        action="store_true",
+        help="Append the new rows to the output file of the last incremental run instead of writing a new file (csv, txt)",
+    )
+
+    parser.add_argument(
+        "--resume_key",
+        required=False,
+        default=None,
+        help="Export the rows ordered by this unique column and save a checkpoint after every batch, so a failed export can be resumed (csv, txt)",
+    )
+
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue the export of the checkpoint file from its last saved batch",
+    )
+
+    parser.add_argument(
+        "--checkpoint_file",
+        required=False,
+        default=None,
+        help="Path to the checkpoint file of a resumable export (default <query_file>.checkpoint.json)",
+    )
+
+    parser.add_argument(
+        "--param",
+        action="append",
+        metavar="NAME=VALUE",
+        help="Value of a :name placeholder of the query, bound as an ODBC parameter (repeatable); a comma separated list of values runs the query once per value",
+    )
+
+    parser.add_argument(
+        "--param_file",
+        required=False,
+        default=None,
+        help="CSV, JSON or YAML file with the values of the query parameters of each run, and optionally its name",
+    )
+
+    parser.add_argument(
+        "--param_workers",
+        required=False,
+        type=int,
+        default=PARAMETER_WORKERS,
+        help="Number of parameter sets extracted at the same time",
+    )
+
+    parser.add_argument(
+        "--targets_file",
+        required=False,
+        default=None,
+        help="CSV, JSON or YAML file with the server, database and optionally name, user and password of each target to run the query against",
+    )
+
+    parser.add_argument(
+        "--merge_targets",
+        action="store_true",
+        help="Merge the results of the targets in one output, with the name of the target of each row, instead of one file per target",
+    )
+
+    parser.add_argument(
+        "--source_column",
+        required=False,
+        default=SOURCE_COLUMN,
+        help="Name of the column with the target of each row of merged targets",
+    )
+
+    parser.add_argument(
+        "--target_workers",
+        required=False,
+        type=int,
+        default=TARGET_WORKERS,
+        help="Number of targets extracted at the same time",
+    )
+
+    parser.add_argument(
+        "--retries",
+        required=False,
+        type=int,
+        default=RETRIES,
+        help="Number of times a target or parameter set that failed with a database error is extracted again",
+    )
+
+    parser.add_argument(
+        "--retry_delay",
+        required=False,
+        type=utils.parse_duration,
+        default=RETRY_DELAY,
+        help='Time to wait before retrying a target or parameter set (e.g., "5s", "1m"), doubled for each next retry',
+    )
+
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Export the result from the local cache if it is fresh, otherwise run the query and cache its result",
+    )
+
+    parser.add_argument(
+        "--cache_ttl",
+        required=False,
+        type=utils.parse_duration,
+        default=CACHE_TTL,
+        help="Maximum age of a cached result (e.g., 30m, 12h, 7d)",
+    )
+
+    parser.add_argument(
+        "--cache_dir",
+        required=False,
+        default=None,
+        help="Cache directory (default ~/.cache/extractsql)",
+    )
+
+    parser.add_argument(
+        "--cache_size",
+        required=False,
+        type=utils.parse_bytes,
+        default=CACHE_MAX_SIZE,
+        help="Maximum size of the cache (e.g., 10GB); the least recently used results are removed",
+    )
+
+    return parser
+
+
+def _get_args(argv=None):
     # Parse the arguments
-    return parser.parse_args()
+    return _get_parser().parse_args(argv)
+
+
+def _get_batch_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="extractsql batch",
+        description="Run the extractions listed in a manifest file",
+    )
+
+    parser.add_argument(
+        "manifest_file",
+        help="Path to the manifest file (.json, .csv, .yaml or .yml) with the arguments of each job",
+    )
+
+    parser.add_argument(
+        "-w",
+        "--workers",
+        required=False,
+        type=int,
+        default=BATCH_WORKERS,
+        help="Number of jobs running at the same time",
+    )
+
+    parser.add_argument(
+        "--retries",
+        required=False,
+        type=int,
+        default=RETRIES,
+        help="Number of times a job that failed with a database error is run again",
+    )
+
+    parser.add_argument(
+        "--retry_delay",
+        required=False,
+        type=utils.parse_duration,
+        default=RETRY_DELAY,
+        help='Time to wait before retrying a job (e.g., "5s", "1m"), doubled for each next retry',
+    )
+
+    parser.add_argument(
+        "--summary_file",
+        required=False,
+        default=None,
+        help="Path to the summary file with the status, rows and time of each job (.csv or .json)",
+    )
+
+    return parser.parse_args(argv)
+
+
+def _get_arg_error(args):
+    # Return the message of the first invalid argument (None if all are valid)
+    if not args.targets_file and not (args.server and args.database):
+        return "Server (-s) and database (-d) are required if there is no targets file."
+
+    if not args.output_file and not args.output_format:
+        return (
+            "Output format (-f) is required if the output file (-o) was not specified."
+        )
+
+    if args.output_file and utils.is_pipe(args.output_file):
+        output_formats = utils.split_values(args.output_format or "")
+
+        # Named pipes without -f are written with the format of their extension
+        if (output_formats or utils.is_stdout(args.output_file)) and (
+            len(output_formats) != 1 or output_formats[0] == FORMAT_XLSX
+        ):
+            return "One streamable format (-f) is required to write to the standard output or a named pipe (e.g., csv, arrows, parquet)."
+
+    if not utils.is_extension(args.query_file, QUERY_FILE_EXTENSION):
+        return f"Invalid query file extension. Expected '{QUERY_FILE_EXTENSION}'."
+
+    if len(utils.ensure_valid_escape_sequences(args.column_delimiter)) > 1:
+        return 'Column delimiter must be a single character unicode string (e.g., ",", "\\t", "|")'
+
+    return None
+
+
+def _get_export_options(args) -> dict:
+    # Arguments passed to `extract_to`
+    return {
+        # Format of the data written to the standard output or a named pipe
+        "output_format": (
+            args.output_format if utils.is_pipe(args.output_file or "") else None
+        ),
+        "delimiter": utils.ensure_valid_escape_sequences(args.column_delimiter),
+        "batch_size": args.batch_size,
+        "backend": args.backend,
+        "max_memory": args.max_memory,
+        "rows_per_sheet": args.rows_per_sheet,
+        "sheets_per_workbook": args.sheets_per_workbook,
+        "workers": args.workers,
+        "partition_column": args.partition_column,
+        "partitions": args.partitions,
+        "partition_bounds": args.partition_bounds,
+        "merge_partitions": args.merge_partitions,
+        "all_result_sets": args.all_result_sets,
+        "constant_memory": args.constant_memory,
+        "constant_memory_rows": args.constant_memory_rows,
+        "pipelined": args.pipelined,
+        "queue_size": args.queue_size,
+        "buffer_size": args.buffer_size,
+        "decimal_as": args.decimal_as,
+        "wide_string_length": args.wide_string_length,
+        "row_group_size": args.row_group_size,
+        "compression": args.compression,
+        "compression_level": args.compression_level,
+        "compression_workers": args.compression_workers,
+        "dictionary_columns": args.dictionary_columns,
+        "metrics_file": args.metrics_file,
+        "metrics_log": args.metrics_log,
+        "metrics_interval": args.metrics_interval,
+        "watermark_column": args.watermark_column,
+        "state_file": args.state_file,
+        "append": args.append,
+        "resume_key": args.resume_key,
+        "resume": args.resume,
+        "checkpoint_file": args.checkpoint_file,
+        "cache": args.cache,
+        "cache_ttl": args.cache_ttl,
+        "cache_dir": args.cache_dir,
+        "cache_size": args.cache_size,
+    }
 
 
 def main():
@@ -107,7 +676,13 @@ def main():
     Main entry point for the command-line interface.
     """
 
-    args = _get_args()
+    if sys.argv[1:2] == [COMMAND_BATCH]:
+        main_batch(sys.argv[2:])
+        return
+
+    # The convert command exports a cached result, without connecting to the database
+    convert = sys.argv[1:2] == [COMMAND_CONVERT]
+    args = _get_args(sys.argv[2:] if convert else None)
 
     server = args.server
     database = args.database
@@ -116,34 +691,202 @@ def main():
     query_file = args.query_file
     output_file = args.output_file
     output_format = args.output_format
-    column_delimiter = args.column_delimiter
-    batch_size = args.batch_size
-    rows_per_sheet = args.rows_per_sheet
+    compression = args.compression
 
-    if not output_file and not output_format:
-        print(
-            "Output format (-f) is required if the output file (-o) was not specified."
-        )
-        sys.exit(1)
+    if utils.is_stdout(output_file):
+        # The standard output carries the data, messages are printed to stderr
+        sys.stdout = sys.stderr
+
+    error = _get_arg_error(args)
 
-    if not utils.is_extension(query_file, QUERY_FILE_EXTENSION):
-        print(f"Invalid query file extension. Expected '{QUERY_FILE_EXTENSION}'.")
+    if error:
+        print(error)
         sys.exit(1)
 
-    column_delimiter = utils.ensure_valid_escape_sequences(column_delimiter)
+    try:
+        # Log start time
+        start_time = utils.start_process()
 
-    if len(column_delimiter) > 1:
-        print(
-            'Column delimiter must be a single character unicode string (e.g., ",", "\\t", "|")'
+        output_files = _ensure_output_files(
+            query_file, output_file, output_format, compression
         )
+
+        if convert:
+            odbc_driver = None
+        else:
+            odbc_driver = utils.get_connection_driver()
+
+            if odbc_driver is None:
+                raise ValueError("No suitable ODBC driver found.")
+
+            print(f"Connecting using {odbc_driver} driver")
+
+        parameter_sets = _get_parameter_sets(args)
+
+        if args.targets_file or any(
+            len(utils.split_values(value)) > 1 for value in (server, database)
+        ):
+            # The query is run against each server/database
+            succeeded = _extract_targets(
+                args, output_files, odbc_driver, convert, parameter_sets
+            )
+        elif parameter_sets and len(parameter_sets) > 1:
+            # The query is run once per parameter set
+            succeeded = _extract_parameter_sets(
+                args,
+                utils.ConnString(server, database, user, password, odbc_driver),
+                output_files,
+                parameter_sets,
+                convert,
+            )
+        else:
+            connstring = utils.ConnString(server, database, user, password, odbc_driver)
+
+            # Exporters, pyodbc and pyarrow are only loaded to run the extraction, so
+            # --help and --version start fast
+            from .extract import (  # pylint: disable=import-outside-toplevel
+                extract_to,
+            )
+
+            _, output_files = extract_to(
+                connstring,
+                query_file,
+                output_files,
+                cache_only=convert,
+                parameters=parameter_sets[0].values if parameter_sets else None,
+                **_get_export_options(args),
+            )
+            succeeded = None
+
+        # Log end time
+        utils.end_process(start_time)
+    except Exception as e:
+        print(e)
         sys.exit(1)
 
+    if succeeded is not None:
+        if not succeeded:
+            sys.exit(1)
+        return
+
+    if not output_files:
+        print("\nNo data was exported")
+    elif len(output_files) == 1:
+        print("\nData successfully exported to file:", output_files[0])
+    else:
+        print("\nData successfully exported to files:")
+        for output_file in output_files:
+            print(f"  {output_file}")
+
+
+def _get_parameter_sets(args, base_dir: str = None):
+    # Parameter sets of the --param and --param_file args (None if there are none)
+    if not args.param and not args.param_file:
+        return None
+
+    from .parameters import (  # pylint: disable=import-outside-toplevel
+        get_parameter_sets,
+    )
+
+    parameters_file = args.param_file
+
+    if base_dir and parameters_file and utils.is_relative_path(parameters_file):
+        parameters_file = str(Path(base_dir) / parameters_file)
+
+    return get_parameter_sets(args.param, parameters_file)
+
+
+def _extract_parameter_sets(
+    args, connstring, output_files, parameter_sets, cache_only
+) -> bool:
+    # Run the query once per parameter set and print their summary (True if none failed)
+    from . import batch, parameters  # pylint: disable=import-outside-toplevel
+
+    results = parameters.extract_parameter_sets(
+        connstring,
+        args.query_file,
+        output_files,
+        parameter_sets,
+        cache_only=cache_only,
+        parameter_workers=args.param_workers,
+        retries=args.retries,
+        retry_delay=args.retry_delay,
+        **_get_export_options(args),
+    )
+
+    batch.print_summary(results)
+
+    print("\nData exported to files:")
+    for result in results:
+        if result.status == batch.STATUS_OK:
+            print(f"  {result.output_file}")
+
+    return all(result.status == batch.STATUS_OK for result in results)
+
+
+def _extract_targets(
+    args, output_files, odbc_driver, cache_only, parameter_sets=None
+) -> bool:
+    # Run the query against every target and print their summary (True if none failed)
+    from . import batch, targets  # pylint: disable=import-outside-toplevel
+
+    if parameter_sets and len(parameter_sets) > 1:
+        raise ValueError(
+            "Several parameter sets cannot be run against several targets."
+        )
+
+    results = targets.extract_targets(
+        targets.get_targets(
+            args.server,
+            args.database,
+            args.user,
+            args.password,
+            odbc_driver,
+            args.targets_file,
+        ),
+        args.query_file,
+        output_files,
+        cache_only=cache_only,
+        target_workers=args.target_workers,
+        retries=args.retries,
+        retry_delay=args.retry_delay,
+        merge_targets=args.merge_targets,
+        source_column=args.source_column,
+        parameters=parameter_sets[0].values if parameter_sets else None,
+        **_get_export_options(args),
+    )
+
+    batch.print_summary(results)
+
+    if args.merge_targets:
+        print("\nData exported to file:", ", ".join(output_files))
+    else:
+        print("\nData exported to files:")
+        for result in results:
+            if result.status == batch.STATUS_OK:
+                print(f"  {result.output_file}")
+
+    return all(result.status == batch.STATUS_OK for result in results)
+
+
+def main_batch(argv=None):
+    """
+    Entry point of the `batch` command: run the jobs of a manifest in one process, on a
+    pool of workers sharing pooled connections, and write a summary of the jobs.
+    """
+
+    args = _get_batch_args(argv)
+
+    from . import batch  # pylint: disable=import-outside-toplevel
+
+    manifest_file = args.manifest_file
+    workers = args.workers
+    summary_file = args.summary_file
+
     try:
         # Log start time
         start_time = utils.start_process()
 
-        output_file = _ensure_output_file(query_file, output_file, output_format)
-
         odbc_driver = utils.get_connection_driver()
 
         if odbc_driver is None:
@@ -151,16 +894,33 @@ def main():
 
         print(f"Connecting using {odbc_driver} driver")
 
-        connstring = utils.ConnString(server, database, user, password, odbc_driver)
+        # Check every job before running any of them
+        jobs = [
+            _get_job(entry, index, manifest_file, odbc_driver)
+            for index, entry in enumerate(batch.read_manifest(manifest_file), start=1)
+        ]
 
-        extract_to(
-            connstring,
-            query_file,
-            output_file,
-            delimiter=column_delimiter,
-            batch_size=batch_size,
-            rows_per_sheet=rows_per_sheet,
-        )
+        if workers > 1:
+            # Progress bars of parallel jobs would overwrite each other
+            for job in jobs:
+                job.options["progress"] = False
+
+        print(f"Running {len(jobs)} jobs with {workers} workers")
+
+        results = batch.run_jobs(jobs, workers, args.retries, args.retry_delay)
+
+        batch.print_summary(results)
+
+        if not summary_file:
+            summary_file = utils.add_timestamp_to_filename(
+                utils.replace_extension(
+                    utils.add_suffix_to_filename(manifest_file, "_summary"), ".csv"
+                )
+            )
+
+        batch.write_summary(results, summary_file)
+
+        print("\nSummary written to file:", summary_file)
 
         # Log end time
         utils.end_process(start_time)
@@ -168,7 +928,98 @@ def main():
         print(e)
         sys.exit(1)
 
-    print("\nData successfully exported to file:", output_file)
+    if any(result.status == batch.STATUS_FAILED for result in results):
+        sys.exit(1)
+
+
+def _get_job(entry: dict, index: int, manifest_file: str, odbc_driver: str):
+    # Parse the arguments of a manifest job with the command-line parser
+    from . import batch  # pylint: disable=import-outside-toplevel
+
+    entry = dict(entry)
+    name = entry.pop("name", None)
+
+    parser = _get_parser()
+    argv = []
+
+    for key, value in entry.items():
+        action = parser.arguments.get(key)
+
+        if action is None:
+            raise ValueError(f"Job {index}: unknown argument '{key}'.")
+
+        if value is None or value == "":
+            continue
+
+        if key == "param":
+            # Query parameters as an object, a list or one "name=value" string
+            if isinstance(value, dict):
+                value = [f"{name}={item}" for name, item in value.items()]
+            elif not isinstance(value, (list, tuple)):
+                value = [value]
+
+            for item in value:
+                argv.extend(["--param", str(item)])
+            continue
+
+        if action.nargs == 0:
+            # Flags are true or false (also "true", "yes", "1" in CSV manifests)
+            if str(value).lower() in ("true", "yes", "1"):
+                argv.append(f"--{key}")
+            continue
+
+        if isinstance(value, (list, tuple)):
+            value = ",".join(str(item) for item in value)
+
+        argv.extend([f"--{key}", str(value)])
+
+    try:
+        args = parser.parse_args(argv)
+    except SystemExit as e:
+        raise ValueError(f"Job {index}: invalid arguments.") from e
+
+    error = _get_arg_error(args)
+
+    if error:
+        raise ValueError(f"Job {index}: {error}")
+
+    if args.targets_file or any(
+        len(utils.split_values(value)) > 1 for value in (args.server, args.database)
+    ):
+        raise ValueError(f"Job {index}: a job runs against one server and database.")
+
+    # Parameter files are relative to the manifest
+    parameter_sets = _get_parameter_sets(
+        args, str(Path(manifest_file).absolute().parent)
+    )
+
+    if parameter_sets and len(parameter_sets) > 1:
+        raise ValueError(f"Job {index}: a job runs one parameter set.")
+
+    # Query files are relative to the manifest
+    query_file = args.query_file
+    if utils.is_relative_path(query_file):
+        query_file = str(Path(manifest_file).absolute().parent / query_file)
+
+    # Jobs of the same query file write the file of their name (e.g., name_<timestamp>.csv)
+    output_file = args.output_file
+    if not output_file and name:
+        output_file = f"{name}.{utils.split_values(args.output_format)[0]}"
+
+    return batch.Job(
+        name or Path(query_file).stem,
+        utils.ConnString(
+            args.server, args.database, args.user, args.password, odbc_driver
+        ),
+        query_file,
+        _ensure_output_files(
+            query_file, output_file, args.output_format, args.compression
+        ),
+        {
+            **_get_export_options(args),
+            "parameters": parameter_sets[0].values if parameter_sets else None,
+        },
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,241 @@
+"""
+Cumulative time and counters of the stages of an extraction
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from typing import Callable, Optional
+from . import utils
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StageMetrics:
+    """
+    Cumulative time, rows, batches and bytes of a stage.
+    """
+
+    seconds: float = 0.0
+    rows: int = 0
+    batches: int = 0
+    bytes: int = 0
+
+
+class Metrics:
+    """
+    Collect the time, rows, batches and bytes of each stage of an extraction:
+    query execution (execute), `fetchmany` (fetch), conversion of rows to record batches
+    (convert), writing to the output (write) and closing the output (close, e.g. the
+    compression of an Excel workbook). In pipelined mode, the time the fetch waited for the
+    writer (fetch_wait) and the writer waited for the fetch (write_wait) is also collected.
+
+    Stages can be updated from several threads (pipelined fetch, partitions).
+
+    Args:
+        **labels: Values included in the report (e.g., query_file, output_file).
+    """
+
+    def __init__(self, **labels):
+        self.labels = labels
+        self.stages: dict[str, StageMetrics] = {}
+        self.rows: Optional[int] = None
+        # Files written, in order (e.g., the part files of a split export)
+        self.output_files: list[str] = []
+        self.status = "running"
+        self._started = datetime.now()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(
+        self,
+        stage: str,
+        seconds: float = 0.0,
+        rows: int = 0,
+        batches: int = 0,
+        nbytes: int = 0,
+    ):
+        """
+        Add time and counters to a stage.
+        """
+
+        with self._lock:
+            metrics = self.stages.setdefault(stage, StageMetrics())
+            metrics.seconds += seconds
+            metrics.rows += rows
+            metrics.batches += batches
+            metrics.bytes += nbytes
+
+    @contextmanager
+    def timer(self, stage: str):
+        """
+        Add the time spent in the block to a stage.
+        """
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def add_output(self, file_path: str):
+        """
+        Add a written file to the output files, and its size to the bytes of the write
+        stage (pipes have no size).
+        """
+
+        with self._lock:
+            self.output_files.append(file_path)
+
+        if os.path.isfile(file_path):
+            self.add("write", nbytes=os.path.getsize(file_path))
+
+    def remove_output(self, file_path: str):
+        """
+        Remove a file that is not an output of the extraction (e.g., a cache file) from
+        the output files and the bytes of the write stage.
+        """
+
+        with self._lock:
+            if file_path not in self.output_files:
+                return
+
+            self.output_files.remove(file_path)
+
+        if os.path.isfile(file_path):
+            self.add("write", nbytes=-os.path.getsize(file_path))
+
+    def timed(self, stage: str, fn: Callable) -> Callable:
+        """
+        Wrap a function that returns a batch (rows or record batch), adding its time, rows
+        and batches to a stage.
+        """
+
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = fn(*args, **kwargs)
+            rows = len(result) if result is not None else 0
+
+            self.add(stage, time.perf_counter() - start, rows, 1 if rows else 0)
+
+            return result
+
+        return wrapper
+
+    def print_stages(self):
+        """
+        Print the time the fetch and write stages spent working and waiting for each other.
+        A fetch that waits a lot means the writer (local I/O) is the bottleneck; a writer
+        that waits a lot means the database (network) is the bottleneck.
+        """
+
+        with self._lock:
+            seconds = {name: metrics.seconds for name, metrics in self.stages.items()}
+
+        if "fetch" not in seconds:
+            return
+
+        fetch = seconds["fetch"] + seconds.get("convert", 0.0)
+
+        print(
+            f"Fetch: {fetch:.2f}s working, "
+            f"{seconds.get('fetch_wait', 0.0):.2f}s waiting for writer"
+        )
+        print(
+            f"Write: {seconds.get('write', 0.0):.2f}s working, "
+            f"{seconds.get('write_wait', 0.0):.2f}s waiting for fetch"
+        )
+
+    def to_dict(self) -> dict:
+        """
+        Return the metrics as a JSON serializable dictionary.
+        """
+
+        seconds = time.perf_counter() - self._start
+
+        with self._lock:
+            stages = {
+                name: {**asdict(metrics), "seconds": round(metrics.seconds, 3)}
+                for name, metrics in self.stages.items()
+            }
+
+        write = stages.get("write", {})
+        rows = self.rows if self.rows is not None else write.get("rows", 0)
+
+        return {
+            **self.labels,
+            "status": self.status,
+            "started": self._started.isoformat(timespec="seconds"),
+            "seconds": round(seconds, 3),
+            "rows": rows,
+            "rows_per_second": round(rows / seconds) if seconds else 0,
+            "bytes": write.get("bytes", 0),
+            "stages": stages,
+        }
+
+    @contextmanager
+    def report(
+        self,
+        metrics_file: Optional[str] = None,
+        log: bool = False,
+        interval: Optional[float] = None,
+    ):
+        """
+        Report the metrics at the end of the block (also if it fails): write them to a
+        JSON file and/or log them as a single JSON line. With `interval`, the metrics
+        collected so far are also logged every `interval` seconds.
+        """
+
+        stop = threading.Event()
+        reporter = None
+
+        if interval:
+            reporter = threading.Thread(
+                target=self._log_every, args=(interval, stop), daemon=True
+            )
+            reporter.start()
+
+        try:
+            yield self
+            self.status = "ok"
+        except BaseException:
+            self.status = "failed"
+            raise
+        finally:
+            stop.set()
+            if reporter is not None:
+                reporter.join()
+
+            if metrics_file:
+                # Replaced at once, so a scheduler polling the file never reads a
+                # partial document
+                utils.write_json(metrics_file, self.to_dict())
+
+            if log:
+                self.log()
+
+    def log(self):
+        """
+        Log the metrics as a single JSON line.
+        """
+
+        logger.info("metrics %s", json.dumps(self.to_dict()))
+
+    def _log_every(self, interval: float, stop: threading.Event):
+        while not stop.wait(interval):
+            self.log()
+
+
+def get_metrics(kwargs: dict) -> Metrics:
+    """
+    Return the metrics of the export args (metrics), or new metrics that are not reported
+    if there are none.
+    """
+
+    return kwargs.get("metrics") or Metrics()
@@ -0,0 +1,179 @@
+"""
+Run a query template once per set of parameter values
+"""
+
+import re
+import itertools
+from dataclasses import dataclass
+from typing import Optional
+from . import utils
+from .batch import Job, JobResult, read_manifest, run_jobs
+from .sql import get_parameter_names
+from .constants import PARAMETER_WORKERS, RETRIES, RETRY_DELAY
+
+
+@dataclass
+class ParameterSet:
+    """
+    Values of the `:name` placeholders of a query, with the name that identifies its
+    output files.
+    """
+
+    name: str
+    values: dict
+
+
+def parse_parameters(params: Optional[list[str]]) -> dict[str, list[str]]:
+    """
+    Parse `name=value` arguments, where the value can be a comma separated list of values.
+
+    :param params: Arguments (e.g., ["start=2024-01-01", "region=east,west"]).
+
+    :return: Values of each parameter name.
+    :rtype: dict[str, list[str]]
+    """
+
+    parameters = {}
+
+    for param in params or []:
+        name, separator, value = param.partition("=")
+        name = name.strip().lstrip(":")
+
+        if not separator or not name:
+            raise ValueError(
+                f"Invalid parameter '{param}'. Expected 'name=value' (e.g., start=2024-01-01)."
+            )
+
+        parameters[name] = utils.split_values(value) or [value.strip()]
+
+    return parameters
+
+
+def get_parameter_sets(
+    params: Optional[list[str]] = None, parameters_file: str = None
+) -> list[ParameterSet]:
+    """
+    Return the parameter sets of `name=value` arguments (every combination of the values
+    of comma separated lists), or of a parameters file.
+
+    :param params: `name=value` arguments (defaults of the sets of the parameters file).
+    :param parameters_file: CSV, JSON or YAML file with the values of each set, and
+        optionally its name.
+
+    :return: Parameter sets, with distinct names.
+    :rtype: list[ParameterSet]
+    """
+
+    parameters = parse_parameters(params)
+    combinations = [
+        dict(zip(parameters, values))
+        for values in itertools.product(*parameters.values())
+    ]
+
+    if parameters_file:
+        entries = [
+            {**combination, **entry}
+            for entry in read_manifest(parameters_file)
+            for combination in combinations
+        ]
+    else:
+        entries = combinations
+
+    sets = []
+
+    for entry in entries:
+        values = {key: value for key, value in entry.items() if key != "name"}
+        name = entry.get("name") or "_".join(str(value) for value in values.values())
+
+        # Used in file names
+        sets.append(ParameterSet(re.sub(r"[^\w.-]+", "_", str(name)), values))
+
+    names = [parameter_set.name for parameter_set in sets]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+
+    if duplicates:
+        raise ValueError(f"Duplicate parameter set names: {', '.join(duplicates)}.")
+
+    return sets
+
+
+def extract_parameter_sets(
+    connstring: utils.ConnString,
+    query_file: str,
+    output_files: list[str],
+    parameter_sets: list[ParameterSet],
+    **kwargs,
+) -> list[JobResult]:
+    """
+    Run the query once per parameter set, at the same time on pooled connections, each
+    set being written to its own files (file_<set>.csv, ...). The values are bound as
+    ODBC parameters.
+
+    Sets that fail with a database error are retried; a failed set does not stop the
+    others.
+
+    Args:
+        connstring: ConnString class.
+        query_file: SQL query file with `:name` placeholders.
+        output_files: File destinations.
+        parameter_sets: Values of the placeholders of each run.
+        **kwargs: Number of sets running at the same time (parameter_workers), retries of
+            a failed set (retries) and seconds before the first retry (retry_delay), and
+            the args of `extract_to`.
+
+    Returns:
+        list[JobResult]: Result of each set, in the order of the sets.
+    """
+
+    workers = kwargs.pop("parameter_workers", None) or PARAMETER_WORKERS
+    retries = kwargs.pop("retries", RETRIES)
+    retry_delay = kwargs.pop("retry_delay", RETRY_DELAY)
+
+    if any(utils.is_pipe(output_file) for output_file in output_files):
+        raise ValueError("Several parameter sets cannot be written to a pipe.")
+
+    # Check every set before running any of them
+    names = get_parameter_names(utils.read_file(query_file))
+
+    for parameter_set in parameter_sets:
+        missing = [name for name in names if name not in parameter_set.values]
+
+        if missing:
+            raise ValueError(
+                f"Parameter set {parameter_set.name}: missing query parameters: "
+                f"{', '.join(missing)}."
+            )
+
+    workers = min(workers, len(parameter_sets))
+
+    if workers > 1:
+        # Progress bars of parallel sets would overwrite each other
+        kwargs["progress"] = False
+
+    print(f"Extracting {len(parameter_sets)} parameter sets with {workers} workers")
+
+    metrics_file = kwargs.pop("metrics_file", None)
+
+    jobs = [
+        Job(
+            parameter_set.name,
+            connstring,
+            query_file,
+            [
+                utils.add_suffix_to_filename(output_file, f"_{parameter_set.name}")
+                for output_file in output_files
+            ],
+            {
+                **kwargs,
+                "parameters": parameter_set.values,
+                "metrics_file": metrics_file
+                and utils.add_suffix_to_filename(
+                    metrics_file, f"_{parameter_set.name}"
+                ),
+            },
+        )
+        for parameter_set in parameter_sets
+    ]
+
+    # One connection pool of `workers` connections is shared by the sets
+    return run_jobs(jobs, workers, retries, retry_delay)
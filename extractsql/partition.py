@@ -0,0 +1,265 @@
+"""
+Extract a query in key ranges on parallel connections
+"""
+
+import tempfile
+from pathlib import Path
+from contextlib import ExitStack
+from decimal import Decimal
+from datetime import datetime, date
+from concurrent.futures import ThreadPoolExecutor
+import pyarrow as pa
+from . import utils
+from .sql import quote_identifier, wrap_query
+from .cursors import ArrowCursor
+from .connection import ConnectionPool
+from .backends import get_backend
+from .metrics import get_metrics
+from .toarrow import export_to_arrow
+from .constants import PARTITIONS
+
+
+def get_partition_bounds(conn, query: str, column: str, partitions: int) -> list:
+    """
+    Split the range of values of a column in `partitions` ranges of the same width.
+
+    :param conn: Database connection.
+    :param query: SELECT statement.
+    :param column: Partition column (numeric, date or datetime).
+    :param partitions: Number of partitions.
+
+    :return: Boundaries between partitions (one less than the number of partitions,
+        fewer if the range is too small).
+    :rtype: list
+    """
+
+    name = quote_identifier(column)
+    statement = wrap_query(query, columns=f"MIN({name}), MAX({name})")
+
+    cursor = conn.cursor()
+    try:
+        low, high = cursor.execute(statement).fetchone()
+    finally:
+        cursor.close()
+
+    if low is None:
+        # No rows (or only NULL keys)
+        return []
+
+    return split_range(low, high, partitions)
+
+
+def split_range(low, high, partitions: int) -> list:
+    """
+    Return the boundaries that split [low, high] in `partitions` ranges of the same width.
+
+    :param low: Minimum value (int, float, Decimal, date or datetime).
+    :param high: Maximum value.
+    :param partitions: Number of partitions.
+
+    :return: Distinct boundaries between `low` and `high`.
+    :rtype: list
+    """
+
+    if isinstance(low, bool) or not isinstance(
+        low, (int, float, Decimal, date, datetime)
+    ):
+        raise ValueError(
+            f"Cannot split values of type '{type(low).__name__}' automatically. "
+            "Use partition bounds instead."
+        )
+
+    bounds = []
+
+    for index in range(1, partitions):
+        if isinstance(low, int):
+            bound = low + (high - low) * index // partitions
+        else:
+            bound = low + (high - low) * index / partitions
+
+        if low < bound <= high and bound not in bounds:
+            bounds.append(bound)
+
+    return bounds
+
+
+def get_partition_filters(column: str, bounds: list) -> list[tuple[str, list]]:
+    """
+    Return the condition and parameters of each partition.
+
+    Partitions cover all the values: the first one takes values lower than the first
+    boundary (and NULL keys), the last one values from the last boundary.
+
+    :param column: Partition column.
+    :param bounds: Sorted boundaries between partitions.
+
+    :return: List of (condition, parameters).
+    :rtype: list[tuple[str, list]]
+    """
+
+    if not bounds:
+        return [("", [])]
+
+    name = quote_identifier(column)
+
+    filters = [(f"({name} < ? OR {name} IS NULL)", [bounds[0]])]
+
+    for lower, upper in zip(bounds, bounds[1:]):
+        filters.append((f"{name} >= ? AND {name} < ?", [lower, upper]))
+
+    filters.append((f"{name} >= ?", [bounds[-1]]))
+
+    return filters
+
+
+def extract_partitions(
+    connection_string: str, query: str, output_file: str, fn, **kwargs
+):
+    """
+    Run the query once per key range of the partition column on parallel connections.
+
+    Each partition is written to its own part file (file_part1.csv, ...) or, with
+    `merge_partitions`, to a temporary Arrow file that is exported in partition order to the
+    output file (sorted by the partition column) while the next partitions are running.
+
+    Args:
+        connection_string: pyodbc connection string.
+        query: SELECT statement (usable as a derived table).
+        output_file: File destination.
+        fn: Export function.
+        **kwargs: Partition column (partition_column), number of partitions (partitions),
+            explicit boundaries between partitions (partition_bounds), merge partitions in
+            one file (merge_partitions), number of connections (workers, not passed to the
+            export function) and the args of the export function.
+
+    Returns:
+        int: Number of rows exported.
+    """
+
+    column = kwargs.pop("partition_column")
+    partitions = kwargs.pop("partitions", None) or PARTITIONS
+    bounds = kwargs.pop("partition_bounds", None)
+    merge = kwargs.pop("merge_partitions", False)
+    # Connections of the partitions, not the workers of the export function (e.g., Excel
+    # part processes)
+    workers = kwargs.pop("workers", None) or partitions
+
+    with ConnectionPool(connection_string, workers) as pool, ThreadPoolExecutor(
+        max_workers=workers
+    ) as executor:
+        if bounds is None:
+            with pool.connection() as conn:
+                bounds = get_partition_bounds(conn, query, column, partitions)
+
+        filters = get_partition_filters(column, bounds)
+        order_by = quote_identifier(column) if merge else None
+
+        print(
+            f"Extracting {len(filters)} partitions of {column} with {workers} connections"
+        )
+
+        def submit(index, where, params, file_path, export, **options):
+            return executor.submit(
+                _extract_partition,
+                pool,
+                wrap_query(query, where=where, order_by=order_by),
+                params,
+                file_path,
+                export,
+                progress_desc=f"Partition {index}",
+                progress_position=index - 1,
+                **options,
+            )
+
+        if not merge:
+            parts = [
+                utils.add_suffix_to_filename(output_file, f"_part{index}")
+                for index in range(1, len(filters) + 1)
+            ]
+            futures = [
+                submit(index, where, params, part, fn, **kwargs)
+                for index, ((where, params), part) in enumerate(
+                    zip(filters, parts), start=1
+                )
+            ]
+
+            # Wait for the partitions (raises the error of a failed partition)
+            rows = sum(future.result()[1] for future in futures)
+
+            # Parts are added to the output files as they complete: list them in order
+            metrics = get_metrics(kwargs)
+            metrics.output_files = [
+                file for file in metrics.output_files if file not in parts
+            ] + parts
+
+            print(f"Extracted {len(parts)} files:")
+            for part in parts:
+                print(f"  {part}")
+
+            return rows
+
+        with tempfile.TemporaryDirectory(dir=Path(output_file).parent) as spool_dir:
+            # Partitions are spooled uncompressed. The metrics are the ones of the merge
+            # (fetch includes waiting for the partitions), not the ones of the spools
+            spool_options = {
+                **kwargs,
+                "compression": None,
+                "metrics": None,
+                "output_format": None,
+            }
+            spools = [
+                str(Path(spool_dir, f"partition{index}.arrow"))
+                for index in range(1, len(filters) + 1)
+            ]
+            futures = [
+                submit(index, where, params, spool, export_to_arrow, **spool_options)
+                for index, ((where, params), spool) in enumerate(
+                    zip(filters, spools), start=1
+                )
+            ]
+
+            # Wait for the first partition to know the columns
+            description, _ = futures[0].result()
+
+            print("Merging partitions...")
+
+            # Partitions are exported in order while the next ones are still running
+            cursor = ArrowCursor(_read_spools(futures, spools), description)
+            return fn(
+                cursor,
+                output_file,
+                progress_desc="Merging",
+                progress_position=len(filters),
+                **kwargs,
+            )
+
+
+def _extract_partition(
+    pool: ConnectionPool, statement: str, params: list, file_path: str, fn, **kwargs
+) -> tuple[list[tuple], int]:
+    # Export one partition and return the description of its columns and its rows
+    execute = get_backend(kwargs.get("backend"))
+
+    with ExitStack() as stack:
+        with get_metrics(kwargs).timer("execute"):
+            cursor = stack.enter_context(
+                execute(pool.connection_string, statement, params, pool=pool, **kwargs)
+            )
+
+        description = [tuple(column) for column in cursor.description]
+
+        rows = fn(cursor, file_path, **kwargs)
+
+        return description, rows
+
+
+def _read_spools(futures, spools):
+    # Record batches of the spooled partitions, in partition order
+    for future, spool in zip(futures, spools):
+        future.result()
+
+        with pa.OSFile(spool, "rb") as source:
+            reader = pa.ipc.open_file(source)
+
+            for index in range(reader.num_record_batches):
+                yield reader.get_batch(index)
@@ -0,0 +1,259 @@
+"""
+Fetch/write pipeline
+"""
+
+import time
+import queue
+import threading
+from functools import partial
+from typing import Any, Callable, Optional
+import pyarrow as pa
+from tqdm import tqdm
+from .constants import BATCH_SIZE, QUEUE_SIZE
+from .schema import SchemaMapper
+from .batching import get_fetch, get_batches_in_memory
+from .metrics import Metrics, get_metrics
+
+# Marks the end of the stream in the pipeline queue
+_END = object()
+
+# Interval to re-check the stop flag while a stage is blocked
+_POLL_SECONDS = 0.1
+
+
+def run_pipeline(
+    fetch: Callable[[], Optional[Any]],
+    write: Callable[[Any], None],
+    pipelined: bool = False,
+    queue_size: int = QUEUE_SIZE,
+    metrics: Optional[Metrics] = None,
+) -> int:
+    """
+    Move batches from `fetch` to `write` until `fetch` returns an empty batch.
+
+    The work of the stages is measured by `fetch` and `write` themselves (e.g., with
+    `Metrics.timed`). In pipelined mode, the time each stage spends blocked on the other
+    one is added to the fetch_wait and write_wait stages of the metrics.
+
+    Args:
+        fetch: Returns the next batch, or None when there are no more rows.
+        write: Writes a batch.
+        pipelined: If `True`, fetch runs on its own thread and fills a bounded queue that is
+            drained by the writer, so fetching and writing overlap.
+        queue_size: Maximum number of batches waiting to be written (pipelined mode).
+        metrics: Metrics of the stages.
+
+    Returns:
+        int: Number of rows written.
+    """
+
+    if pipelined:
+        return _run_pipelined(fetch, write, max(queue_size, 1), metrics or Metrics())
+
+    return _run_sequential(fetch, write)
+
+
+def _run_sequential(fetch, write) -> int:
+    rows = 0
+
+    while True:
+        batch = fetch()
+
+        if batch is None:
+            break
+
+        write(batch)
+        rows += len(batch)
+
+    return rows
+
+
+def _run_pipelined(fetch, write, queue_size: int, metrics: Metrics) -> int:
+    rows = 0
+    batches = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors = []
+
+    def put(item) -> bool:
+        # Block until there is room in the queue, unless the writer gave up
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def producer():
+        try:
+            while not stop.is_set():
+                batch = fetch()
+
+                if batch is None:
+                    break
+
+                start = time.perf_counter()
+                queued = put(batch)
+                metrics.add("fetch_wait", time.perf_counter() - start)
+
+                if not queued:
+                    return
+        except BaseException as e:  # pylint: disable=broad-except
+            errors.append(e)
+        finally:
+            put(_END)
+
+    fetcher = threading.Thread(target=producer, name="extractsql-fetch", daemon=True)
+    fetcher.start()
+
+    try:
+        while True:
+            start = time.perf_counter()
+            batch = batches.get()
+            metrics.add("write_wait", time.perf_counter() - start)
+
+            if batch is _END:
+                break
+
+            write(batch)
+            rows += len(batch)
+    finally:
+        # Release the fetch thread if the writer failed
+        stop.set()
+        fetcher.join()
+
+    if errors:
+        raise errors[0]
+
+    return rows
+
+
+def get_batch_fetch(
+    cursor,
+    mapper: SchemaMapper,
+    batch_size: int = BATCH_SIZE,
+    batches: int = 1,
+    **kwargs,
+) -> Callable[[], Optional[pa.RecordBatch]]:
+    """
+    Return a function that fetches the next record batch of the current result set of a
+    cursor, with the schema of the mapper (None at the end).
+
+    Cursors with `fetch_record_batch` (columnar backends) return record batches directly;
+    the rows of other cursors are converted by the mapper.
+
+    Args:
+        cursor: pyodbc cursor positioned on a result set, or a cursor that returns record
+            batches (`fetch_record_batch`).
+        mapper: Schema mapper for the result set.
+        batch_size: Number of rows to fetch per batch.
+        batches: Number of batches held in memory at the same time.
+        **kwargs: Memory budget in bytes to adapt the batch size (max_memory) and metrics
+            of the stages (metrics).
+
+    Returns:
+        Fetch function.
+    """
+
+    metrics = get_metrics(kwargs)
+
+    if hasattr(cursor, "fetch_record_batch"):
+        # Columnar cursors return record batches, without creating row objects
+        return metrics.timed(
+            "fetch", partial(_fetch_record_batch, cursor, mapper.schema, batch_size)
+        )
+
+    fetchmany = metrics.timed("fetch", get_fetch(cursor, batch_size, batches, **kwargs))
+    to_batch = metrics.timed("convert", mapper.to_batch)
+
+    def fetch():
+        # Fetch rows in batches
+        rows = fetchmany()
+
+        if not rows:
+            return None
+
+        # Convert rows to a typed pyarrow.RecordBatch
+        return to_batch(rows)
+
+    return fetch
+
+
+def write_batches(
+    cursor,
+    mapper: SchemaMapper,
+    write: Callable[[pa.RecordBatch], None],
+    batch_size: int = BATCH_SIZE,
+    **kwargs,
+) -> int:
+    """
+    Fetch the current result set of a cursor as record batches and pass them to `write`,
+    showing the progress.
+
+    Args:
+        cursor: pyodbc cursor positioned on a result set, or a cursor that returns record
+            batches (`fetch_record_batch`).
+        mapper: Schema mapper for the result set.
+        write: Writes a record batch to the output.
+        batch_size: Number of rows to fetch per batch.
+        **kwargs: Additional args like fetch on a separate thread while writing (pipelined),
+            batches waiting to be written (queue_size), show the progress bar (progress),
+            memory budget in bytes to adapt the batch size (max_memory) and metrics of the
+            stages (metrics).
+
+    Returns:
+        int: Number of rows written.
+    """
+
+    pipelined = kwargs.get("pipelined", False)
+    metrics = get_metrics(kwargs)
+    queue_size = kwargs.get("queue_size", QUEUE_SIZE)
+
+    fetch = get_batch_fetch(
+        cursor, mapper, batch_size, get_batches_in_memory(**kwargs), **kwargs
+    )
+
+    # Initialize the counter
+    counter = tqdm(
+        total=0,
+        desc=kwargs.get("progress_desc", "Writing file"),
+        unit="rows",
+        leave=True,
+        position=kwargs.get("progress_position"),
+        disable=not kwargs.get("progress", True),
+    )
+
+    def write_batch(batch: pa.RecordBatch):
+        start = time.perf_counter()
+        write(batch)
+        metrics.add("write", time.perf_counter() - start, batch.num_rows, 1)
+
+        # Update the row counter
+        counter.update(batch.num_rows)
+
+    rows = run_pipeline(
+        fetch,
+        write_batch,
+        pipelined=pipelined,
+        queue_size=queue_size,
+        metrics=metrics,
+    )
+
+    counter.close()
+
+    print(f"Processed {rows} rows")
+
+    return rows
+
+
+def _fetch_record_batch(
+    cursor, schema: pa.Schema, batch_size: int
+) -> Optional[pa.RecordBatch]:
+    batch = cursor.fetch_record_batch(batch_size)
+
+    if batch is None or batch.schema.equals(schema):
+        return batch
+
+    # The mapped types only widen the types of the batch (or truncate sub-microsecond
+    # times)
+    return batch.cast(schema, safe=False)
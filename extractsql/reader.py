@@ -0,0 +1,154 @@
+"""
+Read query results as Arrow record batches in the calling process
+"""
+
+from dataclasses import replace
+from typing import Iterator, Optional, Union
+import pyarrow as pa
+from . import utils
+from .connection import ConnectionPool
+from .backends import get_backend
+from .batching import get_fetch
+from .cursors import next_result_set
+from .pipeline import get_batch_fetch
+from .schema import SchemaMapper
+from .constants import BATCH_SIZE
+
+
+def iter_batches(
+    connstring: Union[utils.ConnString, str],
+    query: str,
+    batch_size: int = BATCH_SIZE,
+    params: Optional[list] = None,
+    pool: Optional[ConnectionPool] = None,
+    **kwargs,
+) -> Iterator[Union[pa.RecordBatch, list]]:
+    """
+    Run a query and yield its rows as they are fetched, as Arrow record batches with the
+    column types of the exporters (or lists of rows with `as_rows`), without writing a
+    file. Only one batch is held in memory at a time.
+
+    The connection is closed (or returned to the pool) when the generator is exhausted,
+    closed or garbage collected, so results can be read partially:
+
+        with closing(iter_batches(connstring, query)) as batches:
+            for batch in batches:
+                ...
+
+    Args:
+        connstring: ConnString class (the ODBC driver is looked up if it is not set), or
+            pyodbc connection string.
+        query: SQL statement or script (e.g., read with `utils.read_file`).
+        batch_size: Number of rows to fetch per batch.
+        params: Values of the `?` parameters of the query.
+        pool: Connection pool to borrow the connection from (a new connection is opened
+            and closed if not specified).
+        **kwargs: Fetch backend (backend), read the batches of every result set in turn
+            (all_result_sets) instead of the first one, yield lists of rows (as_rows),
+            DECIMAL/MONEY conversion (decimal_as), length of wide text columns
+            (wide_string_length) and memory budget in bytes to adapt the batch size
+            (max_memory).
+
+    Yields:
+        pa.RecordBatch: Rows of a batch (list of rows with `as_rows`).
+    """
+
+    all_result_sets = kwargs.pop("all_result_sets", False)
+
+    for batches in iter_result_sets(
+        connstring, query, batch_size, params, pool, **kwargs
+    ):
+        yield from batches
+
+        if not all_result_sets:
+            break
+
+
+def iter_result_sets(
+    connstring: Union[utils.ConnString, str],
+    query: str,
+    batch_size: int = BATCH_SIZE,
+    params: Optional[list] = None,
+    pool: Optional[ConnectionPool] = None,
+    **kwargs,
+) -> Iterator[Iterator[Union[pa.RecordBatch, list]]]:
+    """
+    Run a query (e.g., a multi-step script) and yield an iterator over the batches of each
+    result set with columns. Moving to the next result set discards the rows of the
+    previous one that were not read.
+
+    Args:
+        connstring: ConnString class, or pyodbc connection string.
+        query: SQL statement or script.
+        batch_size: Number of rows to fetch per batch.
+        params: Values of the `?` parameters of the query.
+        pool: Connection pool to borrow the connection from.
+        **kwargs: Fetch backend (backend), yield lists of rows (as_rows) and the type
+            mapping and batch size args of `iter_batches`.
+
+    Yields:
+        Iterator: Record batches (or lists of rows) of a result set.
+    """
+
+    if isinstance(connstring, utils.ConnString):
+        if connstring.driver is None:
+            connstring = replace(connstring, driver=utils.get_connection_driver())
+
+            if connstring.driver is None:
+                raise ValueError("No suitable ODBC driver found.")
+
+        connection_string = utils.get_connection_string(connstring)
+    else:
+        connection_string = connstring
+
+    execute = get_backend(kwargs.get("backend"))
+
+    # The arrow-odbc backend fetches batches of the requested size
+    kwargs["batch_size"] = batch_size
+
+    with execute(connection_string, query, params, pool=pool, **kwargs) as cursor:
+        if not cursor.description and not next_result_set(cursor):
+            return
+
+        # Index of the result set the cursor is positioned on (None once it is closed)
+        position = [0]
+
+        try:
+            while True:
+                yield _iter_result_set(cursor, position, position[0], **kwargs)
+
+                if not next_result_set(cursor):
+                    return
+
+                position[0] += 1
+        finally:
+            position[0] = None
+
+
+def _iter_result_set(cursor, position: list, index: int, **kwargs):
+    # Batches of a result set of the cursor, until the cursor moves to the next result set
+    batch_size = kwargs.pop("batch_size")
+
+    if position[0] != index:
+        return
+
+    if kwargs.get("as_rows"):
+        fetchmany = get_fetch(cursor, batch_size, **kwargs)
+
+        def fetch():
+            # No rows is the end of the result
+            return fetchmany() or None
+
+    else:
+        fetch = get_batch_fetch(
+            cursor, SchemaMapper.from_cursor(cursor, **kwargs), batch_size, **kwargs
+        )
+
+    while position[0] == index:
+        batch = fetch()
+
+        # A record batch with no rows is not the end of the result
+        if batch is None:
+            return
+
+        yield batch
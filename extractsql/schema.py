@@ -0,0 +1,186 @@
+"""
+Map query result columns to an Arrow schema
+"""
+
+import uuid
+from decimal import Decimal
+from datetime import datetime, date, time
+from typing import Callable, Optional
+import pyarrow as pa
+from .constants import (
+    DECIMAL_AS_DECIMAL,
+    DECIMAL_AS_FLOAT,
+    DECIMAL_AS_STRING,
+    WIDE_STRING_LENGTH,
+)
+
+# Largest precision supported by decimal128
+_MAX_DECIMAL_PRECISION = 38
+
+# Values converted before building the array (None means no conversion needed)
+Converter = Optional[Callable]
+
+
+def _to_str(value):
+    return None if value is None else str(value)
+
+
+def _to_float(value):
+    return None if value is None else float(value)
+
+
+def _int_type(precision: int) -> pa.DataType:
+    # SQL Server reports the precision in digits (tinyint 3, smallint 5, int 10, bigint 19)
+    if precision == 3:
+        return pa.uint8()
+    if precision == 5:
+        return pa.int16()
+    if precision == 10:
+        return pa.int32()
+    return pa.int64()
+
+
+def _map_column(
+    description: tuple, decimal_as: str, wide_string_length: int
+) -> tuple[pa.DataType, Converter]:
+    _, type_code, _, internal_size, precision, scale, _ = description
+
+    # Size 0 means (MAX) or unknown length
+    size = internal_size or precision or 0
+    wide = size == 0 or size > wide_string_length
+
+    if type_code is bool:
+        return pa.bool_(), None
+
+    if type_code is int:
+        return _int_type(precision), None
+
+    if type_code is float:
+        return (pa.float32() if precision and precision <= 24 else pa.float64()), None
+
+    if type_code is Decimal:
+        # DECIMAL, NUMERIC, MONEY and SMALLMONEY
+        if decimal_as == DECIMAL_AS_FLOAT:
+            return pa.float64(), _to_float
+        if decimal_as == DECIMAL_AS_STRING:
+            return pa.string(), _to_str
+
+        precision = min(precision or _MAX_DECIMAL_PRECISION, _MAX_DECIMAL_PRECISION)
+        return pa.decimal128(precision, min(scale or 0, precision)), None
+
+    # Check datetime before date (datetime is a subclass of date)
+    if type_code is datetime:
+        return pa.timestamp("us"), None
+
+    if type_code is date:
+        return pa.date32(), None
+
+    if type_code is time:
+        return pa.time64("us"), None
+
+    if type_code in (bytes, bytearray):
+        return (pa.large_binary() if wide else pa.binary()), None
+
+    if type_code is str:
+        return (pa.large_string() if wide else pa.string()), None
+
+    if type_code is uuid.UUID:
+        return pa.string(), _to_str
+
+    # Any other type is exported as text
+    return pa.large_string(), _to_str
+
+
+class SchemaMapper:
+    """
+    Build an Arrow schema from a pyodbc `cursor.description` once per result set and
+    convert row batches into record batches with that schema, so types are not
+    inferred on every batch and stay the same for the whole export.
+
+    Args:
+        description: pyodbc cursor description (name, type_code, display_size,
+            internal_size, precision, scale, null_ok).
+        decimal_as: How DECIMAL/NUMERIC/MONEY columns are converted
+            (`decimal`, `float` or `string`).
+        wide_string_length: (N)VARCHAR columns longer than this (or (MAX)) use
+            64-bit offsets (`large_string`), so a batch can hold more than 2 GB of text.
+    """
+
+    def __init__(
+        self,
+        description,
+        decimal_as: str = DECIMAL_AS_DECIMAL,
+        wide_string_length: int = WIDE_STRING_LENGTH,
+    ):
+        fields = []
+        self._converters: list[Converter] = []
+
+        for column in description:
+            data_type, converter = _map_column(column, decimal_as, wide_string_length)
+
+            null_ok = column[6]
+            fields.append(pa.field(column[0], data_type, nullable=null_ok is not False))
+            self._converters.append(converter)
+
+        self.schema = pa.schema(fields)
+
+    @classmethod
+    def from_cursor(cls, cursor, **kwargs) -> "SchemaMapper":
+        """
+        Create a mapper for the current result set of a cursor.
+
+        :param cursor: pyodbc cursor positioned on a result set.
+        :param kwargs: Export args (decimal_as, wide_string_length); other args are ignored.
+
+        :return: Mapper for the result set.
+        :rtype: SchemaMapper
+        """
+
+        return cls(
+            cursor.description,
+            decimal_as=kwargs.get("decimal_as", DECIMAL_AS_DECIMAL),
+            wide_string_length=kwargs.get("wide_string_length", WIDE_STRING_LENGTH),
+        )
+
+    @property
+    def columns(self) -> list[str]:
+        """
+        Column names of the result set.
+        """
+
+        return self.schema.names
+
+    def to_batch(self, rows) -> pa.RecordBatch:
+        """
+        Convert a list of rows into a record batch with the mapped schema.
+
+        :param rows: Rows returned by `cursor.fetchmany`.
+
+        :return: Record batch with typed columns.
+        :rtype: pyarrow.RecordBatch
+        """
+
+        arrays = [
+            self._to_array(values, field, converter)
+            for values, field, converter in zip(
+                zip(*rows), self.schema, self._converters
+            )
+        ]
+
+        return pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+    @staticmethod
+    def _to_array(values, field: pa.Field, converter: Converter) -> pa.Array:
+        if converter is not None:
+            values = [converter(value) for value in values]
+
+        try:
+            return pa.array(values, type=field.type)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Text columns may return other objects (e.g. sql_variant)
+            if not pa.types.is_string(field.type) and not pa.types.is_large_string(
+                field.type
+            ):
+                raise
+
+            return pa.array([_to_str(value) for value in values], type=field.type)
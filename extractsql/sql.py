@@ -0,0 +1,108 @@
+"""
+Build SQL statements around a user query
+"""
+
+import re
+
+
+def quote_identifier(name: str) -> str:
+    """
+    Quote a column name for SQL Server (e.g., "order id" -> "[order id]").
+
+    :param name: Column name, optionally already quoted.
+
+    :return: Quoted column name.
+    :rtype: str
+    """
+
+    if name.startswith("[") and name.endswith("]"):
+        return name
+
+    return "[" + name.replace("]", "]]") + "]"
+
+
+def wrap_query(
+    query: str, where: str = None, order_by: str = None, columns: str = "*"
+) -> str:
+    """
+    Use a query as a derived table to filter and sort its rows.
+
+    The query must be a single SELECT statement that can be used as a derived table
+    (no ORDER BY without TOP/OFFSET, no CTE or multi-statement scripts).
+
+    :param query: SELECT statement.
+    :param where: Condition on the query columns (may contain `?` parameters).
+    :param order_by: Sort expression on the query columns.
+    :param columns: Select list on the query columns.
+
+    :return: SQL statement.
+    :rtype: str
+    """
+
+    # A trailing semicolon is not valid inside a derived table
+    query = query.strip().rstrip(";").strip()
+
+    statement = f"SELECT {columns} FROM (\n{query}\n) AS extractsql_query"
+
+    if where:
+        statement += f"\nWHERE {where}"
+
+    if order_by:
+        statement += f"\nORDER BY {order_by}"
+
+    return statement
+
+
+# String literals, quoted identifiers, comments and "::" (e.g., geography::Point) are
+# copied as they are; only the `:name` placeholders outside of them are replaced
+_PLACEHOLDER = re.compile(
+    r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|\[(?:[^\]]|\]\])*\]|--[^\n]*|/\*.*?\*/|::"""
+    r"""|(?<![\w@:]):([A-Za-z_]\w*)""",
+    re.DOTALL,
+)
+
+
+def get_parameter_names(query: str) -> list[str]:
+    """
+    Return the names of the `:name` placeholders of a query, in order of appearance.
+
+    :param query: SQL statement or script.
+
+    :return: Distinct parameter names.
+    :rtype: list[str]
+    """
+
+    names = [match.group(1) for match in _PLACEHOLDER.finditer(query) if match.group(1)]
+
+    return list(dict.fromkeys(names))
+
+
+def bind_parameters(query: str, values: dict) -> tuple[str, list]:
+    """
+    Replace the `:name` placeholders of a query with `?` parameters, so the values are
+    bound by the driver instead of being formatted into the SQL text.
+
+    :param query: SQL statement or script with `:name` placeholders (e.g., "WHERE
+        order_date >= :start").
+    :param values: Value of each parameter name (values not used by the query are
+        ignored).
+
+    :return: SQL statement with `?` parameters, and the value of each parameter in order.
+    :rtype: tuple[str, list]
+    """
+
+    missing = [name for name in get_parameter_names(query) if name not in values]
+
+    if missing:
+        raise ValueError(f"Missing query parameters: {', '.join(missing)}.")
+
+    params = []
+
+    def replace(match):
+        if not match.group(1):
+            return match.group(0)
+
+        params.append(values[match.group(1)])
+        return "?"
+
+    return _PLACEHOLDER.sub(replace, query), params
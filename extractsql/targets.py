@@ -0,0 +1,301 @@
+"""
+Run one query against several servers or databases and merge their results
+"""
+
+import re
+import tempfile
+from pathlib import Path
+from functools import partial
+from dataclasses import dataclass
+import pyarrow as pa
+from . import utils
+from .batch import Job, JobResult, read_manifest, run_jobs, STATUS_OK, STATUS_FAILED
+from .cursors import ArrowCursor, describe_schema
+from .extract import get_export_function
+from .fanout import export_to_many
+from .metrics import Metrics
+from .constants import (
+    DECIMAL_AS_DECIMAL,
+    RETRIES,
+    RETRY_DELAY,
+    SOURCE_COLUMN,
+    TARGET_WORKERS,
+)
+
+
+@dataclass
+class Target:
+    """
+    Server and database to run the query against, with the name that identifies its rows
+    (source column) or its output files.
+    """
+
+    name: str
+    connstring: utils.ConnString
+
+
+def get_targets(
+    server: str,
+    database: str,
+    user: str = None,
+    password: str = None,
+    driver: str = None,
+    targets_file: str = None,
+) -> list[Target]:
+    """
+    Return the targets of comma separated lists of servers and databases (every database
+    of every server), or of a targets file.
+
+    :param server: Server name, or comma separated server names.
+    :param database: Database name, or comma separated database names.
+    :param user: User name shared by the targets.
+    :param password: Password shared by the targets.
+    :param driver: ODBC driver.
+    :param targets_file: CSV, JSON or YAML file with the server, database and optionally
+        the name, user and password of each target (the server, database, user and
+        password args are defaults).
+
+    :return: Targets, with distinct names.
+    :rtype: list[Target]
+    """
+
+    if targets_file:
+        defaults = {
+            "server": server,
+            "database": database,
+            "user": user,
+            "password": password,
+        }
+        entries = [
+            {**defaults, **{key: value for key, value in entry.items() if value}}
+            for entry in read_manifest(targets_file)
+        ]
+    else:
+        entries = [
+            {"server": s, "database": d, "user": user, "password": password}
+            for s in utils.split_values(server or "")
+            for d in utils.split_values(database or "")
+        ]
+
+    targets = []
+
+    for index, entry in enumerate(entries, start=1):
+        if not entry.get("server") or not entry.get("database"):
+            raise ValueError(f"Target {index}: server and database are required.")
+
+        name = entry.get("name") or f"{entry['server']}_{entry['database']}"
+
+        targets.append(
+            Target(
+                # Used in file names
+                re.sub(r"[^\w.-]+", "_", str(name)),
+                utils.ConnString(
+                    str(entry["server"]),
+                    str(entry["database"]),
+                    entry.get("user"),
+                    entry.get("password"),
+                    driver,
+                ),
+            )
+        )
+
+    names = [target.name for target in targets]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+
+    if duplicates:
+        raise ValueError(f"Duplicate target names: {', '.join(duplicates)}.")
+
+    return targets
+
+
+def extract_targets(
+    targets: list[Target], query_file: str, output_files: list[str], **kwargs
+) -> list[JobResult]:
+    """
+    Run the query against every target at the same time. Each target is written to its own
+    files (file_<target>.csv, ...) or, with `merge_targets`, spooled to a temporary Arrow
+    file; the spools are then exported in the order of the targets to the output files,
+    with a column holding the name of the target of each row.
+
+    Targets that fail with a database error are retried; a failed target does not stop the
+    others (its rows are left out of the merged output).
+
+    Args:
+        targets: Servers and databases.
+        query_file: SQL query file to execute.
+        output_files: File destinations.
+        **kwargs: Number of targets running at the same time (target_workers), retries of a
+            failed target (retries) and seconds before the first retry (retry_delay), merge
+            the results (merge_targets) with the target name in a column (source_column)
+            and the args of `extract_to`.
+
+    Returns:
+        list[JobResult]: Result of each target, in the order of the targets.
+    """
+
+    workers = kwargs.pop("target_workers", None) or TARGET_WORKERS
+    retries = kwargs.pop("retries", RETRIES)
+    retry_delay = kwargs.pop("retry_delay", RETRY_DELAY)
+    merge = kwargs.pop("merge_targets", False)
+    source_column = kwargs.pop("source_column", None) or SOURCE_COLUMN
+
+    if kwargs.get("watermark_column") or kwargs.get("resume_key"):
+        raise ValueError(
+            "Incremental and resumable extractions can only run against one target."
+        )
+
+    if not merge and any(utils.is_pipe(output_file) for output_file in output_files):
+        raise ValueError("Targets written to a pipe must be merged (merge_targets).")
+
+    workers = min(workers, len(targets))
+
+    if workers > 1:
+        # Progress bars of parallel targets would overwrite each other
+        kwargs["progress"] = False
+
+    print(f"Extracting {len(targets)} targets with {workers} workers")
+
+    metrics_file = kwargs.pop("metrics_file", None)
+
+    if not merge:
+        jobs = [
+            Job(
+                target.name,
+                target.connstring,
+                query_file,
+                [
+                    utils.add_suffix_to_filename(output_file, f"_{target.name}")
+                    for output_file in output_files
+                ],
+                {
+                    **kwargs,
+                    "metrics_file": metrics_file
+                    and utils.add_suffix_to_filename(metrics_file, f"_{target.name}"),
+                },
+            )
+            for target in targets
+        ]
+
+        return run_jobs(jobs, workers, retries, retry_delay)
+
+    if kwargs.get("all_result_sets"):
+        raise ValueError("Only the first result set of the targets can be merged.")
+
+    with tempfile.TemporaryDirectory(dir=Path(output_files[0]).parent) as spool_dir:
+        # Spooled uncompressed and with the types of the database, so the merged result
+        # is exported with the options of the output files
+        spool_options = {
+            **kwargs,
+            "compression": None,
+            "decimal_as": DECIMAL_AS_DECIMAL,
+            "merge_partitions": True,
+            "metrics_log": False,
+            "output_format": None,
+        }
+        jobs = [
+            Job(
+                target.name,
+                target.connstring,
+                query_file,
+                [str(Path(spool_dir, f"target{index}.arrow"))],
+                spool_options,
+            )
+            for index, target in enumerate(targets, start=1)
+        ]
+
+        results = run_jobs(jobs, workers, retries, retry_delay)
+        spools = _get_spools(jobs, results)
+
+        if not spools:
+            print("No target returned a result set")
+            return results
+
+        # Types that hold the values of every target (e.g., a wider integer)
+        schema = pa.unify_schemas(
+            [spool_schema for _, _, spool_schema in spools],
+            promote_options="permissive",
+        )
+        description = describe_schema(schema) + [
+            (
+                source_column,
+                str,
+                None,
+                max(len(target.name) for target in targets),
+                0,
+                0,
+                False,
+            )
+        ]
+
+        print(f"Merging {len(spools)} targets...")
+
+        cursor = ArrowCursor(_read_spools(spools, schema, source_column), description)
+
+        if len(output_files) > 1:
+            # Several formats are written from a single read of the spools
+            fn = partial(
+                export_to_many,
+                export_functions=[get_export_function(file) for file in output_files],
+            )
+            output_file = output_files
+        else:
+            fn = get_export_function(output_files[0])
+            output_file = output_files[0]
+
+        metrics = Metrics(query_file=str(query_file), output_file=output_file)
+
+        with metrics.report(
+            metrics_file,
+            kwargs.get("metrics_log", False),
+            kwargs.get("metrics_interval"),
+        ):
+            metrics.rows = fn(cursor, output_file, **{**kwargs, "metrics": metrics})
+
+    return results
+
+
+def _get_spools(
+    jobs: list[Job], results: list[JobResult]
+) -> list[tuple[str, str, pa.Schema]]:
+    # Name, file and schema of the spooled result of each target that returned the same
+    # columns as the first one
+    spools = []
+
+    for job, result in zip(jobs, results):
+        spool = job.output_files[0]
+
+        if result.status != STATUS_OK or not Path(spool).exists():
+            continue
+
+        with pa.OSFile(spool, "rb") as source:
+            schema = pa.ipc.open_file(source).schema
+
+        if spools and schema.names != spools[0][2].names:
+            print(f"Target {job.name} returned other columns and was left out")
+            result.status = STATUS_FAILED
+            result.error = "The columns differ from the ones of the other targets."
+            continue
+
+        spools.append((job.name, spool, schema))
+
+    return spools
+
+
+def _read_spools(
+    spools: list[tuple[str, str, pa.Schema]], schema: pa.Schema, source_column: str
+):
+    # Record batches of the spooled targets, in target order, with the name of the target
+    for name, spool, _ in spools:
+        with pa.OSFile(spool, "rb") as source:
+            reader = pa.ipc.open_file(source)
+
+            for index in range(reader.num_record_batches):
+                batch = reader.get_batch(index)
+
+                if not batch.schema.equals(schema):
+                    batch = batch.cast(schema)
+
+                yield pa.RecordBatch.from_arrays(
+                    [*batch.columns, pa.repeat(pa.scalar(name), batch.num_rows)],
+                    names=[*schema.names, source_column],
+                )
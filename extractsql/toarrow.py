@@ -0,0 +1,74 @@
+"""
+Export data to Arrow IPC (Feather) file
+"""
+
+import pyodbc
+import pyarrow as pa
+from .constants import (
+    BATCH_SIZE,
+    WRITE_BUFFER_SIZE,
+    FORMAT_ARROWS,
+    COMPRESSION_NONE,
+    IPC_COMPRESSION_CODECS,
+)
+from . import utils
+from .pipeline import write_batches
+from .schema import SchemaMapper
+from .metrics import get_metrics
+
+
+def export_to_arrow(
+    cursor: pyodbc.Cursor, file_path: str, batch_size=BATCH_SIZE, **kwargs
+):
+    """
+    Export data from a pyodbc cursor to an Arrow IPC file using `pyarrow`.
+
+    `.arrows` files use the IPC stream format; any other extension (`.arrow`, `.feather`)
+    uses the IPC file format, which can be memory-mapped by readers.
+
+    Args:
+        cursor (pyodbc.Cursor): The cursor object for database query execution.
+        file_path (str): Path to the output Arrow file.
+        batch_size (int): Number of rows to fetch per batch.
+        **kwargs: Additional args like buffer compression codec (compression, lz4 or zstd) and level
+            (compression_level) and size in bytes of the output buffer (buffer_size).
+
+    Returns:
+        int: Number of rows exported.
+    """
+
+    compression = kwargs.get("compression")
+    compression_level = kwargs.get("compression_level")
+    buffer_size = kwargs.get("buffer_size", WRITE_BUFFER_SIZE)
+
+    if compression == COMPRESSION_NONE:
+        compression = None
+
+    if compression is not None and compression not in IPC_COMPRESSION_CODECS:
+        raise ValueError(
+            f"Compression '{compression}' is not supported by Arrow IPC. "
+            f"Expected one of: {', '.join(IPC_COMPRESSION_CODECS)}."
+        )
+
+    options = pa.ipc.IpcWriteOptions(
+        compression=(pa.Codec(compression, compression_level) if compression else None)
+    )
+
+    new_writer = (
+        pa.ipc.new_stream
+        if utils.is_extension(file_path, f".{FORMAT_ARROWS}")
+        or kwargs.get("output_format") == FORMAT_ARROWS
+        else pa.ipc.new_file
+    )
+
+    # Map the column types once for the whole result set
+    mapper = SchemaMapper.from_cursor(cursor, **kwargs)
+
+    with pa.output_stream(
+        utils.get_output_sink(file_path), compression=None, buffer_size=buffer_size
+    ) as sink, new_writer(sink, mapper.schema, options=options) as writer:
+        rows = write_batches(cursor, mapper, writer.write_batch, batch_size, **kwargs)
+
+    get_metrics(kwargs).add_output(file_path)
+
+    return rows
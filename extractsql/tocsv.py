@@ -2,12 +2,22 @@
 Export data to Flat file
 """
 
-# import os
+import os
 import pyodbc
 import pyarrow as pa
 from pyarrow import csv
-from tqdm import tqdm
-from .constants import BATCH_SIZE
+from .constants import (
+    BATCH_SIZE,
+    WRITE_BUFFER_SIZE,
+    COMPRESSION_NONE,
+    COMPRESSION_EXTENSIONS,
+    COMPRESSION_WORKERS,
+)
+from . import utils
+from .compress import CompressedOutput
+from .pipeline import write_batches
+from .schema import SchemaMapper
+from .metrics import get_metrics
 
 
 def export_to_csv(
@@ -20,57 +30,108 @@ def export_to_csv(
         cursor (pyodbc.Cursor): The cursor object for database query execution.
         file_path (str): Path to the output CSV or text file.
         batch_size (int): Number of rows to fetch per batch.
-        **kwargs: Additional args like column delimiter (delimiter) for the output file (e.g., ",", "\\t", "|").
+        **kwargs: Additional args like column delimiter (delimiter) for the output file (e.g., ",", "\\t", "|"),
+            fetch on a separate thread while writing (pipelined), batches waiting to be written (queue_size),
+            DECIMAL/MONEY conversion (decimal_as), length of wide text columns (wide_string_length)
+            size in bytes of the output buffer (buffer_size), compression codec (compression, inferred
+            from the file extension if not specified) and level (compression_level), number of
+            compression threads (compression_workers), add the rows at the end of an existing file, without
+            header (append), and record each batch flushed to the file in a checkpoint (checkpoint).
+
+    Returns:
+        int: Number of rows exported.
     """
     # # Ensure output directory exists
     # os.makedirs(os.path.dirname(output_file), exist_ok=True)
 
     delimiter = kwargs.get("delimiter", ",")
+    buffer_size = kwargs.get("buffer_size", WRITE_BUFFER_SIZE)
+    compression = utils.get_compression(file_path, kwargs.get("compression"))
 
-    # Extract column names
-    columns = [desc[0] for desc in cursor.description]
+    if compression == COMPRESSION_NONE:
+        compression = None
 
-    total_rows = 0
+    if compression is not None:
+        if compression not in COMPRESSION_EXTENSIONS.values():
+            raise ValueError(
+                f"Compression '{compression}' is not supported for flat files. "
+                f"Expected one of: {', '.join(COMPRESSION_EXTENSIONS.values())}."
+            )
 
-    with open(file_path, "wb") as f:
-        # Initialize the counter
-        counter = tqdm(
-            total=0,
-            desc="Writing file",
-            unit="rows",
-            leave=True,
+        # Fetch on its own thread, so the fetch loop is not slowed down by the writer
+        kwargs["pipelined"] = True
+
+    # Rows appended to an existing file do not repeat the header
+    append = (
+        kwargs.get("append", False)
+        and os.path.exists(file_path)
+        and os.path.getsize(file_path) > 0
+    )
+    checkpoint = kwargs.get("checkpoint")
+
+    if checkpoint is not None and compression is not None:
+        raise ValueError("Compressed files cannot be checkpointed.")
+
+    # Map the column types once for the whole result set
+    mapper = SchemaMapper.from_cursor(cursor, **kwargs)
+
+    write_options = csv.WriteOptions(delimiter=delimiter, include_header=not append)
+
+    # One buffered (and optionally compressed) stream and one writer for the whole file
+    # (header written once)
+    with _open_output(
+        file_path,
+        buffer_size,
+        compression,
+        kwargs.get("compression_level"),
+        kwargs.get("compression_workers") or COMPRESSION_WORKERS,
+        append,
+    ) as sink, csv.CSVWriter(
+        sink, mapper.schema, write_options=write_options
+    ) as writer:
+
+        def write(batch: pa.RecordBatch):
+            writer.write_batch(batch)
+
+            # Only the rows flushed to the file are recorded
+            sink.flush()
+            checkpoint.update(batch, os.path.getsize(file_path))
+
+        rows = write_batches(
+            cursor,
+            mapper,
+            writer.write_batch if checkpoint is None else write,
+            batch_size,
+            **kwargs,
         )
 
-        while True:
-            # Fetch rows in batches
-            rows = cursor.fetchmany(batch_size)
-
-            if not rows:
-                break
-
-            batch_count = len(rows)
-            total_rows += batch_count
-
-            columns_data = list(zip(*rows))  # Transpose rows to columns
-
-            # Convert rows to pyarrow.Table
-            arrow_table = pa.table(
-                [pa.array(column) for column in columns_data],
-                names=columns,
-            )
+    get_metrics(kwargs).add_output(file_path)
 
-            write_options = csv.WriteOptions(
-                delimiter=delimiter, include_header=(total_rows == batch_count)
-            )
+    # print(f"Export completed: {total_rows} rows written to {file_path}")
 
-            # Write table to the file
-            csv.write_csv(arrow_table, f, write_options=write_options)
+    return rows
 
-            # Update the row counter
-            counter.update(batch_count)
 
-        counter.close()
+def _open_output(
+    file_path, buffer_size, compression, compression_level, workers, append=False
+):
+    if compression is None:
+        if append:
+            return pa.BufferedOutputStream(pa.OSFile(file_path, "a"), buffer_size)
 
-        print(f"Processed {total_rows} rows")
+        return pa.output_stream(
+            utils.get_output_sink(file_path), compression=None, buffer_size=buffer_size
+        )
 
-    # print(f"Export completed: {total_rows} rows written to {file_path}")
+    # Chunks of the buffer size are compressed on separate threads
+    return pa.PythonFile(
+        CompressedOutput(
+            file_path,
+            compression,
+            level=compression_level,
+            chunk_size=buffer_size,
+            workers=workers,
+            append=append,
+        ),
+        mode="w",
+    )
@@ -2,11 +2,25 @@
 Export data to Excel file
 """
 
+import os
+import tempfile
+from time import perf_counter
+from pathlib import Path
+from decimal import Decimal
+from functools import partial
 from datetime import datetime, date, time
+from concurrent.futures import ProcessPoolExecutor
 import pyodbc
+import pyarrow as pa
 import xlsxwriter
 from tqdm import tqdm
-from .constants import BATCH_SIZE, ROWS_PER_SHEET
+from .constants import BATCH_SIZE, ROWS_PER_SHEET, CONSTANT_MEMORY_ROWS
+from . import utils
+from .cursors import ArrowCursor, next_result_set
+from .batching import get_fetch, get_row_bytes
+from .pipeline import get_batch_fetch
+from .schema import SchemaMapper
+from .metrics import Metrics, get_metrics
 
 
 def export_to_excel(
@@ -19,16 +33,61 @@ def export_to_excel(
         cursor (pyodbc.Cursor): The cursor object for database query execution.
         file_path (str): Path to the output Excel file.
         batch_size (int): Number of rows to fetch per batch.
-        **kwargs: Additional args like number of rows per Excel sheet (rows_per_sheet).
+        **kwargs: Additional args like number of rows per Excel sheet (rows_per_sheet),
+            write rows to disk as they are added (constant_memory) and number of rows above
+            which constant memory is used automatically (constant_memory_rows, 0 to disable),
+            maximum sheets per workbook before splitting the output in part files written in
+            parallel (sheets_per_workbook, 0 to disable), number of worker processes (workers),
+            show progress bars (progress) and export every remaining result set of the cursor
+            in its own sheets (all_result_sets) and memory budget in bytes to adapt the
+            batch size (max_memory).
+
+    Returns:
+        int: Number of rows exported.
     """
 
+    all_result_sets = kwargs.get("all_result_sets", False)
+
+    if kwargs.get("sheets_per_workbook"):
+        if all_result_sets:
+            raise ValueError(
+                "Workbooks cannot be split when exporting all result sets."
+            )
+
+        return _export_to_parts(cursor, file_path, batch_size, **kwargs)
+
     rows_per_sheet = kwargs.get("rows_per_sheet", ROWS_PER_SHEET)
+    constant_memory = kwargs.get("constant_memory", False)
+    constant_memory_rows = kwargs.get("constant_memory_rows", CONSTANT_MEMORY_ROWS)
 
-    # Extract column names
-    columns = [column[0] for column in cursor.description]
+    if all_result_sets and constant_memory_rows:
+        # The size of the next result sets is not known when the workbook is created
+        constant_memory = True
+
+    metrics = get_metrics(kwargs)
+    fetch = metrics.timed("fetch", get_fetch(cursor, batch_size, **kwargs))
 
-    # Create a new workbook using xlsxwriter
-    workbook = xlsxwriter.Workbook(file_path)
+    if constant_memory or not constant_memory_rows:
+        rows = fetch()
+    elif kwargs.get("max_memory"):
+        # Look ahead in batches of the budget, up to the threshold or the budget
+        rows, constant_memory = _look_ahead(
+            fetch, constant_memory_rows, kwargs["max_memory"]
+        )
+    else:
+        # Look ahead up to the threshold to know if the result is large
+        rows = metrics.timed("fetch", cursor.fetchmany)(
+            max(batch_size, constant_memory_rows + 1)
+        )
+        constant_memory = len(rows) > constant_memory_rows
+
+    if constant_memory:
+        print("Using constant memory mode")
+
+    # Create a new workbook using xlsxwriter.
+    # In constant memory mode each row is written to disk (with inline strings)
+    # as soon as the next row starts, so rows must be written in order.
+    workbook = xlsxwriter.Workbook(file_path, {"constant_memory": constant_memory})
 
     # Define formats for dates, datetimes and time
     formats = {
@@ -37,22 +96,97 @@ def export_to_excel(
         time: workbook.add_format({"num_format": "HH:MM:SS"}),
     }
 
+    result_index = 1
+    total_rows = 0
+
+    while True:
+        # Sheets are named Sheet1, Sheet2, ... or Result1, Result1_2, ..., Result2, ...
+        if all_result_sets:
+            prefix = f"Result{result_index}"
+            sheet_name = partial(_get_result_sheet_name, prefix)
+        else:
+            sheet_name = "Sheet{}".format
+
+        total_rows += _write_result(
+            workbook,
+            cursor,
+            rows,
+            fetch,
+            formats,
+            sheet_name,
+            rows_per_sheet,
+            kwargs.get("progress", True),
+            metrics,
+        )
+
+        if not all_result_sets or not next_result_set(cursor):
+            break
+
+        result_index += 1
+        fetch = metrics.timed("fetch", get_fetch(cursor, batch_size, **kwargs))
+        rows = fetch()
+
+    print("Saving workbook...")
+
+    # Close the workbook to save the file
+    with metrics.timer("close"):
+        workbook.close()
+
+    metrics.add_output(file_path)
+
+    _print_peak_memory()
+
+    return total_rows
+
+
+def _look_ahead(fetch, threshold: int, max_memory: int) -> tuple[list, bool]:
+    # Fetch the first rows until there are more than `threshold` or they exceed the memory
+    # budget, and return them with whether the result is large (constant memory mode)
+    rows = []
+
+    while len(rows) <= threshold:
+        batch = fetch()
+
+        if not batch:
+            return rows, False
+
+        rows.extend(batch)
+
+        if len(rows) * get_row_bytes(batch) > max_memory:
+            # Too large to keep the whole result in memory
+            return rows, True
+
+    return rows, True
+
+
+def _write_result(
+    workbook: xlsxwriter.Workbook,
+    cursor: pyodbc.Cursor,
+    rows: list,
+    fetch,
+    formats: dict,
+    sheet_name,
+    rows_per_sheet: int,
+    progress: bool,
+    metrics: Metrics,
+) -> int:
+    # Write the current result set of the cursor (the fetched `rows`, then the batches
+    # returned by `fetch`) in as many sheets as needed and return the number of rows
+
+    # Extract column names
+    columns = [column[0] for column in cursor.description]
+
     # Initialize control variables
     total_rows = 0
     row_count = 0
     sheet_index = 1
     worksheet = None
+    # Cell writer of each column of the current sheet
+    writers: list = []
     counter = None
 
-    while True:
-        rows = cursor.fetchmany(batch_size)
-
-        if not rows:
-            # If the cursor does not return any rows at all, an empty sheet is created
-            if worksheet is None:
-                worksheet = _create_sheet(workbook, columns, sheet_index)
-
-            break
+    while rows:
+        start = perf_counter()
 
         # Stream data row by row
         for row in rows:
@@ -62,9 +196,11 @@ def export_to_excel(
                 sheet_index += 1
                 worksheet = None
                 counter.close()
+                _print_peak_memory()
 
             if worksheet is None:
-                worksheet = _create_sheet(workbook, columns, sheet_index)
+                worksheet = _create_sheet(workbook, columns, sheet_name(sheet_index))
+                writers = _get_column_writers(worksheet, cursor.description, formats)
 
                 # Initialize the counter when the first row is processed
                 counter = tqdm(
@@ -73,25 +209,21 @@ def export_to_excel(
                     desc=f"Writing {worksheet.name}",
                     unit="rows",
                     leave=True,
+                    disable=not progress,
                 )
 
-            # Write the row data
+            # Write the row data with the writer of each column
             row_index = row_count + 1  # Account for header row
             for col_idx, value in enumerate(row):
-                # Check for date/datetime/time values
-                value_format = next(
-                    (f for k, f in formats.items() if isinstance(value, k)), None
-                )
-
-                worksheet.write(row_index, col_idx, value, value_format)
+                # NULL values are left as blank cells
+                if value is None:
+                    continue
 
-                # if isinstance(value, (date, datetime)):
-                #     value_format = (
-                #         datetime_format if isinstance(value, datetime) else date_format
-                #     )
-                #     worksheet.write_datetime(row_index, col_idx, value, value_format)
-                # else:
-                #     worksheet.write(row_index, col_idx, value)
+                try:
+                    writers[col_idx](row_index, col_idx, value)
+                except TypeError:
+                    # The value does not match the column type (e.g. sql_variant)
+                    _write_value(worksheet, formats, row_index, col_idx, value)
 
             row_count += 1
             total_rows += 1
@@ -99,6 +231,14 @@ def export_to_excel(
             # Update the row counter
             counter.update(1)
 
+        metrics.add("write", perf_counter() - start, len(rows), 1)
+
+        rows = fetch()
+
+    # If the cursor does not return any rows at all, an empty sheet is created
+    if worksheet is None:
+        worksheet = _create_sheet(workbook, columns, sheet_name(sheet_index))
+
     if not counter is None:
         counter.close()
 
@@ -106,17 +246,199 @@ def export_to_excel(
         f"Exported {total_rows} rows in {sheet_index} sheet{'s' if sheet_index > 1 else ''}"
     )
 
-    print("Saving workbook...")
+    return total_rows
 
-    # Close the workbook to save the file
-    workbook.close()
+
+def _get_result_sheet_name(prefix: str, index: int) -> str:
+    return prefix if index == 1 else f"{prefix}_{index}"
 
 
-def _create_sheet(workbook: xlsxwriter.Workbook, columns: list[str], index: int):
+def _create_sheet(workbook: xlsxwriter.Workbook, columns: list[str], name: str):
     # Create a new worksheet
-    worksheet = workbook.add_worksheet(f"Sheet{index}")
+    worksheet = workbook.add_worksheet(name)
 
     # Write column headers
     worksheet.write_row(0, 0, columns)
 
     return worksheet
+
+
+def _export_to_parts(cursor: pyodbc.Cursor, file_path: str, batch_size: int, **kwargs):
+    # Split the rows in workbooks of `sheets_per_workbook` sheets (file_part1.xlsx, ...).
+    # Rows of each part are spooled to a temporary Arrow file while they are fetched,
+    # and the workbook is written by a worker process, so parts are written in parallel
+    # while the next ones are still being fetched.
+    rows_per_sheet = kwargs.get("rows_per_sheet", ROWS_PER_SHEET)
+    rows_per_part = rows_per_sheet * kwargs["sheets_per_workbook"]
+    workers = kwargs.get("workers") or os.cpu_count()
+
+    metrics = get_metrics(kwargs)
+    description = [tuple(column) for column in cursor.description]
+    mapper = SchemaMapper(description)
+    output = Path(file_path)
+
+    part_options = {
+        "rows_per_sheet": rows_per_sheet,
+        "constant_memory": kwargs.get("constant_memory", False),
+        "constant_memory_rows": kwargs.get(
+            "constant_memory_rows", CONSTANT_MEMORY_ROWS
+        ),
+        "max_memory": kwargs.get("max_memory"),
+    }
+
+    parts = []
+    futures = []
+
+    with tempfile.TemporaryDirectory(
+        dir=output.parent
+    ) as spool_dir, ProcessPoolExecutor(max_workers=workers) as pool:
+        writer = None
+        spool = None
+        part_rows = 0
+
+        def open_part():
+            nonlocal writer, spool, part_rows
+
+            parts.append(str(output.with_stem(f"{output.stem}_part{len(parts) + 1}")))
+            spool = os.path.join(spool_dir, f"part{len(parts)}.arrow")
+
+            writer = pa.ipc.new_file(spool, mapper.schema)
+            part_rows = 0
+
+        def submit_part():
+            nonlocal writer
+
+            # Write the workbook of the spooled part in a worker process
+            writer.close()
+            futures.append(
+                pool.submit(
+                    _write_part,
+                    spool,
+                    parts[-1],
+                    description,
+                    batch_size,
+                    **part_options,
+                )
+            )
+            writer = None
+
+        counter = tqdm(
+            total=0,
+            desc="Fetching rows",
+            unit="rows",
+            leave=True,
+            disable=not kwargs.get("progress", True),
+        )
+
+        fetch = get_batch_fetch(cursor, mapper, batch_size, **kwargs)
+        total_rows = 0
+
+        while True:
+            batch = fetch()
+
+            if batch is None:
+                break
+
+            offset = 0
+            while offset < batch.num_rows:
+                if writer is None:
+                    open_part()
+
+                count = min(batch.num_rows - offset, rows_per_part - part_rows)
+                with metrics.timer("write"):
+                    writer.write_batch(batch.slice(offset, count))
+
+                offset += count
+                part_rows += count
+
+                if part_rows == rows_per_part:
+                    submit_part()
+
+            total_rows += batch.num_rows
+            metrics.add("write", rows=batch.num_rows, batches=1)
+            counter.update(batch.num_rows)
+
+        # If the cursor does not return any rows at all, an empty workbook is created
+        if not parts:
+            open_part()
+
+        if writer is not None:
+            submit_part()
+
+        counter.close()
+
+        print(f"Writing {len(parts)} workbooks with {workers} workers...")
+
+        # Wait for the parts in order (raises the error of a failed part).
+        # The workbooks are written by the workers, so this is the close stage
+        with metrics.timer("close"):
+            for future in futures:
+                future.result()
+
+        for part in parts:
+            metrics.add_output(part)
+
+    print(f"Exported {total_rows} rows in {len(parts)} workbooks:")
+    for part in parts:
+        print(f"  {part}")
+
+    return total_rows
+
+
+def _write_part(spool: str, file_path: str, description, batch_size: int, **kwargs):
+    # Runs in a worker process
+    with pa.memory_map(spool) as source:
+        reader = pa.ipc.open_file(source)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+
+        export_to_excel(
+            ArrowCursor(batches, description),
+            file_path,
+            batch_size,
+            progress=False,
+            **kwargs,
+        )
+
+
+def _print_peak_memory():
+    print(f"Peak memory: {utils.format_bytes(utils.get_peak_memory())}")
+
+
+def _get_column_writers(worksheet, description, formats: dict) -> list:
+    """
+    Return the write function of each column, chosen once from the column type.
+    """
+
+    writers = []
+
+    for column in description:
+        type_code = column[1]
+
+        if type_code is bool:
+            writer = worksheet.write_boolean
+        elif type_code in (int, float, Decimal):
+            writer = worksheet.write_number
+        elif type_code is str:
+            writer = partial(_write_string, worksheet)
+        elif type_code in formats:
+            writer = partial(worksheet.write_datetime, cell_format=formats[type_code])
+        else:
+            # Unknown types are resolved value by value
+            writer = partial(_write_value, worksheet, formats)
+
+        writers.append(writer)
+
+    return writers
+
+
+def _write_string(worksheet, row: int, col: int, value: str):
+    # Empty strings are left as blank cells; text is never converted to formulas or urls
+    if value:
+        worksheet.write_string(row, col, value)
+
+
+def _write_value(worksheet, formats: dict, row: int, col: int, value):
+    # Check for date/datetime/time values
+    value_format = next((f for k, f in formats.items() if isinstance(value, k)), None)
+
+    worksheet.write(row, col, value, value_format)
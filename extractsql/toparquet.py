@@ -0,0 +1,90 @@
+"""
+Export data to Parquet file
+"""
+
+import pyodbc
+import pyarrow as pa
+from pyarrow import parquet as pq
+from .constants import BATCH_SIZE, ROW_GROUP_SIZE, PARQUET_COMPRESSION
+from . import utils
+from .pipeline import write_batches
+from .schema import SchemaMapper
+from .metrics import get_metrics
+
+
+def export_to_parquet(
+    cursor: pyodbc.Cursor, file_path: str, batch_size=BATCH_SIZE, **kwargs
+):
+    """
+    Export data from a pyodbc cursor to a Parquet file using `pyarrow`.
+
+    Batches are written as they are fetched; at most one row group is held in memory.
+
+    Args:
+        cursor (pyodbc.Cursor): The cursor object for database query execution.
+        file_path (str): Path to the output Parquet file.
+        batch_size (int): Number of rows to fetch per batch.
+        **kwargs: Additional args like rows per row group (row_group_size), compression codec
+            (compression) and level (compression_level), and columns to dictionary encode
+            (dictionary_columns, all columns if not specified).
+
+    Returns:
+        int: Number of rows exported.
+    """
+
+    row_group_size = kwargs.get("row_group_size", ROW_GROUP_SIZE)
+    compression = kwargs.get("compression") or PARQUET_COMPRESSION
+    compression_level = kwargs.get("compression_level")
+    dictionary_columns = kwargs.get("dictionary_columns")
+
+    metrics = get_metrics(kwargs)
+
+    # Map the column types once for the whole result set
+    mapper = SchemaMapper.from_cursor(cursor, **kwargs)
+
+    # Batches waiting to fill a row group
+    pending = []
+    pending_rows = 0
+
+    with pa.output_stream(utils.get_output_sink(file_path)) as sink, pq.ParquetWriter(
+        sink,
+        mapper.schema,
+        compression=compression,
+        compression_level=compression_level,
+        use_dictionary=True if dictionary_columns is None else dictionary_columns,
+    ) as writer:
+
+        def flush(final=False):
+            nonlocal pending, pending_rows
+
+            table = pa.Table.from_batches(pending, schema=mapper.schema)
+
+            # Write only full row groups, except for the last one
+            rows = table.num_rows
+            if not final:
+                rows -= rows % row_group_size
+
+            if rows:
+                writer.write_table(table.slice(0, rows), row_group_size=row_group_size)
+
+            pending = table.slice(rows).to_batches()
+            pending_rows = table.num_rows - rows
+
+        def write(batch: pa.RecordBatch):
+            nonlocal pending_rows
+
+            pending.append(batch)
+            pending_rows += batch.num_rows
+
+            if pending_rows >= row_group_size:
+                flush()
+
+        rows = write_batches(cursor, mapper, write, batch_size, **kwargs)
+
+        # Last row group and footer
+        with metrics.timer("close"):
+            flush(final=True)
+
+    metrics.add_output(file_path)
+
+    return rows
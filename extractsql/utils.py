@@ -2,13 +2,23 @@
 Utils module
 """
 
+import os
+import sys
+import json
+import stat
 import time
+import uuid
+import ctypes
 from datetime import datetime
 from pathlib import Path
 from dataclasses import dataclass, field
-import pyodbc
-from charset_normalizer import from_bytes
-from .constants import READ_BYTES, DEFAULT_ENCODING
+from typing import Optional
+from .constants import (
+    READ_BYTES,
+    DEFAULT_ENCODING,
+    COMPRESSION_EXTENSIONS,
+    STDOUT,
+)
 
 
 @dataclass
@@ -65,6 +75,8 @@ def get_connection_driver():
         "SQL Server",
     ]
 
+    import pyodbc  # pylint: disable=import-outside-toplevel
+
     installed_drivers = pyodbc.drivers()
 
     for driver in preferred_drivers:
@@ -74,6 +86,70 @@ def get_connection_driver():
     return None
 
 
+def write_json(file_path: str, data):
+    """
+    Write data to a JSON file. The file is replaced at once, so readers never see a
+    partial file.
+
+    :param file_path: Path of the JSON file.
+    :param data: JSON serializable data.
+    """
+
+    temp_file = f"{file_path}.{uuid.uuid4().hex}.tmp"
+
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+    os.replace(temp_file, file_path)
+
+
+def is_stdout(file_path) -> bool:
+    """
+    Return `True` if the output file is the standard output ("-").
+    """
+
+    return str(file_path) == STDOUT
+
+
+def is_pipe(file_path) -> bool:
+    """
+    Return `True` if the output file is the standard output or a named pipe (FIFO),
+    which are written as they are, in one pass.
+
+    :param file_path: Path of the output file.
+
+    :return: `True` if the output cannot be read back, truncated or renamed.
+    :rtype: bool
+    """
+
+    if is_stdout(file_path):
+        return True
+
+    if str(file_path).startswith("\\\\.\\pipe\\"):
+        # Windows named pipe
+        return True
+
+    try:
+        return stat.S_ISFIFO(os.stat(file_path).st_mode)
+    except OSError:
+        return False
+
+
+def get_output_sink(file_path: str):
+    """
+    Return the path of an output file, or a binary file object on the standard output for
+    "-" (closing it does not close the standard output).
+    """
+
+    if not is_stdout(file_path):
+        return file_path
+
+    # Messages printed so far are written before the data
+    sys.stdout.flush()
+
+    return os.fdopen(os.dup(sys.__stdout__.fileno()), "wb")
+
+
 def read_file(file_path: str) -> str:
     """
     Returns a string with the content of a text file.
@@ -84,6 +160,11 @@ def read_file(file_path: str) -> str:
     :rtype: str
     """
 
+    # Only needed to read the query, not to parse the arguments
+    from charset_normalizer import (  # pylint: disable=import-outside-toplevel
+        from_bytes,
+    )
+
     try:
         with open(file_path, "rb") as f:
             raw = f.read(READ_BYTES)
@@ -111,6 +192,51 @@ def is_extension(file_name: str, extension: str) -> bool:
     return Path(file_name).suffix == extension
 
 
+def split_compression_extension(file_name: str) -> tuple[str, str]:
+    """
+    Split the compression extension of a file name (e.g., "data.csv.gz").
+
+    :param file_name: The name/path of the file.
+
+    :return: File name without the compression extension and the extension
+        (empty if the file is not compressed).
+    :rtype: tuple[str, str]
+    """
+
+    path = Path(file_name)
+
+    if path.suffix.lower() in COMPRESSION_EXTENSIONS:
+        return str(path.with_suffix("")), path.suffix
+
+    return file_name, ""
+
+
+def get_compression(file_name: str, compression: Optional[str] = None):
+    """
+    Return the compression codec of a file: `compression` if specified, or the codec of
+    its extension (e.g., "gzip" for ".gz").
+
+    :param file_name: The name/path of the file.
+    :param compression: Codec requested for the file (e.g., --compression).
+
+    :return: Codec name, or None if the file is not compressed.
+    :rtype: str
+
+    :raises ValueError: If the requested codec is not the one of the extension (e.g.,
+        zstd for "data.csv.gz").
+    """
+
+    extension_compression = COMPRESSION_EXTENSIONS.get(Path(file_name).suffix.lower())
+
+    if compression and extension_compression and compression != extension_compression:
+        raise ValueError(
+            f"The compression '{compression}' does not match the extension of "
+            f"{file_name} ({extension_compression})."
+        )
+
+    return compression or extension_compression
+
+
 def replace_extension(file_name: str, new_extension: str) -> str:
     """
     Replace the extension of the file.
@@ -148,6 +274,23 @@ def add_timestamp_to_filename(file_name: str, date_format="%Y%m%d_%H_%M_%S") ->
     return str(original_file.with_stem(new_file_name))
 
 
+def add_suffix_to_filename(file_name: str, suffix: str) -> str:
+    """
+    Add a suffix to a file name, before its extension (and compression extension).
+
+    :param file_name: The original file name (could be an absolute file path).
+    :param suffix: Text to add (e.g., "_part1").
+
+    :return: New file name with the suffix (e.g., "data_part1.csv.gz").
+    :rtype: str
+    """
+
+    file_name, compression_extension = split_compression_extension(file_name)
+    path = Path(file_name)
+
+    return str(path.with_stem(f"{path.stem}{suffix}")) + compression_extension
+
+
 def is_relative_path(path: str) -> bool:
     """
     Returns `True` if the path is relative.
@@ -178,6 +321,19 @@ def replace_path(file_path: str, new_path: str) -> str:
     return str(Path.joinpath(path_new.parent, path_old.name))
 
 
+def split_values(text: str) -> list[str]:
+    """
+    Split a comma separated string into a list of values.
+
+    :param text: Comma separated values (e.g., "col1, col2").
+
+    :return: List of non-empty values without surrounding spaces.
+    :rtype: list[str]
+    """
+
+    return [value.strip() for value in text.split(",") if value.strip()]
+
+
 def start_process() -> float:
     """
     Log the start datetime and return the time.
@@ -217,6 +373,127 @@ def end_process(start_time: float):
         print(f"Execution Time: {seconds:.2f}s")
 
 
+def get_peak_memory() -> int:
+    """
+    Return the peak memory (resident set size) used by the process.
+
+    :return: Peak memory in bytes, or 0 if it cannot be determined.
+    :rtype: int
+    """
+
+    try:
+        import resource  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return _get_peak_memory_windows()
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # macOS reports bytes, Linux reports kilobytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _get_peak_memory_windows() -> int:
+    # pylint: disable=invalid-name
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("cb", ctypes.c_ulong),
+            ("PageFaultCount", ctypes.c_ulong),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    try:
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+
+        if ctypes.windll.psapi.GetProcessMemoryInfo(
+            process, ctypes.byref(counters), counters.cb
+        ):
+            return counters.PeakWorkingSetSize
+    except (AttributeError, OSError):
+        pass
+
+    return 0
+
+
+def format_bytes(size: float) -> str:
+    """
+    Format a size in bytes with a readable unit.
+
+    :param size: Size in bytes.
+
+    :return: Size with unit (e.g., "1.50 GB").
+    :rtype: str
+    """
+
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(size) < 1024:
+            return f"{size:.2f} {unit}"
+        size /= 1024
+
+    return f"{size:.2f} TB"
+
+
+def parse_bytes(text: str) -> int:
+    """
+    Parse a size in bytes with an optional unit (B, KB, MB, GB or TB, powers of 1024).
+
+    :param text: Size (e.g., "512MB", "1.5 GB", "1048576").
+
+    :return: Size in bytes.
+    :rtype: int
+    """
+
+    value = text.strip().upper()
+    factor = 1
+
+    for power, unit in enumerate(("KB", "MB", "GB", "TB"), start=1):
+        if value.endswith(unit):
+            value = value[: -len(unit)]
+            factor = 1024**power
+            break
+    else:
+        if value.endswith("B"):
+            value = value[:-1]
+
+    try:
+        return int(float(value) * factor)
+    except ValueError as e:
+        raise ValueError(f"Invalid size '{text}' (e.g., 512MB, 2GB).") from e
+
+
+def parse_duration(text: str) -> float:
+    """
+    Parse a duration in seconds with an optional unit (s, m, h or d).
+
+    :param text: Duration (e.g., "90", "30m", "12h", "7d").
+
+    :return: Duration in seconds.
+    :rtype: float
+    """
+
+    value = text.strip().lower()
+    factor = 1
+
+    for unit, seconds in (("s", 1), ("m", 60), ("h", 60 * 60), ("d", 24 * 60 * 60)):
+        if value.endswith(unit):
+            value = value[: -len(unit)]
+            factor = seconds
+            break
+
+    try:
+        return float(value) * factor
+    except ValueError as e:
+        raise ValueError(f"Invalid duration '{text}' (e.g., 30m, 12h, 7d).") from e
+
+
 def ensure_valid_escape_sequences(text: str) -> str:
     """
     Ensure that escape sequences are valid in the text.
@@ -32,7 +32,9 @@ setup(
     long_description_content_type="text/markdown",
     author=user,
     url=repo_url,  # GitHub repository URL
-    packages=find_packages(),  # Automatically find modules
+    packages=find_packages(
+        exclude=["tests", "tests.*", "benchmarks", "benchmarks.*"]
+    ),  # Automatically find modules
     python_requires=">=3.8",  # Specify minimum Python version
     install_requires=requires,
     entry_points={
@@ -40,7 +42,7 @@ setup(
             cli,  # CLI entry point
         ],
     },
-    keywords="SQL Excel csv txt export data extraction",
+    keywords="SQL Excel csv txt parquet arrow feather odbc export data extraction",
     classifiers=[
         "Programming Language :: Python",
         "Programming Language :: Python :: 3",
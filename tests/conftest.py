@@ -0,0 +1,56 @@
+"""
+Fixtures shared by the tests
+"""
+
+from contextlib import contextmanager
+import pytest
+from extractsql import backends
+from extractsql.constants import BACKEND_PYODBC
+from benchmarks.fakecursor import FakeCursor
+
+
+class FakeDatabase:
+    """
+    pyodbc backend that returns fake cursors instead of running the queries.
+
+    Args:
+        cursor: Returns the cursor of an executed query and its parameters (1,000 rows of
+            the default columns if not set).
+    """
+
+    def __init__(self):
+        self.executed: list[tuple] = []
+        self.cursor = lambda query, params: FakeCursor(1000)
+
+    @contextmanager
+    def execute(self, connection_string, query, params=None, pool=None, **kwargs):
+        """
+        Record the query and yield its cursor.
+        """
+
+        self.executed.append((query, params))
+        yield self.cursor(query, params)
+
+
+@pytest.fixture
+def fake_database(monkeypatch) -> FakeDatabase:
+    """
+    Run the queries of the test against a `FakeDatabase`.
+    """
+
+    database = FakeDatabase()
+    monkeypatch.setitem(backends.BACKENDS, BACKEND_PYODBC, database.execute)
+
+    return database
+
+
+@pytest.fixture
+def query_file(tmp_path) -> str:
+    """
+    Path of a query file.
+    """
+
+    file_path = tmp_path / "query.sql"
+    file_path.write_text("SELECT * FROM t", encoding="utf-8")
+
+    return str(file_path)
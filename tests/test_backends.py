@@ -0,0 +1,89 @@
+"""
+Tests of the fetch backends
+"""
+
+import sys
+import types
+import pyarrow as pa
+import pytest
+from extractsql.backends import get_backend
+from extractsql.constants import BACKEND_ARROW_ODBC, QUEUE_SIZE
+
+
+class FakeBatchReader:
+    """
+    arrow-odbc `BatchReader` over lists of record batches, recording the buffer options
+    of each result set.
+    """
+
+    def __init__(self, result_sets: list[list[pa.RecordBatch]], **options):
+        self.result_sets = result_sets
+        self.options = [options]
+
+    @property
+    def schema(self) -> pa.Schema:
+        return self.result_sets[0][0].schema
+
+    def __iter__(self):
+        return iter(self.result_sets[0])
+
+    def more_results(self, **options) -> bool:
+        self.options.append(options)
+        self.result_sets = self.result_sets[1:]
+        return bool(self.result_sets)
+
+
+@pytest.fixture
+def readers(monkeypatch) -> list[FakeBatchReader]:
+    """
+    Replace arrow-odbc with readers of two result sets. Returns the created readers.
+    """
+
+    created = []
+
+    def read_arrow_batches_from_odbc(query, connection_string, parameters, **options):
+        result_sets = [
+            [pa.record_batch({"id": pa.array(range(size), pa.int32())})]
+            for size in (3, 2)
+        ]
+        created.append(FakeBatchReader(result_sets, **options))
+        return created[-1]
+
+    module = types.ModuleType("arrow_odbc")
+    module.read_arrow_batches_from_odbc = read_arrow_batches_from_odbc
+    monkeypatch.setitem(sys.modules, "arrow_odbc", module)
+
+    return created
+
+
+def test_next_result_sets_keep_the_buffer_options(readers):
+    execute = get_backend(BACKEND_ARROW_ODBC)
+
+    with execute(
+        "DSN=fake",
+        "SELECT 1; SELECT 2",
+        batch_size=500,
+        max_memory=6000,
+        pipelined=True,
+    ) as cursor:
+        sizes = [len(cursor.fetchmany(10))]
+        while cursor.nextset():
+            sizes.append(len(cursor.fetchmany(10)))
+
+    expected = {"batch_size": 500, "max_bytes_per_batch": 6000 // (QUEUE_SIZE + 2)}
+
+    assert sizes == [3, 2]
+    assert readers[0].options == [expected, expected, expected]
+
+
+def test_default_buffer_options(readers):
+    with get_backend(BACKEND_ARROW_ODBC)("DSN=fake", "SELECT 1") as cursor:
+        cursor.nextset()
+
+    assert readers[0].options[0] == readers[0].options[1]
+    assert "max_bytes_per_batch" not in readers[0].options[0]
+
+
+def test_invalid_backend():
+    with pytest.raises(ValueError, match="Invalid backend"):
+        get_backend("jdbc")
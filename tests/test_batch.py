@@ -0,0 +1,98 @@
+"""
+Tests of the batch mode
+"""
+
+import os
+import json
+import pytest
+from extractsql import batch
+from extractsql.main import _get_job
+
+ODBC_DRIVER = "ODBC Driver 18 for SQL Server"
+
+
+@pytest.fixture
+def manifest_file(tmp_path, query_file) -> str:
+    # Query files are relative to the manifest (query.sql next to it)
+    return str(tmp_path / "manifest.json")
+
+
+def get_jobs(entries: list[dict], manifest_file: str) -> list[batch.Job]:
+    defaults = {"server": "localhost", "database": "sales", "output_format": "csv"}
+
+    return [
+        _get_job({**defaults, **entry}, index, manifest_file, ODBC_DRIVER)
+        for index, entry in enumerate(entries, start=1)
+    ]
+
+
+def test_output_file_of_job_name(tmp_path, manifest_file):
+    first, second = get_jobs(
+        [
+            {"query_file": "query.sql", "name": "one"},
+            {"query_file": "query.sql", "name": "two", "output_format": "csv,parquet"},
+        ],
+        manifest_file,
+    )
+
+    assert [os.path.dirname(file) for file in first.output_files] == [str(tmp_path)]
+    assert os.path.basename(first.output_files[0]).startswith("one_")
+    assert [os.path.splitext(file)[1] for file in second.output_files] == [
+        ".csv",
+        ".parquet",
+    ]
+    assert all(
+        os.path.basename(file).startswith("two_") for file in second.output_files
+    )
+
+
+def test_output_file_of_query_file(manifest_file):
+    (job,) = get_jobs([{"query_file": "query.sql"}], manifest_file)
+
+    assert job.name == "query"
+    assert os.path.basename(job.output_files[0]).startswith("query_")
+
+
+def test_same_output_file_rejected(fake_database, manifest_file):
+    jobs = get_jobs(
+        [{"query_file": "query.sql"}, {"query_file": "query.sql", "pipelined": True}],
+        manifest_file,
+    )
+
+    with pytest.raises(ValueError, match="write the same file"):
+        batch.run_jobs(jobs, workers=2)
+
+    assert not fake_database.executed
+
+
+def test_run_jobs(tmp_path, fake_database, manifest_file):
+    jobs = get_jobs(
+        [
+            {"query_file": "query.sql", "name": "one"},
+            {"query_file": "query.sql", "name": "two", "pipelined": True},
+            {"query_file": "missing.sql", "name": "three"},
+        ],
+        manifest_file,
+    )
+    for job in jobs:
+        job.options["progress"] = False
+
+    results = batch.run_jobs(jobs, workers=2)
+
+    assert [result.status for result in results] == [
+        batch.STATUS_OK,
+        batch.STATUS_OK,
+        batch.STATUS_FAILED,
+    ]
+    assert [result.rows for result in results] == [1000, 1000, 0]
+    assert results[0].output_file != results[1].output_file
+    assert all(os.path.exists(result.output_file) for result in results[:2])
+
+    summary_file = tmp_path / "summary.json"
+    batch.write_summary(results, str(summary_file))
+
+    assert [record["name"] for record in json.loads(summary_file.read_text())] == [
+        "one",
+        "two",
+        "three",
+    ]
@@ -0,0 +1,122 @@
+"""
+Tests of the adaptive batch size
+"""
+
+import pytest
+from extractsql import batching
+from extractsql.batching import BatchSizer, get_fetch, get_batches_in_memory
+from extractsql.constants import INITIAL_BATCH_SIZE, QUEUE_SIZE
+from benchmarks.fakecursor import FakeCursor
+
+
+class TimedCursor(FakeCursor):
+    """
+    Fake cursor that advances a fake clock by a fixed time per fetch and per row.
+    """
+
+    def __init__(self, rows: int, fetch_seconds: float, row_seconds: float, **kwargs):
+        super().__init__(rows, **kwargs)
+        self.fetch_seconds = fetch_seconds
+        self.row_seconds = row_seconds
+        self.now = 0.0
+
+    def fetchmany(self, size: int) -> list[tuple]:
+        rows = super().fetchmany(size)
+        self.now += self.fetch_seconds + self.row_seconds * len(rows)
+        return rows
+
+
+@pytest.fixture
+def timed_cursor(monkeypatch):
+    def create(rows: int, fetch_seconds=0.0, row_seconds=1e-6, **kwargs):
+        cursor = TimedCursor(rows, fetch_seconds, row_seconds, **kwargs)
+        monkeypatch.setattr(batching.time, "perf_counter", lambda: cursor.now)
+        return cursor
+
+    return create
+
+
+def fetch_sizes(sizer: BatchSizer, batches: int) -> list[int]:
+    return [len(sizer.fetchmany()) for _ in range(batches)]
+
+
+def test_grows_to_memory_limit(timed_cursor):
+    # Larger batches are faster (fixed cost per fetch)
+    cursor = timed_cursor(200_000, fetch_seconds=0.01)
+    sizer = BatchSizer(cursor, 4 * 1024**2)
+
+    sizes = fetch_sizes(sizer, 10)
+
+    assert sizes[0] == INITIAL_BATCH_SIZE
+    assert sizes == sorted(sizes)
+    assert sizer.size > INITIAL_BATCH_SIZE
+    assert sizer.size * sizer.row_bytes <= sizer.budget
+
+
+def test_grows_without_speedup(timed_cursor):
+    # Same rate for every batch size: the growth is held, but not stopped
+    cursor = timed_cursor(500_000)
+    sizer = BatchSizer(cursor, 64 * 1024**2)
+
+    fetch_sizes(sizer, 40)
+
+    assert sizer.size >= 8 * INITIAL_BATCH_SIZE
+
+
+def test_grows_to_max_batch_size(timed_cursor, monkeypatch):
+    monkeypatch.setattr(batching, "MAX_BATCH_SIZE", 4 * INITIAL_BATCH_SIZE)
+    cursor = timed_cursor(100_000, fetch_seconds=0.01)
+    sizer = BatchSizer(cursor, 1024**3)
+
+    fetch_sizes(sizer, 6)
+
+    assert sizer.size == 4 * INITIAL_BATCH_SIZE
+
+
+def test_shrinks_when_rows_widen(timed_cursor):
+    cursor = timed_cursor(200_000, fetch_seconds=0.01)
+    sizer = BatchSizer(cursor, 4 * 1024**2)
+    fetch_sizes(sizer, 10)
+    size = sizer.size
+
+    # Text column 10 times wider
+    cursor._values[1] = [value and value * 10 for value in cursor._values[1]]
+    fetch_sizes(sizer, 1)
+
+    assert sizer.size < size
+    assert sizer.size * sizer.row_bytes <= sizer.budget
+
+    # Back to narrow rows: the size grows again
+    cursor._values[1] = [
+        value and value[: len(value) // 10] for value in cursor._values[1]
+    ]
+    smaller = sizer.size
+    fetch_sizes(sizer, 6)
+
+    assert sizer.size > smaller
+
+
+def test_partial_batch_is_the_end(timed_cursor):
+    cursor = timed_cursor(INITIAL_BATCH_SIZE + 10, fetch_seconds=0.01)
+    sizer = BatchSizer(cursor, 4 * 1024**2)
+
+    assert fetch_sizes(sizer, 3) == [INITIAL_BATCH_SIZE, 10, 0]
+
+
+def test_get_fetch_without_budget():
+    fetch = get_fetch(FakeCursor(250), batch_size=100)
+
+    assert [len(fetch()) for _ in range(4)] == [100, 100, 50, 0]
+
+
+def test_get_fetch_shares_budget():
+    fetch = get_fetch(FakeCursor(10), max_memory=6000, batches=3)
+
+    assert fetch.__self__.budget == 2000
+
+
+def test_get_batches_in_memory():
+    assert get_batches_in_memory() == 1
+    assert get_batches_in_memory(pipelined=False, queue_size=10) == 1
+    assert get_batches_in_memory(pipelined=True) == QUEUE_SIZE + 2
+    assert get_batches_in_memory(pipelined=True, queue_size=0) == 3
@@ -0,0 +1,74 @@
+"""
+Tests of the result cache
+"""
+
+import pytest
+from extractsql import cache as cache_module
+from extractsql.cache import ResultCache
+from benchmarks.fakecursor import FakeCursor
+
+
+@pytest.fixture
+def result_cache(tmp_path, monkeypatch):
+    # One second per call, so every put and get has its own time
+    clock = iter(range(1, 1000))
+    monkeypatch.setattr(cache_module.time, "time", lambda: next(clock))
+
+    return ResultCache(str(tmp_path / "cache"), max_size=250)
+
+
+def put(result_cache: ResultCache, key: str, size: int):
+    file_path = result_cache.new_file(key)
+
+    with open(file_path, "wb") as f:
+        f.write(b"x" * size)
+
+    return result_cache.put(key, file_path, FakeCursor(0).description, 0)
+
+
+def get_keys(result_cache: ResultCache) -> set[str]:
+    return {entry.key for entry in result_cache.entries()}
+
+
+def test_evict_within_limit(result_cache):
+    put(result_cache, "a", 100)
+    put(result_cache, "b", 100)
+
+    result_cache.evict()
+
+    assert get_keys(result_cache) == {"a", "b"}
+
+
+def test_evict_least_recently_used(result_cache):
+    put(result_cache, "a", 100)
+    put(result_cache, "b", 100)
+    put(result_cache, "c", 100)
+
+    # "a" is used after "b": "b" is the least recently used
+    assert result_cache.get("a") is not None
+
+    result_cache.evict()
+
+    assert get_keys(result_cache) == {"a", "c"}
+    assert result_cache.get("b") is None
+    assert not list(result_cache.directory.glob("b.*"))
+
+
+def test_evict_until_it_fits(result_cache):
+    put(result_cache, "a", 100)
+    put(result_cache, "b", 100)
+    put(result_cache, "c", 200)
+
+    result_cache.evict()
+
+    assert get_keys(result_cache) == {"c"}
+
+
+def test_entry_description(result_cache):
+    description = FakeCursor(0).description
+    put(result_cache, "a", 10)
+
+    entry = result_cache.get("a")
+
+    assert entry.size == 10
+    assert entry.description == [tuple(column) for column in description]
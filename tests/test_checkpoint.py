@@ -0,0 +1,150 @@
+"""
+Tests of the resumable exports
+"""
+
+import os
+import pytest
+from extractsql.checkpoint import Checkpoint, extract_resumable
+from extractsql.extract import extract_to
+from extractsql.tocsv import export_to_csv
+from extractsql.utils import ConnString
+from benchmarks.fakecursor import FakeCursor
+
+ROWS = 1000
+BATCH_SIZE = 100
+
+
+class KeyedCursor(FakeCursor):
+    """
+    Fake cursor over the rows of a query ordered by its first column, a unique key (the
+    row number), starting after `last_key`. Fails after `fail_after` fetches, if set.
+    """
+
+    def __init__(self, last_key=None, fail_after=None):
+        super().__init__(ROWS)
+        self._values[0] = list(range(ROWS))
+        self._position = 0 if last_key is None else last_key + 1
+        self.fail_after = fail_after
+        self.fetches = 0
+
+    def fetchmany(self, size: int) -> list[tuple]:
+        if self.fail_after is not None and self.fetches >= self.fail_after:
+            raise RuntimeError("Connection lost")
+
+        self.fetches += 1
+        return super().fetchmany(size)
+
+
+@pytest.fixture
+def database(fake_database):
+    """
+    Run the queries against `KeyedCursor`; set `fail_after` to fail the next exports.
+    """
+
+    fake_database.fail_after = None
+    fake_database.cursor = lambda query, params: KeyedCursor(
+        params[0] if params else None, fake_database.fail_after
+    )
+
+    return fake_database
+
+
+def export(tmp_path, resume=False) -> int:
+    return extract_resumable(
+        "DSN=fake",
+        "SELECT * FROM t",
+        str(tmp_path / "out.csv"),
+        export_to_csv,
+        resume_key="int_0",
+        checkpoint_file=str(tmp_path / "out.checkpoint"),
+        resume=resume,
+        batch_size=BATCH_SIZE,
+        progress=False,
+    )
+
+
+def test_export_removes_checkpoint(tmp_path, database):
+    assert export(tmp_path) == ROWS
+    assert not (tmp_path / "out.checkpoint").exists()
+    assert database.executed[0][0].endswith("ORDER BY [int_0]")
+    assert database.executed[0][1] is None
+
+
+def test_failed_export_keeps_checkpoint(tmp_path, database):
+    database.fail_after = 4
+
+    with pytest.raises(RuntimeError, match="Connection lost"):
+        export(tmp_path)
+
+    checkpoint = Checkpoint.load(str(tmp_path / "out.checkpoint"))
+
+    assert checkpoint.rows == 4 * BATCH_SIZE
+    assert checkpoint.last_key == 4 * BATCH_SIZE - 1
+    assert checkpoint.offset == os.path.getsize(tmp_path / "out.csv")
+
+
+def test_resume_truncates_and_continues(tmp_path, database):
+    (tmp_path / "full").mkdir()
+    export(tmp_path / "full")
+    expected = (tmp_path / "full" / "out.csv").read_bytes()
+
+    database.fail_after = 4
+
+    with pytest.raises(RuntimeError):
+        export(tmp_path)
+
+    # Part of a batch written after the last checkpoint
+    with open(tmp_path / "out.csv", "ab") as f:
+        f.write(b"999,partial")
+
+    database.fail_after = None
+
+    assert export(tmp_path, resume=True) == ROWS
+    assert (tmp_path / "out.csv").read_bytes() == expected
+    assert not (tmp_path / "out.checkpoint").exists()
+
+    query, params = database.executed[-1]
+    assert "WHERE [int_0] > ?" in query
+    assert params == [4 * BATCH_SIZE - 1]
+
+
+def test_resume_without_checkpoint(tmp_path, database):
+    assert export(tmp_path, resume=True) == ROWS
+    assert database.executed[0][1] is None
+
+
+def test_resume_with_another_key(tmp_path, database):
+    Checkpoint(str(tmp_path / "out.checkpoint"), "id", str(tmp_path / "out.csv")).save()
+
+    with pytest.raises(ValueError, match="'id'"):
+        export(tmp_path, resume=True)
+
+
+def test_resumed_output_file(tmp_path, database, query_file):
+    def extract(output_file, resume=False):
+        return extract_to(
+            ConnString("localhost", "sales"),
+            query_file,
+            str(tmp_path / output_file),
+            resume_key="int_0",
+            resume=resume,
+            batch_size=BATCH_SIZE,
+            progress=False,
+        )
+
+    database.fail_after = 3
+
+    with pytest.raises(RuntimeError):
+        extract("first.csv")
+
+    assert (tmp_path / "query.checkpoint.json").exists()
+
+    database.fail_after = None
+
+    # The rows are appended to the file of the checkpoint, not the new output file
+    rows, output_files = extract("second.csv", resume=True)
+
+    assert rows == ROWS
+    assert output_files == [str(tmp_path / "first.csv")]
+    assert not (tmp_path / "second.csv").exists()
+    assert not (tmp_path / "query.checkpoint.json").exists()
@@ -0,0 +1,93 @@
+"""
+Tests of the compressed flat files
+"""
+
+import bz2
+import gzip
+import pyarrow as pa
+import pytest
+from extractsql import utils
+from extractsql.compress import CompressedOutput
+from extractsql.extract import extract_to
+from extractsql.tocsv import export_to_csv
+from benchmarks.fakecursor import FakeCursor
+
+# Decompress concatenated members/frames
+DECOMPRESS = {
+    "gzip": gzip.decompress,
+    "bz2": bz2.decompress,
+    "zstd": lambda data: pa.input_stream(pa.py_buffer(data), "zstd").read(),
+    "lz4": lambda data: pa.input_stream(pa.py_buffer(data), "lz4").read(),
+}
+
+EXTENSIONS = {"gzip": ".gz", "bz2": ".bz2", "zstd": ".zst", "lz4": ".lz4"}
+
+
+def export(file_path, **kwargs):
+    # Small buffers, so the file has many frames compressed by several threads
+    export_to_csv(
+        FakeCursor(3000),
+        str(file_path),
+        batch_size=500,
+        buffer_size=4096,
+        compression_workers=3,
+        progress=False,
+        **kwargs,
+    )
+
+
+@pytest.mark.parametrize("codec", list(DECOMPRESS))
+def test_round_trip(tmp_path, codec):
+    export(tmp_path / "plain.csv")
+    export(tmp_path / f"out.csv{EXTENSIONS[codec]}")
+    export(tmp_path / "out.csv", compression=codec)
+
+    expected = (tmp_path / "plain.csv").read_bytes()
+
+    for file_name in (f"out.csv{EXTENSIONS[codec]}", "out.csv"):
+        data = (tmp_path / file_name).read_bytes()
+
+        assert data != expected
+        assert DECOMPRESS[codec](data) == expected
+
+
+@pytest.mark.parametrize("codec", list(DECOMPRESS))
+def test_append(tmp_path, codec):
+    file_path = tmp_path / "out.bin"
+
+    for part, append in ((b"first\n" * 1000, False), (b"second\n" * 1000, True)):
+        with CompressedOutput(
+            str(file_path), codec, chunk_size=1000, workers=2, append=append
+        ) as output:
+            output.write(part)
+
+    assert DECOMPRESS[codec](file_path.read_bytes()) == (
+        b"first\n" * 1000 + b"second\n" * 1000
+    )
+
+
+def test_get_compression():
+    assert utils.get_compression("out.csv") is None
+    assert utils.get_compression("out.csv.gz") == "gzip"
+    assert utils.get_compression("out.csv", "zstd") == "zstd"
+    assert utils.get_compression("out.csv.gz", "gzip") == "gzip"
+
+
+@pytest.mark.parametrize("compression", ["zstd", "none"])
+def test_compression_conflicts_with_extension(compression):
+    with pytest.raises(ValueError, match="does not match the extension"):
+        utils.get_compression("out.csv.gz", compression)
+
+
+def test_conflict_fails_before_the_query(tmp_path, fake_database, query_file):
+    with pytest.raises(ValueError, match="does not match the extension"):
+        extract_to(
+            utils.ConnString("localhost", "sales"),
+            query_file,
+            str(tmp_path / "out.csv.gz"),
+            compression="zstd",
+            progress=False,
+        )
+
+    assert not fake_database.executed
+    assert not (tmp_path / "out.csv.gz").exists()
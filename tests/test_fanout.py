@@ -0,0 +1,85 @@
+"""
+Tests of the export of one result to several files
+"""
+
+import pytest
+from extractsql.fanout import export_to_many
+from extractsql.tocsv import export_to_csv
+from extractsql.toparquet import export_to_parquet
+from benchmarks.fakecursor import FakeCursor
+
+ROWS = 1000
+BATCH_SIZE = 100
+
+
+class FailingCursor(FakeCursor):
+    """
+    Fake cursor that fails after `fail_after` fetches.
+    """
+
+    def __init__(self, rows: int, fail_after: int):
+        super().__init__(rows)
+        self.fail_after = fail_after
+
+    def fetchmany(self, size: int) -> list[tuple]:
+        if self.fail_after == 0:
+            raise RuntimeError("Connection lost")
+
+        self.fail_after -= 1
+        return super().fetchmany(size)
+
+
+def fail_export(cursor, file_path, batch_size, **kwargs):
+    cursor.fetchmany(batch_size)
+    raise OSError(f"Disk full: {file_path}")
+
+
+def export(cursor, output_files, export_functions, **kwargs) -> int:
+    return export_to_many(
+        cursor,
+        [str(output_file) for output_file in output_files],
+        BATCH_SIZE,
+        export_functions,
+        queue_size=2,
+        progress=False,
+        **kwargs,
+    )
+
+
+def count_lines(file_path) -> int:
+    with open(file_path, encoding="utf-8") as f:
+        return sum(1 for _ in f)
+
+
+def test_export_to_many(tmp_path):
+    files = [tmp_path / "out.csv", tmp_path / "out.parquet"]
+
+    rows = export(FakeCursor(ROWS), files, [export_to_csv, export_to_parquet])
+
+    assert rows == ROWS
+    assert count_lines(files[0]) == ROWS + 1
+    assert files[1].stat().st_size > 0
+
+
+def test_writer_error_is_raised_after_the_others(tmp_path):
+    files = [tmp_path / "out.csv", tmp_path / "failed.csv"]
+
+    with pytest.raises(OSError, match="Disk full"):
+        export(FakeCursor(ROWS), files, [export_to_csv, fail_export])
+
+    # The other writer completed its file
+    assert count_lines(files[0]) == ROWS + 1
+
+
+def test_all_writers_fail(tmp_path):
+    files = [tmp_path / "a.csv", tmp_path / "b.csv"]
+
+    with pytest.raises(OSError, match="a.csv"):
+        export(FakeCursor(ROWS), files, [fail_export, fail_export])
+
+
+def test_fetch_error_is_raised(tmp_path):
+    files = [tmp_path / "a.csv", tmp_path / "b.csv"]
+
+    with pytest.raises(RuntimeError, match="Connection lost"):
+        export(FailingCursor(ROWS, 3), files, [export_to_csv, export_to_csv])
@@ -0,0 +1,166 @@
+"""
+Tests of the incremental extraction
+"""
+
+import csv
+from decimal import Decimal
+from datetime import datetime, date
+from contextlib import contextmanager
+import pytest
+from extractsql.incremental import (
+    encode_value,
+    decode_value,
+    read_state,
+    write_state,
+    extract_incremental,
+)
+from extractsql.tocsv import export_to_csv
+from benchmarks.fakecursor import FakeCursor
+
+
+class Table:
+    """
+    Fake table with the keys 0 to `rows` - 1, queried by watermark filter (`select`), and
+    connection pool whose connections return the maximum key.
+    """
+
+    def __init__(self, rows: int):
+        self.rows = rows
+
+    def select(self, query, params):
+        low = params[0] + 1 if len(params) == 2 else 0
+        keys = list(range(low, params[-1] + 1))
+
+        cursor = FakeCursor(len(keys), types=["int", "str"], columns=2)
+        cursor._values[0] = keys
+        return cursor
+
+    @contextmanager
+    def connection(self):
+        yield self
+
+    def cursor(self):
+        return self
+
+    def execute(self, statement):
+        assert statement.startswith("SELECT MAX([int_0])")
+        return self
+
+    def fetchone(self) -> tuple:
+        return (self.rows - 1 if self.rows else None,)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def table(fake_database) -> Table:
+    table = Table(100)
+    fake_database.cursor = table.select
+    return table
+
+
+def extract(tmp_path, table: Table, fn=export_to_csv, **kwargs) -> int:
+    return extract_incremental(
+        "DSN=fake",
+        "SELECT * FROM t",
+        str(tmp_path / "out.csv"),
+        fn,
+        pool=table,
+        watermark_column="int_0",
+        state_file=str(tmp_path / "state.json"),
+        append=True,
+        progress=False,
+        **kwargs,
+    )
+
+
+def read_keys(file_path) -> list[int]:
+    with open(file_path, encoding="utf-8", newline="") as f:
+        return [int(row[0]) for row in csv.reader(f) if row[0] != "int_0"]
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        42,
+        1.5,
+        Decimal("12345678901234567890.1234"),
+        "abc",
+        datetime(2024, 1, 2, 3, 4, 5, 678901),
+        date(2024, 1, 2),
+    ],
+)
+def test_encode_value(value):
+    decoded = decode_value(encode_value(value))
+
+    assert decoded == value
+    assert type(decoded) is type(value)
+
+
+def test_encode_invalid_value():
+    with pytest.raises(ValueError, match="bytes"):
+        encode_value(b"abc")
+
+
+def test_state_round_trip(tmp_path):
+    state_file = str(tmp_path / "state.json")
+    state = {"watermark_column": "updated", "watermark": datetime(2024, 1, 2, 3)}
+
+    assert read_state(state_file) is None
+
+    write_state(state_file, state)
+
+    assert read_state(state_file) == state
+
+
+def test_next_run_appends_new_rows(tmp_path, table, fake_database):
+    assert extract(tmp_path, table) == 100
+    assert read_state(str(tmp_path / "state.json"))["watermark"] == 99
+
+    table.rows = 150
+
+    assert extract(tmp_path, table) == 50
+    assert read_keys(tmp_path / "out.csv") == list(range(150))
+    assert fake_database.executed[-1][1] == [99, 149]
+
+
+def test_no_new_rows(tmp_path, table, fake_database):
+    extract(tmp_path, table)
+    state = read_state(str(tmp_path / "state.json"))
+
+    assert extract(tmp_path, table) == 0
+    assert read_state(str(tmp_path / "state.json")) == state
+    assert len(fake_database.executed) == 1
+
+
+def test_failed_run_keeps_state(tmp_path, table):
+    extract(tmp_path, table)
+    state = read_state(str(tmp_path / "state.json"))
+    size = (tmp_path / "out.csv").stat().st_size
+
+    def fail_export(cursor, file_path, **kwargs):
+        export_to_csv(cursor, file_path, **kwargs)
+        raise OSError("Disk full")
+
+    table.rows = 150
+
+    with pytest.raises(OSError, match="Disk full"):
+        extract(tmp_path, table, fn=fail_export)
+
+    # The watermark is not advanced and the appended rows are removed
+    assert read_state(str(tmp_path / "state.json")) == state
+    assert (tmp_path / "out.csv").stat().st_size == size
+
+    # The next run exports the rows of the failed one
+    assert extract(tmp_path, table) == 50
+    assert read_keys(tmp_path / "out.csv") == list(range(150))
+
+
+def test_other_watermark_column(tmp_path, table):
+    write_state(
+        str(tmp_path / "state.json"), {"watermark_column": "id", "watermark": 1}
+    )
+
+    with pytest.raises(ValueError, match="'id'"):
+        extract(tmp_path, table)
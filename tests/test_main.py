@@ -0,0 +1,78 @@
+"""
+Tests of the command-line arguments
+"""
+
+import os
+import pytest
+from extractsql.main import _get_args, _get_arg_error
+from extractsql.extract import extract_to
+from extractsql.utils import ConnString
+
+needs_fifo = pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="No named pipes")
+
+
+@pytest.fixture
+def fifo(tmp_path) -> str:
+    file_path = str(tmp_path / "pipe")
+    os.mkfifo(file_path)
+    return file_path
+
+
+def get_arg_error(query_file: str, *argv: str):
+    return _get_arg_error(
+        _get_args(["-s", "localhost", "-d", "sales", "-q", query_file, *argv])
+    )
+
+
+@pytest.mark.parametrize("output_format", ["csv", "parquet", "arrows"])
+def test_stdout(query_file, output_format):
+    assert get_arg_error(query_file, "-o", "-", "-f", output_format) is None
+
+
+@pytest.mark.parametrize("output_format", [None, "xlsx", "parquet,arrows"])
+def test_stdout_format(query_file, output_format):
+    argv = ["-o", "-"] + (["-f", output_format] if output_format else [])
+
+    assert "One streamable format" in get_arg_error(query_file, *argv)
+
+
+@needs_fifo
+@pytest.mark.parametrize("output_format", ["xlsx", "parquet,arrows"])
+def test_named_pipe_format(query_file, fifo, output_format):
+    error = get_arg_error(query_file, "-o", fifo, "-f", output_format)
+
+    assert "One streamable format" in error
+
+
+@needs_fifo
+def test_named_pipe(query_file, fifo):
+    assert get_arg_error(query_file, "-o", fifo, "-f", "arrows") is None
+
+
+@needs_fifo
+def test_named_pipe_extension(query_file, tmp_path):
+    # Format of the extension
+    fifo = str(tmp_path / "events.csv")
+    os.mkfifo(fifo)
+
+    assert get_arg_error(query_file, "-o", fifo) is None
+
+
+def test_several_formats_to_files(query_file, tmp_path):
+    argv = ["-o", str(tmp_path / "out"), "-f", "parquet,arrows"]
+
+    assert get_arg_error(query_file, *argv) is None
+
+
+@needs_fifo
+def test_several_formats_to_named_pipe(query_file, fifo, fake_database):
+    with pytest.raises(ValueError, match="Only one format"):
+        extract_to(
+            ConnString("localhost", "sales"),
+            query_file,
+            fifo,
+            output_format="parquet,arrows",
+            progress=False,
+        )
+
+    assert not fake_database.executed
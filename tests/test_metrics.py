@@ -0,0 +1,78 @@
+"""
+Tests of the stage metrics
+"""
+
+import json
+import pytest
+from extractsql import utils
+from extractsql.metrics import Metrics
+from extractsql.extract import extract_to
+
+
+def test_report_file(tmp_path):
+    metrics_file = tmp_path / "metrics.json"
+    metrics = Metrics(query_file="query.sql")
+
+    with metrics.report(str(metrics_file)):
+        metrics.add("fetch", 1.5, 100, 2)
+        metrics.add("fetch", 0.5, 50, 1)
+
+    data = json.loads(metrics_file.read_text(encoding="utf-8"))
+
+    assert data["query_file"] == "query.sql"
+    assert data["status"] == "ok"
+    assert data["stages"]["fetch"] == {
+        "seconds": 2.0,
+        "rows": 150,
+        "batches": 3,
+        "bytes": 0,
+    }
+    # Only the report, no temporary file
+    assert [path.name for path in tmp_path.iterdir()] == ["metrics.json"]
+
+
+def test_report_file_replaced_at_once(tmp_path, monkeypatch):
+    written = []
+    monkeypatch.setattr(
+        utils, "write_json", lambda file_path, data: written.append(file_path)
+    )
+
+    with pytest.raises(RuntimeError):
+        with Metrics().report(str(tmp_path / "metrics.json")):
+            raise RuntimeError("Connection lost")
+
+    assert written == [str(tmp_path / "metrics.json")]
+
+
+def test_failed_report(tmp_path):
+    metrics_file = tmp_path / "metrics.json"
+
+    with pytest.raises(RuntimeError):
+        with Metrics().report(str(metrics_file)):
+            raise RuntimeError("Connection lost")
+
+    assert json.loads(metrics_file.read_text(encoding="utf-8"))["status"] == "failed"
+
+
+def test_extract_metrics(tmp_path, fake_database, query_file):
+    metrics_file = tmp_path / "metrics.json"
+    output_file = tmp_path / "out.csv"
+
+    extract_to(
+        utils.ConnString("localhost", "sales"),
+        query_file,
+        str(output_file),
+        batch_size=300,
+        pipelined=True,
+        metrics_file=str(metrics_file),
+        progress=False,
+    )
+
+    data = json.loads(metrics_file.read_text(encoding="utf-8"))
+
+    assert data["rows"] == 1000
+    assert data["bytes"] == output_file.stat().st_size
+    assert data["stages"]["fetch"]["batches"] == 4
+    assert {"execute", "convert", "write", "fetch_wait", "write_wait"} <= set(
+        data["stages"]
+    )
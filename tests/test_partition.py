@@ -0,0 +1,139 @@
+"""
+Tests of the partitioned extraction
+"""
+
+import csv
+import time
+from decimal import Decimal
+from datetime import datetime, date
+import pytest
+from extractsql.partition import split_range, get_partition_filters
+from extractsql.extract import extract_to
+from extractsql.utils import ConnString
+from benchmarks.fakecursor import FakeCursor
+
+
+@pytest.mark.parametrize(
+    "low, high, partitions, expected",
+    [
+        (0, 100, 4, [25, 50, 75]),
+        (-10, 10, 2, [0]),
+        (
+            date(2024, 1, 1),
+            date(2024, 1, 5),
+            2,
+            [date(2024, 1, 3)],
+        ),
+        (
+            datetime(2024, 1, 1),
+            datetime(2024, 1, 2),
+            4,
+            [
+                datetime(2024, 1, 1, 6),
+                datetime(2024, 1, 1, 12),
+                datetime(2024, 1, 1, 18),
+            ],
+        ),
+        (
+            Decimal("0"),
+            Decimal("1"),
+            4,
+            [Decimal("0.25"), Decimal("0.5"), Decimal("0.75")],
+        ),
+        (0.0, 1.0, 2, [0.5]),
+    ],
+)
+def test_split_range(low, high, partitions, expected):
+    assert split_range(low, high, partitions) == expected
+
+
+def test_split_range_more_partitions_than_values():
+    # Distinct boundaries only: fewer partitions, all the values covered
+    assert split_range(1, 3, 10) == [2]
+    assert split_range(date(2024, 1, 1), date(2024, 1, 3), 10) == [date(2024, 1, 2)]
+    assert split_range(5, 5, 4) == []
+
+
+@pytest.mark.parametrize("low", [True, "a"])
+def test_split_range_invalid_type(low):
+    with pytest.raises(ValueError, match="partition bounds"):
+        split_range(low, low, 2)
+
+
+def test_get_partition_filters():
+    assert get_partition_filters("id", [10, 20]) == [
+        ("([id] < ? OR [id] IS NULL)", [10]),
+        ("[id] >= ? AND [id] < ?", [10, 20]),
+        ("[id] >= ?", [20]),
+    ]
+
+
+def test_get_partition_filters_without_bounds():
+    assert get_partition_filters("id", []) == [("", [])]
+
+
+def test_null_keys_in_one_partition():
+    filters = get_partition_filters("id", [10, 20, 30])
+
+    assert [where.count("IS NULL") for where, _ in filters] == [1, 0, 0, 0]
+
+
+def query_partition(query, params):
+    """
+    Cursor of a partition of a fake table with the keys 0 to 99 and NULL keys. The first
+    partition is the slowest, so the partitions do not complete in order.
+    """
+
+    if "IS NULL" in query:
+        keys, delay = [None] * 5 + list(range(params[0])), 0.3
+    elif len(params) == 2:
+        keys, delay = list(range(*params)), 0.0
+    else:
+        keys, delay = list(range(params[0], 100)), 0.0
+
+    time.sleep(delay)
+
+    cursor = FakeCursor(len(keys), types=["int", "str"], columns=2)
+    cursor._values[0] = keys
+    return cursor
+
+
+def extract(tmp_path, query_file, **kwargs):
+    return extract_to(
+        ConnString("localhost", "sales"),
+        query_file,
+        str(tmp_path / "out.csv"),
+        partition_column="int_0",
+        partition_bounds=[25, 50, 75],
+        workers=4,
+        progress=False,
+        **kwargs,
+    )
+
+
+def read_keys(file_path) -> list:
+    with open(file_path, encoding="utf-8", newline="") as f:
+        return [row[0] for row in csv.reader(f)][1:]
+
+
+def test_merged_partitions_in_order(tmp_path, fake_database, query_file):
+    fake_database.cursor = query_partition
+
+    rows, output_files = extract(tmp_path, query_file, merge_partitions=True)
+
+    assert rows == 105
+    assert output_files == [str(tmp_path / "out.csv")]
+    assert read_keys(output_files[0]) == [""] * 5 + [str(key) for key in range(100)]
+    assert all("ORDER BY [int_0]" in query for query, _ in fake_database.executed)
+
+
+def test_part_files_in_order(tmp_path, fake_database, query_file):
+    fake_database.cursor = query_partition
+
+    rows, output_files = extract(tmp_path, query_file)
+
+    assert rows == 105
+    assert output_files == [
+        str(tmp_path / f"out_part{index}.csv") for index in range(1, 5)
+    ]
+    assert [len(read_keys(file)) for file in output_files] == [30, 25, 25, 25]
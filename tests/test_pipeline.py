@@ -0,0 +1,138 @@
+"""
+Tests of the fetch/write pipeline
+"""
+
+import threading
+import pytest
+from extractsql.pipeline import run_pipeline
+from extractsql.metrics import Metrics
+from extractsql.tocsv import export_to_csv
+from benchmarks.fakecursor import FakeCursor
+
+# Longest time a pipeline may take before it is considered deadlocked
+TIMEOUT_SECONDS = 10
+
+
+def run(target):
+    """
+    Run a function on a daemon thread and return its result or raise its error, failing
+    if it does not complete in time (so a deadlock does not hang the tests).
+    """
+
+    outcome = {}
+
+    def call():
+        try:
+            outcome["result"] = target()
+        except BaseException as e:  # pylint: disable=broad-except
+            outcome["error"] = e
+
+    thread = threading.Thread(target=call, daemon=True)
+    thread.start()
+    thread.join(TIMEOUT_SECONDS)
+
+    if thread.is_alive():
+        pytest.fail("The pipeline did not complete (deadlock)")
+
+    if "error" in outcome:
+        raise outcome["error"]
+
+    return outcome["result"]
+
+
+def get_fetch(batches: list):
+    items = iter(batches)
+    return lambda: next(items, None)
+
+
+def endless_fetch():
+    return [1, 2, 3]
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_run_pipeline(pipelined):
+    batches = [[i] * (i + 1) for i in range(20)]
+    written = []
+
+    rows = run(
+        lambda: run_pipeline(
+            get_fetch(batches), written.append, pipelined=pipelined, queue_size=2
+        )
+    )
+
+    assert written == batches
+    assert rows == sum(len(batch) for batch in batches)
+
+
+def test_run_pipeline_empty():
+    assert run(lambda: run_pipeline(lambda: None, pytest.fail, pipelined=True)) == 0
+
+
+def test_run_pipeline_wait_stages():
+    metrics = Metrics()
+
+    run(
+        lambda: run_pipeline(
+            get_fetch([[1], [2]]), list, pipelined=True, metrics=metrics
+        )
+    )
+
+    assert "fetch_wait" in metrics.stages
+    assert "write_wait" in metrics.stages
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_writer_error(pipelined):
+    def write(batch):
+        raise OSError("Disk full")
+
+    # The fetch never ends and the queue is full: the fetch thread must be released
+    with pytest.raises(OSError, match="Disk full"):
+        run(
+            lambda: run_pipeline(
+                endless_fetch, write, pipelined=pipelined, queue_size=1
+            )
+        )
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_fetch_error(pipelined):
+    batches = iter([[1], [2], [3]])
+    written = []
+
+    def fetch():
+        batch = next(batches, None)
+
+        if batch is None:
+            raise RuntimeError("Connection lost")
+
+        return batch
+
+    with pytest.raises(RuntimeError, match="Connection lost"):
+        run(
+            lambda: run_pipeline(
+                fetch, written.append, pipelined=pipelined, queue_size=1
+            )
+        )
+
+    # The batches fetched before the error are written
+    assert written == [[1], [2], [3]]
+
+
+def test_pipelined_csv_is_the_same(tmp_path):
+    files = {}
+
+    for pipelined in (False, True):
+        file_path = tmp_path / f"pipelined_{pipelined}.csv"
+        export_to_csv(
+            FakeCursor(2500),
+            str(file_path),
+            batch_size=100,
+            pipelined=pipelined,
+            queue_size=2,
+            progress=False,
+        )
+        files[pipelined] = file_path.read_bytes()
+
+    assert files[True] == files[False]
+    assert files[True].count(b"\n") == 2501
@@ -0,0 +1,129 @@
+"""
+Tests of the library API that reads query results as record batches
+"""
+
+from contextlib import closing
+import pyarrow as pa
+import pytest
+from extractsql import backends
+from extractsql.reader import iter_batches, iter_result_sets
+from benchmarks.fakecursor import FakeCursor
+
+CONNECTION_STRING = "DRIVER=fake;SERVER=localhost;DATABASE=sales"
+
+
+class ScriptCursor(FakeCursor):
+    """
+    Fake pyodbc cursor of a script with two result sets of 250 rows, recording the fetched
+    rows and whether it was closed.
+    """
+
+    def __init__(self):
+        super().__init__(250, result_sets=2)
+        self.fetched = 0
+        self.closed = False
+
+    def execute(self, query, *params):
+        return self
+
+    def fetchmany(self, size: int) -> list[tuple]:
+        rows = super().fetchmany(size)
+        self.fetched += len(rows)
+        return rows
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    """
+    Fake pyodbc connection with one `ScriptCursor`.
+    """
+
+    def __init__(self):
+        self.script_cursor = ScriptCursor()
+        self.closed = False
+
+    def cursor(self) -> ScriptCursor:
+        return self.script_cursor
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def connections(monkeypatch) -> list[FakeConnection]:
+    """
+    Replace pyodbc connections with `FakeConnection`. Returns the opened connections.
+    """
+
+    opened = []
+
+    def connect(connection_string):
+        assert connection_string == CONNECTION_STRING
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    monkeypatch.setattr(backends.pyodbc, "connect", connect)
+
+    return opened
+
+
+def test_iter_batches(connections):
+    batches = list(iter_batches(CONNECTION_STRING, "SELECT 1", batch_size=100))
+
+    assert [batch.num_rows for batch in batches] == [100, 100, 50]
+    assert all(isinstance(batch, pa.RecordBatch) for batch in batches)
+    assert batches[0].schema.names == [name for name, *_ in FakeCursor(0).description]
+    assert connections[0].closed
+    assert connections[0].script_cursor.closed
+
+
+def test_early_break_closes_connection(connections):
+    with closing(
+        iter_batches(CONNECTION_STRING, "SELECT 1", batch_size=100)
+    ) as batches:
+        for _ in batches:
+            break
+
+    assert connections[0].script_cursor.fetched == 100
+    assert connections[0].script_cursor.closed
+    assert connections[0].closed
+
+
+def test_all_result_sets(connections):
+    batches = iter_batches(
+        CONNECTION_STRING, "SELECT 1; SELECT 2", batch_size=100, all_result_sets=True
+    )
+
+    assert [batch.num_rows for batch in batches] == [100, 100, 50] * 2
+    assert connections[0].closed
+
+
+def test_as_rows(connections):
+    batches = list(
+        iter_batches(CONNECTION_STRING, "SELECT 1", batch_size=200, as_rows=True)
+    )
+
+    assert [len(batch) for batch in batches] == [200, 50]
+    assert isinstance(batches[0][0], tuple)
+
+
+def test_iter_result_sets(connections):
+    result_sets = []
+
+    for batches in iter_result_sets(CONNECTION_STRING, "SELECT 1; SELECT 2", 100):
+        result_sets.append([batch.num_rows for batch in batches])
+
+    assert result_sets == [[100, 100, 50], [100, 100, 50]]
+
+
+def test_previous_result_set_is_discarded(connections):
+    previous = list(iter_result_sets(CONNECTION_STRING, "SELECT 1; SELECT 2", 100))
+
+    # The cursor moved to the next result sets and was closed
+    assert [list(batches) for batches in previous] == [[], []]
+    assert connections[0].closed
@@ -0,0 +1,116 @@
+"""
+Tests of the mapping of result columns to an Arrow schema
+"""
+
+import uuid
+from decimal import Decimal
+from datetime import datetime, date, time
+import pyarrow as pa
+import pytest
+from extractsql.schema import SchemaMapper
+from extractsql.constants import DECIMAL_AS_FLOAT, DECIMAL_AS_STRING
+from benchmarks.fakecursor import FakeCursor
+
+
+def column(type_code, internal_size=0, precision=0, scale=0, null_ok=True) -> tuple:
+    # pyodbc description: name, type_code, display_size, internal_size, precision,
+    # scale, null_ok
+    return ("col", type_code, None, internal_size, precision, scale, null_ok)
+
+
+def get_type(description: tuple, **kwargs) -> pa.DataType:
+    return SchemaMapper([description], **kwargs).schema.field(0).type
+
+
+@pytest.mark.parametrize(
+    "precision, expected",
+    [(3, pa.uint8()), (5, pa.int16()), (10, pa.int32()), (19, pa.int64())],
+)
+def test_int(precision, expected):
+    assert get_type(column(int, precision, precision)) == expected
+
+
+@pytest.mark.parametrize(
+    "precision, expected", [(24, pa.float32()), (53, pa.float64())]
+)
+def test_float(precision, expected):
+    assert get_type(column(float, precision, precision)) == expected
+
+
+def test_decimal():
+    assert get_type(column(Decimal, 19, 19, 4)) == pa.decimal128(19, 4)
+
+
+def test_decimal_precision_clamped():
+    assert get_type(column(Decimal, 50, 50, 40)) == pa.decimal128(38, 38)
+    assert get_type(column(Decimal)) == pa.decimal128(38, 0)
+
+
+def test_decimal_as():
+    description = column(Decimal, 19, 19, 4)
+    rows = [(Decimal("1.2500"),), (None,)]
+
+    as_float = SchemaMapper([description], decimal_as=DECIMAL_AS_FLOAT)
+    as_string = SchemaMapper([description], decimal_as=DECIMAL_AS_STRING)
+
+    assert as_float.to_batch(rows).column(0).to_pylist() == [1.25, None]
+    assert as_string.to_batch(rows).column(0).to_pylist() == ["1.2500", None]
+    assert as_string.schema.field(0).type == pa.string()
+
+
+@pytest.mark.parametrize(
+    "type_code, expected",
+    [
+        (bool, pa.bool_()),
+        (datetime, pa.timestamp("us")),
+        (date, pa.date32()),
+        (time, pa.time64("us")),
+    ],
+)
+def test_temporal_and_bool(type_code, expected):
+    assert get_type(column(type_code, 23, 23, 3)) == expected
+
+
+def test_wide_string_length():
+    assert get_type(column(str, 50, 50)) == pa.string()
+    # (MAX)
+    assert get_type(column(str)) == pa.large_string()
+    assert get_type(column(str, 50, 50), wide_string_length=20) == pa.large_string()
+    assert get_type(column(bytes, 50, 50)) == pa.binary()
+    assert get_type(column(bytes)) == pa.large_binary()
+
+
+def test_nullability():
+    mapper = SchemaMapper([column(int, 10, 10, null_ok=False), column(int, 10, 10)])
+
+    assert [field.nullable for field in mapper.schema] == [False, True]
+
+
+def test_other_types_as_str():
+    value = uuid.uuid4()
+    mapper = SchemaMapper([column(uuid.UUID), column(object)])
+
+    batch = mapper.to_batch([(value, 1), (None, None)])
+
+    assert mapper.schema.types == [pa.string(), pa.large_string()]
+    assert batch.column(0).to_pylist() == [str(value), None]
+    assert batch.column(1).to_pylist() == ["1", None]
+
+
+def test_str_fallback():
+    # Text columns may return other objects (e.g. sql_variant)
+    batch = SchemaMapper([column(str, 50, 50)]).to_batch([("a",), (1,), (None,)])
+
+    assert batch.column(0).to_pylist() == ["a", "1", None]
+
+
+def test_from_cursor():
+    cursor = FakeCursor(10)
+    mapper = SchemaMapper.from_cursor(cursor, decimal_as=DECIMAL_AS_FLOAT)
+
+    batch = mapper.to_batch(cursor.fetchmany(10))
+
+    assert mapper.columns == [name for name, *_ in cursor.description]
+    assert batch.num_rows == 10
+    assert batch.schema.field("decimal_2").type == pa.float64()
+    assert not batch.schema.field("int_0").nullable
@@ -0,0 +1,60 @@
+"""
+Tests of the query parameters
+"""
+
+import pytest
+from extractsql.sql import get_parameter_names, bind_parameters
+from extractsql.extract import extract_to
+from extractsql.utils import ConnString
+
+
+def test_get_parameter_names():
+    query = "SELECT * FROM t WHERE a >= :start AND b < :end AND c <> :start"
+
+    assert get_parameter_names(query) == ["start", "end"]
+
+
+def test_get_parameter_names_ignores_literals_identifiers_and_comments():
+    query = """
+        SELECT ':text', "col:quoted", [col:bracket], geography::Point(1, 2, 4326)
+        -- :line_comment
+        /* :block
+           :comment */
+        FROM t WHERE a = :value AND @var = 1
+    """
+
+    assert get_parameter_names(query) == ["value"]
+
+
+def test_bind_parameters():
+    query, params = bind_parameters(
+        "SELECT ':start' FROM t WHERE a >= :start AND b < :end AND c <> :start",
+        {"start": 1, "end": 2, "unused": 3},
+    )
+
+    assert query == "SELECT ':start' FROM t WHERE a >= ? AND b < ? AND c <> ?"
+    assert params == [1, 2, 1]
+
+
+def test_bind_parameters_without_placeholders():
+    assert bind_parameters("SELECT 1", {"start": 1}) == ("SELECT 1", [])
+
+
+def test_bind_parameters_missing():
+    with pytest.raises(ValueError, match="start, end"):
+        bind_parameters("SELECT * FROM t WHERE a >= :start AND b < :end", {})
+
+
+def test_extract_binds_parameters(tmp_path, fake_database):
+    query_file = tmp_path / "query.sql"
+    query_file.write_text("SELECT * FROM t WHERE a >= :start", encoding="utf-8")
+
+    extract_to(
+        ConnString("localhost", "sales"),
+        str(query_file),
+        str(tmp_path / "out.csv"),
+        parameters={"start": 10},
+        progress=False,
+    )
+
+    assert fake_database.executed == [("SELECT * FROM t WHERE a >= ?", [10])]
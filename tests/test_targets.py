@@ -0,0 +1,127 @@
+"""
+Tests of the extraction of several servers or databases
+"""
+
+import re
+import csv
+from contextlib import contextmanager
+import pytest
+from extractsql import backends
+from extractsql.batch import STATUS_OK, STATUS_FAILED
+from extractsql.constants import BACKEND_PYODBC
+from extractsql.targets import get_targets, extract_targets
+from benchmarks.fakecursor import FakeCursor
+
+DRIVER = "ODBC Driver 18 for SQL Server"
+
+
+@pytest.fixture
+def databases(monkeypatch) -> dict:
+    """
+    Run the queries against the cursor of their database, by name (a database that is not
+    in the dictionary fails).
+    """
+
+    cursors = {}
+
+    @contextmanager
+    def execute(connection_string, query, params=None, pool=None, **kwargs):
+        yield cursors[re.search(r"DATABASE=([^;]*)", connection_string).group(1)]()
+
+    monkeypatch.setitem(backends.BACKENDS, BACKEND_PYODBC, execute)
+
+    return cursors
+
+
+def create_cursor(rows: int, types: list[str], names: list[str]) -> FakeCursor:
+    cursor = FakeCursor(rows, len(types), types)
+    cursor.description = [
+        (name, *column[1:]) for name, column in zip(names, cursor.description)
+    ]
+    return cursor
+
+
+def test_get_targets():
+    targets = get_targets(r"srv1,srv2\sql", "east,west", "user", "secret", DRIVER)
+
+    assert [target.name for target in targets] == [
+        "srv1_east",
+        "srv1_west",
+        "srv2_sql_east",
+        "srv2_sql_west",
+    ]
+    assert targets[2].connstring.server == r"srv2\sql"
+    assert targets[2].connstring.database == "east"
+    assert targets[2].connstring.user == "user"
+
+
+def test_get_targets_file(tmp_path):
+    targets_file = tmp_path / "targets.csv"
+    targets_file.write_text(
+        "name,server,database,user\n" "east region,srv1,,\n" ",srv2,west,reader\n",
+        encoding="utf-8",
+    )
+
+    targets = get_targets(None, "sales", "user", None, DRIVER, str(targets_file))
+
+    assert [target.name for target in targets] == ["east_region", "srv2_west"]
+    assert [target.connstring.database for target in targets] == ["sales", "west"]
+    assert [target.connstring.user for target in targets] == ["user", "reader"]
+
+
+def test_get_targets_without_server(tmp_path):
+    targets_file = tmp_path / "targets.json"
+    targets_file.write_text('[{"database": "sales"}]', encoding="utf-8")
+
+    with pytest.raises(ValueError, match="Target 1: server and database"):
+        get_targets(None, None, targets_file=str(targets_file))
+
+
+def test_get_targets_duplicate_names():
+    with pytest.raises(ValueError, match="Duplicate target names: srv_east"):
+        get_targets("srv,srv", "east")
+
+
+def merge(tmp_path, query_file, databases: str, **kwargs):
+    output_file = tmp_path / "out.csv"
+
+    results = extract_targets(
+        get_targets("srv", databases, driver=DRIVER),
+        query_file,
+        [str(output_file)],
+        merge_targets=True,
+        target_workers=2,
+        retries=0,
+        **kwargs,
+    )
+
+    with open(output_file, encoding="utf-8", newline="") as f:
+        return results, list(csv.DictReader(f))
+
+
+def test_merged_source_column(tmp_path, query_file, databases):
+    databases["east"] = lambda: create_cursor(3, ["int", "str"], ["id", "name"])
+    # Wider integers: the merged column holds the values of both
+    databases["west"] = lambda: create_cursor(2, ["bigint", "str"], ["id", "name"])
+
+    results, rows = merge(tmp_path, query_file, "east,west", source_column="region")
+
+    assert [result.status for result in results] == [STATUS_OK, STATUS_OK]
+    assert list(rows[0]) == ["id", "name", "region"]
+    assert [row["region"] for row in rows] == ["srv_east"] * 3 + ["srv_west"] * 2
+
+
+def test_merged_columns_mismatch(tmp_path, query_file, databases):
+    databases["east"] = lambda: create_cursor(3, ["int", "str"], ["id", "name"])
+    databases["west"] = lambda: create_cursor(2, ["int", "str"], ["id", "city"])
+
+    results, rows = merge(tmp_path, query_file, "east,west,north")
+
+    assert [result.status for result in results] == [
+        STATUS_OK,
+        STATUS_FAILED,
+        STATUS_FAILED,
+    ]
+    assert results[1].error == "The columns differ from the ones of the other targets."
+    # Only the rows of the first target are merged
+    assert [row["source"] for row in rows] == ["srv_east"] * 3
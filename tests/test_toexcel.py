@@ -0,0 +1,38 @@
+"""
+Tests of the Excel exporter
+"""
+
+import zipfile
+from extractsql.extract import extract_to
+from extractsql.utils import ConnString
+from benchmarks.fakecursor import FakeCursor
+
+
+def test_split_in_workbooks(tmp_path, fake_database, query_file):
+    fake_database.cursor = lambda query, params: FakeCursor(2500)
+    output_file = tmp_path / "out.xlsx"
+
+    rows, output_files = extract_to(
+        ConnString("localhost", "sales"),
+        query_file,
+        str(output_file),
+        batch_size=400,
+        rows_per_sheet=500,
+        sheets_per_workbook=2,
+        workers=2,
+        progress=False,
+    )
+
+    assert rows == 2500
+    assert output_files == [
+        str(tmp_path / f"out_part{part}.xlsx") for part in range(1, 4)
+    ]
+    assert [count_sheets(file) for file in output_files] == [2, 2, 1]
+    assert not output_file.exists()
+
+
+def count_sheets(file_path: str) -> int:
+    with zipfile.ZipFile(file_path) as workbook:
+        return sum(
+            name.startswith("xl/worksheets/sheet") for name in workbook.namelist()
+        )